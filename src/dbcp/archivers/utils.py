@@ -7,6 +7,8 @@ import yaml
 from google.cloud import storage
 from pydantic import BaseModel
 
+from dbcp.extract.helpers import get_gcs_archive_generation_num, is_offline
+
 
 class AbstractArchiver(ABC):
     """Abstract class for archiving data."""
@@ -66,12 +68,20 @@ class ExtractionSettings:
         self, archived_data: dict[str, ArchivedData], bucket_name: str = "dgm-archive"
     ):
         """Initialize the ExtractionSettings object."""
-        credentials, project_id = google.auth.default()
-        self.client = storage.Client(credentials=credentials, project=project_id)
-        self.bucket = self.client.get_bucket(bucket_name)
+        self.bucket_name = bucket_name
+        self._bucket = None
 
         self.archived_data = archived_data
 
+    @property
+    def bucket(self) -> storage.Bucket:
+        """The GCS bucket of the archives, connected to on first use."""
+        if self._bucket is None:
+            credentials, project_id = google.auth.default()
+            client = storage.Client(credentials=credentials, project=project_id)
+            self._bucket = client.get_bucket(self.bucket_name)
+        return self._bucket
+
     @classmethod
     def from_yaml(cls, yaml_path: str) -> "ExtractionSettings":
         """Create an ExtractionSettings object from a YAML file."""
@@ -106,19 +116,30 @@ class ExtractionSettings:
             archive = self.archived_data[archive_name]
         except KeyError:
             raise KeyError(f"Archive {archive_name} not found in the settings.")
-        return f"gs://{self.bucket.name}/{archive.get_full_path}"
+        return f"gs://{self.bucket_name}/{archive.get_full_path}"
 
     def update_archive_generation_numbers(self):
-        """Update the generation numbers for the archived data."""
+        """Update the generation numbers for the archived data.
+
+        In offline mode, unpinned archives are resolved to the newest generation in
+        the local cache manifest instead of asking GCS.
+        """
         for archive in self.archived_data.values():
             if not archive.pinned or archive.generation_num is None:
-                blob = self.bucket.get_blob(archive.name)
-                if blob is None:
-                    raise ValueError(
-                        f"Blob {archive.name} does not exist in the {self.bucket.name} bucket"
+                if is_offline():
+                    archive.generation_num = int(
+                        get_gcs_archive_generation_num(
+                            f"gs://{self.bucket_name}/{archive.name}"
+                        )
                     )
-                archive.generation_num = blob.generation
-                archive.metadata = blob.metadata
+                else:
+                    blob = self.bucket.get_blob(archive.name)
+                    if blob is None:
+                        raise ValueError(
+                            f"Blob {archive.name} does not exist in the {self.bucket_name} bucket"
+                        )
+                    archive.generation_num = blob.generation
+                    archive.metadata = blob.metadata
             assert (
                 archive.generation_num is not None
             ), f"Generation number for {archive.name} is None"
@@ -1,6 +1,7 @@
 """A Command line interface for the down ballot project."""
 
 import logging
+import os
 
 import click
 import coloredlogs
@@ -9,8 +10,10 @@ import dbcp
 from dbcp.commands.archive import run_archivers
 from dbcp.commands.publish import publish_outputs
 from dbcp.commands.settings import save_settings
+from dbcp.etl import DATASET_CACHE
+from dbcp.extract.helpers import OFFLINE_ENV_VAR, clear_excel_cache
 from dbcp.transform.fips_tables import SPATIAL_CACHE
-from dbcp.transform.helpers import GEOCODER_CACHE
+from dbcp.transform.geocoding import GEOCODER_CACHE
 
 logger = logging.getLogger(__name__)
 
@@ -46,20 +49,59 @@ def cli(loglevel):
 @click.option(
     "-clr",
     "--clear-cache",
-    help="Delete saved geocoder and spatial join results, forcing fresh API calls and computation.",
+    help="Delete saved geocoder, spatial join, parsed Excel sheet and dataset results, forcing fresh API calls and computation.",
     default=False,
     is_flag=True,
 )
-def etl(data_mart: bool, data_warehouse: bool, clear_cache: bool):
+@click.option(
+    "--full-refresh",
+    help="Recompute every data warehouse dataset, even if its inputs and code have not changed.",
+    default=False,
+    is_flag=True,
+)
+@click.option(
+    "--resume",
+    help="Restore data warehouse datasets that finished before the previous run failed.",
+    default=False,
+    is_flag=True,
+)
+@click.option(
+    "--offline",
+    help="Read archived data and PUDL resources only from the local cache, without contacting GCS or S3.",
+    default=False,
+    is_flag=True,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of data warehouse datasets or data mart modules to process in parallel.",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+)
+def etl(
+    data_mart: bool,
+    data_warehouse: bool,
+    clear_cache: bool,
+    full_refresh: bool,
+    resume: bool,
+    offline: bool,
+    jobs: int,
+):
     """Run the ETL process to produce the data warehouse and mart."""
+    if offline:
+        # an environment variable so the ETL worker processes are offline too
+        os.environ[OFFLINE_ENV_VAR] = "1"
     if clear_cache:
         GEOCODER_CACHE.clear()
         SPATIAL_CACHE.clear()
+        DATASET_CACHE.clear()
+        clear_excel_cache()
 
     if data_warehouse:
-        dbcp.etl.etl()
+        dbcp.etl.etl(jobs=jobs, use_cache=not full_refresh, resume=resume)
     if data_mart:
-        dbcp.data_mart.create_data_marts()
+        dbcp.data_mart.create_data_marts(jobs=jobs)
     else:
         raise ValueError(
             "Please specify a target for the ETL process: --data-warehouse and/or --data-mart."
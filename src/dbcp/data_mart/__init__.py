@@ -3,83 +3,172 @@
 import importlib
 import logging
 import pkgutil
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
+import sqlalchemy as sa
 
 import dbcp
 from dbcp.constants import OUTPUT_DIR
-from dbcp.helpers import enforce_dtypes, psql_insert_copy
+from dbcp.data_mart.helpers import DataMartContext
+from dbcp.helpers import load_table
 from dbcp.metadata.data_mart import metadata
 from dbcp.validation.tests import validate_data_mart
 
 logger = logging.getLogger(__name__)
 
+STAGING_SCHEMA = "data_mart_staging"
+"""The schema data mart tables are loaded into before they replace the live ones."""
 
-def create_data_marts():  # noqa: max-complexity=11
-    """Collect and load all data mart tables to data warehouse."""
+
+def _create_data_mart(
+    module_name: str, engine: sa.engine.Engine, context: DataMartContext
+) -> dict[str, pd.DataFrame]:
+    """Import a data mart module and create its tables.
+
+    Args:
+        module_name: the name of the data mart module.
+        engine: postgres engine of the data warehouse.
+        context: intermediate tables shared by the data marts.
+
+    Returns:
+        mapping of table name to data mart table.
+    """
+    module = importlib.import_module(f"{__name__}.{module_name}")
+    if not hasattr(module, "create_data_mart"):
+        raise AttributeError(
+            f"{module_name} has no attribute 'create_data_mart'."
+            "Make sure the data mart module implements create_data_mart function."
+        )
+    logger.info(f"Creating {module_name} data mart.")
+    start = time.monotonic()
+    data = module.create_data_mart(engine=engine, context=context)
+    logger.info(
+        f"Created {module_name} data mart in {time.monotonic() - start:.1f} seconds."
+    )
+    if isinstance(data, pd.DataFrame):
+        return {module_name: data}
+    elif isinstance(data, dict):
+        return data
+    raise TypeError(f"Expecting pd.DataFrame or dict of dataframes. Got {type(data)}")
+
+
+def _stage_tables(
+    tables: dict[str, pd.DataFrame], engine: sa.engine.Engine, parquet_dir: Path
+) -> set[str]:
+    """Load finished data mart tables into the staging schema and parquet directory.
+
+    Args:
+        tables: mapping of table name to data mart table.
+        engine: postgres engine of the data warehouse.
+        parquet_dir: the staging directory to write the parquet files to.
+
+    Returns:
+        the names of the tables that were loaded.
+    """
+    loaded = set()
+    with engine.begin() as con:
+        for table_name, df in tables.items():
+            if f"data_mart.{table_name}" not in metadata.tables:
+                continue
+            load_table(
+                df,
+                table_name,
+                "data_mart",
+                con,
+                parquet_dir,
+                target_schema=STAGING_SCHEMA,
+            )
+            loaded.add(table_name)
+    return loaded
+
+
+def create_data_marts(jobs: int = 1):
+    """Collect and load all data mart tables to data warehouse.
+
+    The data mart modules run in a pool of threads. They share one DataMartContext so
+    intermediate tables are only created once. The tables of each finished module are
+    loaded into a staging schema and parquet directory while the other modules are
+    still running. Once every module has finished, the staged tables replace the data
+    mart tables in one transaction, so readers are only blocked during the swap and the
+    previous data mart tables are left in place if any module or load fails.
+
+    Args:
+        jobs: maximum number of data mart modules to run at the same time.
+    """
+    if jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}")
     engine = dbcp.helpers.get_sql_engine()
-    data_marts = {}
     modules_to_skip = {
         "helpers",  # helper code; no tables
         "co2_dashboard",  # obsolete but code imported elsewhere
     }
+    module_names = [
+        module_info.name
+        for module_info in pkgutil.iter_modules(__path__)
+        if module_info.name not in modules_to_skip
+    ]
+    # intermediate tables shared by the data marts
+    context = DataMartContext(engine)
 
-    for module_info in pkgutil.iter_modules(__path__):
-        if module_info.name in modules_to_skip:
-            continue
-        module = importlib.import_module(f"{__name__}.{module_info.name}")
-        try:
-            data = module.create_data_mart(engine=engine)
-        except AttributeError:
-            raise AttributeError(
-                f"{module_info.name} has no attribute 'create_data_mart'."
-                "Make sure the data mart module implements create_data_mart function."
-            )
-        if isinstance(data, pd.DataFrame):
-            assert (
-                module_info.name not in data_marts.keys()
-            ), f"Key {module_info.name} already exists in data mart"
-            data_marts[module_info.name] = data
-        elif isinstance(data, dict):
-            assert (
-                len([key for key in data.keys() if key in data_marts.keys()]) == 0
-            ), f"Dict key from {module_info.name} already exists"
-            data_marts.update(data)
-        else:
-            raise TypeError(
-                f"Expecting pd.DataFrame or dict of dataframes. Got {type(data)}"
-            )
+    parquet_dir = OUTPUT_DIR / "data_mart"
+    staging_parquet_dir = OUTPUT_DIR / STAGING_SCHEMA
+    shutil.rmtree(staging_parquet_dir, ignore_errors=True)
+    staging_parquet_dir.mkdir(parents=True)
 
-    # Setup postgres
-    with engine.connect() as con:
-        engine.execute("CREATE SCHEMA IF NOT EXISTS data_mart")
+    # Setup postgres: empty copies of the data mart tables to stage the new data in
+    with engine.begin() as con:
+        con.execute("CREATE SCHEMA IF NOT EXISTS data_mart")
+        con.execute(f"DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE")
+        con.execute(f"CREATE SCHEMA {STAGING_SCHEMA}")
+        metadata.create_all(
+            con.execution_options(schema_translate_map={"data_mart": STAGING_SCHEMA})
+        )
 
-    # Create the schemas
-    metadata.drop_all(engine)
-    metadata.create_all(engine)
+    created_tables: set[str] = set()
+    loaded_tables: set[str] = set()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(_create_data_mart, name, engine, context): name
+            for name in module_names
+        }
+        try:
+            for future in as_completed(futures):
+                data = future.result()
+                duplicates = created_tables & data.keys()
+                assert (
+                    not duplicates
+                ), f"Dict key from {futures[future]} already exists: {duplicates}"
+                created_tables.update(data)
+                # load while the remaining data marts are computed
+                loaded_tables |= _stage_tables(data, engine, staging_parquet_dir)
+                del data
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
 
-    parquet_dir = OUTPUT_DIR / "data_mart"
+    missing_tables = {table.name for table in metadata.sorted_tables}
+    missing_tables -= loaded_tables
+    if missing_tables:
+        raise KeyError(
+            f"No data mart module created these tables: {sorted(missing_tables)}"
+        )
 
-    # Load table into postgres and parquet
-    with engine.connect() as con:
+    # Swap the staged tables in
+    with engine.begin() as con:
+        metadata.drop_all(con)
         for table in metadata.sorted_tables:
-            logger.info(f"Load {table.name} to postgres.")
-            df = dbcp.helpers.trim_columns_length(data_marts[table.name])
-            df = enforce_dtypes(df, table.name, "data_mart")
-            df.to_sql(
-                name=table.name,
-                con=con,
-                if_exists="append",
-                index=False,
-                schema="data_mart",
-                method=psql_insert_copy,
-            )
-            schema = dbcp.helpers.get_pyarrow_schema_from_metadata(
-                table.name, "data_mart"
+            con.execute(
+                f"ALTER TABLE {STAGING_SCHEMA}.{table.name} SET SCHEMA data_mart"
             )
-            pa_table = pa.Table.from_pandas(df, schema=schema)
-            pq.write_table(pa_table, parquet_dir / f"{table.name}.parquet")
+        con.execute(f"DROP SCHEMA {STAGING_SCHEMA}")
+    parquet_dir.mkdir(parents=True, exist_ok=True)
+    for path in staging_parquet_dir.glob("*.parquet"):
+        path.replace(parquet_dir / path.name)
+    staging_parquet_dir.rmdir()
 
     validate_data_mart(engine=engine)
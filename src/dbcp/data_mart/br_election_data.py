@@ -5,20 +5,22 @@ from typing import Optional
 import pandas as pd
 import sqlalchemy as sa
 
-from dbcp.helpers import get_sql_engine
+from dbcp.data_mart.helpers import DataMartContext
+from dbcp.helpers import get_sql_engine, read_sql_arrow
 
 
-def _create_br_election_data_mart(engine: sa.engine.Engine) -> pd.DataFrame:
+def _create_br_election_data_mart(
+    engine: sa.engine.Engine, context: DataMartContext
+) -> pd.DataFrame:
     """Denormalize the ballot ready entities."""
-    with engine.connect() as con:
-        br_races = pd.read_sql_table("br_races", con, schema="data_warehouse")
-        br_elections = pd.read_sql_table("br_elections", con, schema="data_warehouse")
-        br_positions = pd.read_sql_table("br_positions", con, schema="data_warehouse")
-        br_positions_counties_assoc = pd.read_sql_table(
-            "br_positions_counties_assoc", con, schema="data_warehouse"
-        )
-        county_fips = pd.read_sql_table("county_fips", con, schema="data_warehouse")
-        state_fips = pd.read_sql_table("state_fips", con, schema="data_warehouse")
+    br_races = read_sql_arrow("SELECT * FROM data_warehouse.br_races", engine)
+    br_elections = read_sql_arrow("SELECT * FROM data_warehouse.br_elections", engine)
+    br_positions = read_sql_arrow("SELECT * FROM data_warehouse.br_positions", engine)
+    br_positions_counties_assoc = read_sql_arrow(
+        "SELECT * FROM data_warehouse.br_positions_counties_assoc", engine
+    )
+    county_fips = context.county_fips_df()
+    state_fips = context.state_fips_df()
 
     # Add state and county names
     br_positions_counties_assoc = br_positions_counties_assoc.merge(
@@ -159,21 +161,26 @@ def _create_county_commission_elections_wide(
 
 def create_data_mart(
     engine: Optional[sa.engine.Engine] = None,
+    context: Optional[DataMartContext] = None,
 ) -> dict[str, pd.DataFrame]:
     """Create final output table.
 
     Args:
         engine (Optional[sa.engine.Engine], optional): postgres engine. Defaults to None.
+        context (Optional[DataMartContext], optional): intermediate tables shared
+            with the other data marts. Defaults to None.
 
     Returns:
         pd.DataFrame: table for data mart
     """
     if engine is None:
         engine = get_sql_engine()
+    if context is None:
+        context = DataMartContext(engine)
 
     dfs = {}
 
-    dfs["br_election_data"] = _create_br_election_data_mart(engine)
+    dfs["br_election_data"] = _create_br_election_data_mart(engine, context)
 
     county_commission_elections_long = _create_county_commission_elections_long(
         dfs["br_election_data"]
@@ -4,14 +4,22 @@ The table is at the county level and contains data from.
 
 """
 
+from datetime import date
 from typing import Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import sqlalchemy as sa
 
 from dbcp.constants import PUDL_LATEST_YEAR
 from dbcp.data_mart.helpers import _get_county_fips_df, _get_state_fips_df, get_query
-from dbcp.helpers import get_pudl_resource, get_sql_engine
+from dbcp.helpers import (
+    get_pudl_resource,
+    get_sql_engine,
+    read_pudl_table,
+    read_sql_arrow,
+)
 from dbcp.transform.helpers import (
     add_county_fips_with_backup_geocoding,
     bedford_addfips_fix,
@@ -19,36 +27,25 @@ from dbcp.transform.helpers import (
 
 
 def _get_existing_plant_fuel_data() -> pd.DataFrame:
-    df = pd.read_parquet(
-        get_pudl_resource("core_eia923__monthly_generation_fuel.parquet"),
-        engine="pyarrow",
-        use_nullable_dtypes=True,
-    )
-    # convert all columns with the word date to datetime
-    date_columns = [col for col in df.columns if "date" in col]
-    for col in date_columns:
-        df[col] = pd.to_datetime(df[col])
-
-    # convert all categorical columns to strings
-    for col in df.select_dtypes(include="category").columns:
-        df[col] = df[col].astype("string")
-    df = df[
-        (df["report_date"] >= f"{PUDL_LATEST_YEAR}-01-01")
-        & (df["report_date"] < f"{PUDL_LATEST_YEAR+1}-01-01")
-        & (df["fuel_type_code_pudl"].isin(["coal", "gas", "oil"]))
-    ]
-
-    # Select specific columns
-    df = df[
-        [
+    report_date = pc.field("report_date")
+    df = read_pudl_table(
+        "core_eia923__monthly_generation_fuel.parquet",
+        columns=[
             "plant_id_eia",
             "fuel_type_code_pudl",
             "prime_mover_code",
             "report_date",
             "net_generation_mwh",
             "fuel_consumed_for_electricity_mmbtu",
-        ]
-    ]
+        ],
+        filters=(report_date >= pa.scalar(date(PUDL_LATEST_YEAR, 1, 1)))
+        & (report_date < pa.scalar(date(PUDL_LATEST_YEAR + 1, 1, 1)))
+        & pc.field("fuel_type_code_pudl").isin(["coal", "gas", "oil"]),
+    )
+
+    # convert all categorical columns to strings
+    for col in df.select_dtypes(include="category").columns:
+        df[col] = df[col].astype("string")
 
     # Rename columns
     df = df.rename(
@@ -236,7 +233,7 @@ def _get_existing_fossil_plants(
 def _get_proposed_fossil_plants(engine: sa.engine.Engine) -> pd.DataFrame:
     # see last SELECT statement for output columns
     query = get_query("get_proposed_fossil_plants.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     _estimate_proposed_power_co2e(df)
     df.rename(columns={"project_id": "id"}, inplace=True)
     df["facility_type"] = "proposed_power"
@@ -321,7 +318,7 @@ def _estimate_proposed_power_co2e(
 
 def _get_proposed_fossil_infra(engine: sa.engine.Engine) -> pd.DataFrame:
     query = get_query("get_proposed_fossil_infra.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     df["facility_type"] = "proposed_infrastructure"
     df.rename(columns={"facility_id": "id"}, inplace=True)
     return df
@@ -37,14 +37,14 @@ from dbcp.data_mart.fossil_infrastructure_projects import (
     create_data_mart as create_fossil_infra_data_mart,
 )
 from dbcp.data_mart.helpers import (
-    CountyOpposition,
+    DataMartContext,
     _get_county_fips_df,
     _get_state_fips_df,
     _subset_db_columns,
     get_query,
 )
 from dbcp.data_mart.projects import create_long_format as create_iso_data_mart
-from dbcp.helpers import get_sql_engine
+from dbcp.helpers import get_sql_engine, read_sql_arrow
 
 JUSTICE40_AGGREGATES = pd.read_csv(
     # This variable exists because of Postgres character limits on column names.
@@ -136,7 +136,7 @@ def _create_dbcp_ej_index(j40_df: pd.DataFrame) -> pd.Series:
 
 def _get_env_justice_df(engine: sa.engine.Engine) -> pd.DataFrame:
     """Create county-level aggregates of Justice40 tracts."""
-    df = pd.read_sql_table("justice40_tracts", engine, schema="data_warehouse")
+    df = read_sql_arrow("SELECT * FROM data_warehouse.justice40_tracts", engine)
     df["county_id_fips"] = df["tract_id_fips"].str.slice(0, 5)
     df = df.groupby("county_id_fips").agg(
         total_tracts=("tract_id_fips", "count"),
@@ -232,7 +232,7 @@ def _get_existing_plant_attributes(engine: sa.engine.Engine) -> pd.DataFrame:
     # FROM gen_fuels
 
     query = get_query("get_existing_plant_attributes.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     resource_map = {
         "gas": "Natural Gas",
         "wind": "Onshore Wind",
@@ -288,17 +288,35 @@ def _get_existing_plants(
     return plants
 
 
+def get_existing_plants(
+    postgres_engine: sa.engine.Engine, context: Optional[DataMartContext] = None
+) -> pd.DataFrame:
+    """Get existing plants with their locations and co2e estimates.
+
+    Args:
+        postgres_engine: postgres engine.
+        context: intermediate tables shared by the data marts of this run.
+
+    Returns:
+        table of existing plants.
+    """
+    if context is None:
+        context = DataMartContext(postgres_engine)
+    return context.get_or_create(
+        "existing_plants",
+        lambda: _get_existing_plants(
+            postgres_engine=postgres_engine,
+            state_fips_table=context.state_fips_df(),
+            county_fips_table=context.county_fips_df(),
+        ),
+    )
+
+
 def _existing_plants_counties(
-    postgres_engine: sa.engine.Engine,
-    state_fips_table: Optional[pd.DataFrame] = None,
-    county_fips_table: Optional[pd.DataFrame] = None,
+    postgres_engine: sa.engine.Engine, context: DataMartContext
 ) -> pd.DataFrame:
     """Create existing plant county-plant aggs for the long-format county table."""
-    plants = _get_existing_plants(
-        postgres_engine=postgres_engine,
-        state_fips_table=state_fips_table,
-        county_fips_table=county_fips_table,
-    )
+    plants = get_existing_plants(postgres_engine, context)
     grp = plants.groupby(["county_id_fips", "resource"])
     aggs = grp.agg(
         {
@@ -367,10 +385,12 @@ def _fossil_infrastructure_counties(engine: sa.engine.Engine) -> pd.DataFrame:
     return aggs
 
 
-def _iso_projects_counties(engine: sa.engine.Engine) -> pd.DataFrame:
+def _iso_projects_counties(
+    engine: sa.engine.Engine, context: DataMartContext
+) -> pd.DataFrame:
     # Avoid db dependency order by recreating the df.
     # Could also make an orchestration script.
-    iso = create_iso_data_mart(engine, active_projects_only=True)
+    iso = create_iso_data_mart(engine, active_projects_only=True, context=context)
 
     # equivalent SQL query that I translated to pandas to avoid dependency
     # on the data_mart schema (which doesn't yet exist when this function runs)
@@ -594,18 +614,17 @@ def _convert_long_to_wide(long_format: pd.DataFrame) -> pd.DataFrame:
 
 def create_long_format(
     postgres_engine: sa.engine.Engine,
+    context: Optional[DataMartContext] = None,
 ) -> pd.DataFrame:
     """Create the long format county datamart dataframe."""
-    all_counties = _get_county_fips_df(postgres_engine)
-    all_states = _get_state_fips_df(postgres_engine)
-    county_properties = _get_county_properties(postgres_engine=postgres_engine)
-    iso = _iso_projects_counties(postgres_engine)
-    infra = _fossil_infrastructure_counties(postgres_engine)
-    existing = _existing_plants_counties(
-        postgres_engine=postgres_engine,
-        state_fips_table=all_states,
-        county_fips_table=all_counties,
+    if context is None:
+        context = DataMartContext(postgres_engine)
+    county_properties = _get_county_properties(
+        postgres_engine=postgres_engine, context=context
     )
+    iso = _iso_projects_counties(postgres_engine, context)
+    infra = _fossil_infrastructure_counties(postgres_engine)
+    existing = _existing_plants_counties(postgres_engine, context)
 
     # join it all
     out = pd.concat([iso, existing, infra], axis=0, ignore_index=True)
@@ -625,7 +644,7 @@ def _get_offshore_wind_extra_cols(engine: sa.engine.Engine) -> pd.DataFrame:
     # of any port could block the whole associated project, so we want
     # to know how much total capacity is at stake in each port county.
     query = get_query("get_offshore_wind_extra_cols.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     df.set_index("county_id_fips", inplace=True)
     return df
 
@@ -640,7 +659,7 @@ def _get_federal_land_fraction(postgres_engine: sa.engine.Engine):
         county_area_coast_clipped_km2
     from data_warehouse.protected_area_by_county
     """
-    pad = pd.read_sql(query, postgres_engine)
+    pad = read_sql_arrow(query, postgres_engine)
     # county_area_coast_clipped is consistent with clipped PAD-US but
     # the county_fips.land_area_km2 is more accurate and preferred for
     # downstream analysis.
@@ -693,12 +712,13 @@ def _get_energy_community_qualification(postgres_engine: sa.engine.Engine):
     # NOTE: this query contains hardcoded parameters for the
     # energy communities qualification criteria
     query = get_query("get_energy_community_qualification.sql")
-    ec = pd.read_sql(query, postgres_engine)
+    ec = read_sql_arrow(query, postgres_engine)
     return ec
 
 
 def _get_county_properties(
     postgres_engine: sa.engine.Engine,
+    context: DataMartContext,
     include_state_policies=False,
     rename_dict: Optional[Dict[str, str]] = None,
 ):
@@ -714,17 +734,14 @@ def _get_county_properties(
             "land_area_km2": "county_land_area_km2",
         }
     ncsl = _get_ncsl_wind_permitting_df(postgres_engine)
-    all_counties = _get_county_fips_df(postgres_engine)
-    all_states = _get_state_fips_df(postgres_engine)
+    all_counties = context.county_fips_df()
+    all_states = context.state_fips_df()
     env_justice = _get_env_justice_df(postgres_engine)
     fed_lands = _get_federal_land_fraction(postgres_engine)
     energy_community_counties = _get_energy_community_qualification(postgres_engine)
 
     # model local opposition
-    aggregator = CountyOpposition(
-        engine=postgres_engine, county_fips_df=all_counties, state_fips_df=all_states
-    )
-    combined_opp = aggregator.agg_to_counties(
+    combined_opp = context.county_opposition(
         include_state_policies=include_state_policies,
         include_nrel_bans=True,
         include_manual_ordinances=True,
@@ -795,11 +812,13 @@ def _join_all_counties_to_wide_format(
     return county_properties
 
 
-def _get_actionable_aggs_for_wide_format(engine: sa.engine.Engine) -> pd.DataFrame:
+def _get_actionable_aggs_for_wide_format(
+    engine: sa.engine.Engine, context: DataMartContext
+) -> pd.DataFrame:
     """Create aggregates of renewables filtered by is_actionable and is_nearly_certain."""
     # Had to do this separately because including the is_actionable condition in
     # the long format data would be too ugly.
-    iso = create_iso_data_mart(engine)
+    iso = create_iso_data_mart(engine, context=context)
     iso = _add_avoided_co2e(iso, engine)
 
     # Distribute project-level quantities across locations, when there are multiple.
@@ -855,10 +874,12 @@ def _get_actionable_aggs_for_wide_format(engine: sa.engine.Engine) -> pd.DataFra
     return aggs
 
 
-def _get_actionable_aggs_for_long_format(engine: sa.engine.Engine) -> pd.DataFrame:
+def _get_actionable_aggs_for_long_format(
+    engine: sa.engine.Engine, context: DataMartContext
+) -> pd.DataFrame:
     """Calculate fraction of MW considered actionable."""
     # This should be refactored and combined with the wide format version above.
-    iso = create_iso_data_mart(engine)
+    iso = create_iso_data_mart(engine, context=context)
 
     # Distribute project-level quantities across locations, when there are multiple.
     # A handful of ISO projects are in multiple counties and the proprietary offshore
@@ -905,8 +926,8 @@ def _add_avoided_co2e(iso: pd.DataFrame, engine: sa.engine.Engine) -> pd.DataFra
 
 
 def _get_avoided_emissions_by_county_resource(engine: sa.engine.Engine) -> pd.DataFrame:
-    emiss_fac = pd.read_sql_table(
-        "avert_avoided_emissions_factors", engine, schema="data_warehouse"
+    emiss_fac = read_sql_arrow(
+        "SELECT * FROM data_warehouse.avert_avoided_emissions_factors", engine
     )
     emiss_fac = emiss_fac[
         emiss_fac.resource_type.isin(["onshore_wind", "offshore_wind", "utility_pv"])
@@ -914,8 +935,8 @@ def _get_avoided_emissions_by_county_resource(engine: sa.engine.Engine) -> pd.Da
     emiss_fac = emiss_fac[
         ["avert_region", "resource_type", "co2e_tonnes_per_year_per_mw"]
     ]
-    crosswalk = pd.read_sql_table(
-        "avert_county_region_assoc", engine, schema="data_warehouse"
+    crosswalk = read_sql_arrow(
+        "SELECT * FROM data_warehouse.avert_county_region_assoc", engine
     )
     emiss_fac_by_county = crosswalk.merge(emiss_fac, on="avert_region", how="left")
 
@@ -938,21 +959,26 @@ def _get_avoided_emissions_by_county_resource(engine: sa.engine.Engine) -> pd.Da
 def create_wide_format(
     postgres_engine: Optional[sa.engine.Engine] = None,
     long_format: Optional[pd.DataFrame] = None,
+    context: Optional[DataMartContext] = None,
 ) -> pd.DataFrame:
     """Create wide format county aggregates."""
     if postgres_engine is None:
         postgres_engine = get_sql_engine()
+    if context is None:
+        context = DataMartContext(postgres_engine)
     if long_format is None:
-        long_format = create_long_format(postgres_engine=postgres_engine)
+        long_format = create_long_format(
+            postgres_engine=postgres_engine, context=context
+        )
     wide_format = _convert_long_to_wide(long_format)
     # add aggregates that have to be recreated from the project-level data
-    proposed_counts = _get_category_project_counts(postgres_engine)
+    proposed_counts = _get_category_project_counts(postgres_engine, context)
     # client requested joining all counties onto wide format table, even if all values are NULL
-    county_properties = _get_county_properties(postgres_engine)
+    county_properties = _get_county_properties(postgres_engine, context)
     wide_format = _join_all_counties_to_wide_format(wide_format, county_properties)
     # client requested two additional columns relating to offshore wind
     offshore_bits = _get_offshore_wind_extra_cols(postgres_engine)
-    actionable_bits = _get_actionable_aggs_for_wide_format(postgres_engine)
+    actionable_bits = _get_actionable_aggs_for_wide_format(postgres_engine, context)
 
     wide_format = pd.concat(
         [
@@ -978,7 +1004,9 @@ def create_wide_format(
     return wide_format
 
 
-def _get_category_project_counts(engine: sa.engine.Engine) -> pd.DataFrame:
+def _get_category_project_counts(
+    engine: sa.engine.Engine, context: DataMartContext
+) -> pd.DataFrame:
     """Count projects by resource class.
 
     Necessary because aggregating by resource_class in the long format would
@@ -986,7 +1014,7 @@ def _get_category_project_counts(engine: sa.engine.Engine) -> pd.DataFrame:
     """
     # Avoid db dependency order by recreating the df.
     # Could also make an orchestration script.
-    iso = create_iso_data_mart(engine)
+    iso = create_iso_data_mart(engine, context=context)
     iso["surrogate_project_id"] = iso["project_id"].astype(str) + iso["source"]
     # equivalent SQL query that I translated to pandas to avoid dependency
     # on the data_mart schema (which doesn't yet exist when this function runs)
@@ -1020,11 +1048,14 @@ def _get_category_project_counts(engine: sa.engine.Engine) -> pd.DataFrame:
 
 def create_data_mart(
     engine: Optional[sa.engine.Engine] = None,
+    context: Optional[DataMartContext] = None,
 ) -> Dict[str, pd.DataFrame]:
     """Create county data marts.
 
     Args:
         engine (Optional[sa.engine.Engine], optional): postgres engine. Defaults to None.
+        context (Optional[DataMartContext], optional): intermediate tables shared
+            with the other data marts. Defaults to None.
 
     Returns:
         Dict[str, pd.DataFrame]: county tables in both wide and long format
@@ -1032,13 +1063,16 @@ def create_data_mart(
     postgres_engine = engine
     if postgres_engine is None:
         postgres_engine = get_sql_engine()
+    if context is None:
+        context = DataMartContext(postgres_engine)
 
-    long_format = create_long_format(postgres_engine=postgres_engine)
+    long_format = create_long_format(postgres_engine=postgres_engine, context=context)
     wide_format = create_wide_format(
         postgres_engine=postgres_engine,
         long_format=long_format,
+        context=context,
     )
-    actionable_col = _get_actionable_aggs_for_long_format(postgres_engine)
+    actionable_col = _get_actionable_aggs_for_long_format(postgres_engine, context)
     long_format = long_format.merge(
         actionable_col,
         on=["county_id_fips", "resource_or_sector", "facility_type", "status"],
@@ -5,8 +5,9 @@ from typing import Optional
 import pandas as pd
 import sqlalchemy as sa
 
+from dbcp.data_mart.helpers import DataMartContext
 from dbcp.data_mart.projects import get_eia860m_current
-from dbcp.helpers import get_sql_engine
+from dbcp.helpers import get_sql_engine, read_sql_arrow
 
 
 def _get_concrete_aggs(engine: sa.engine.Engine) -> pd.DataFrame:
@@ -58,7 +59,7 @@ def _get_concrete_aggs(engine: sa.engine.Engine) -> pd.DataFrame:
         inplace=True,
     )
 
-    acp = pd.read_sql_table("acp_projects", engine, schema="private_data_warehouse")
+    acp = read_sql_arrow("SELECT * FROM private_data_warehouse.acp_projects", engine)
     acp = acp[
         [
             "plant_id_eia",
@@ -98,11 +99,11 @@ def _get_concrete_aggs(engine: sa.engine.Engine) -> pd.DataFrame:
         .add(out["capacity_under_construction_mw"].fillna(0.0))
     )
     # bring in standardized state and county names
-    sfips = pd.read_sql(
+    sfips = read_sql_arrow(
         "SELECT state_id_fips, state_name as state FROM data_warehouse.state_fips",
         engine,
     )
-    cfips = pd.read_sql(
+    cfips = read_sql_arrow(
         "SELECT county_id_fips, county_name as county FROM data_warehouse.county_fips",
         engine,
     )
@@ -119,11 +120,14 @@ def _get_concrete_aggs(engine: sa.engine.Engine) -> pd.DataFrame:
 
 def create_data_mart(
     engine: Optional[sa.engine.Engine] = None,
+    context: Optional[DataMartContext] = None,
 ) -> pd.DataFrame:
     """API function to create the table of project aggregates.
 
     Args:
         engine (Optional[sa.engine.Engine], optional): database connection. Defaults to None.
+        context (Optional[DataMartContext], optional): intermediate tables shared
+            with the other data marts. Defaults to None.
 
     Returns:
         pd.DataFrame: Dataframe of EIA860m and ACP projects.
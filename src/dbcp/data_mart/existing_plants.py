@@ -4,17 +4,21 @@ from typing import Optional
 import pandas as pd
 import sqlalchemy as sa
 
-from dbcp.data_mart.counties import _get_existing_plants
+from dbcp.data_mart.counties import get_existing_plants
+from dbcp.data_mart.helpers import DataMartContext
 from dbcp.helpers import get_sql_engine
 
 
 def create_data_mart(
     engine: Optional[sa.engine.Engine] = None,
+    context: Optional[DataMartContext] = None,
 ) -> pd.DataFrame:
     """Create table of existing plants from pudl_generators generators.
 
     Args:
         engine (Optional[sa.engine.Engine], optional): postgres engine. Defaults to None.
+        context (Optional[DataMartContext], optional): intermediate tables shared
+            with the other data marts. Defaults to None.
 
     Returns:
         pd.DataFrame: table of plants
@@ -23,5 +27,5 @@ def create_data_mart(
     if postgres_engine is None:
         postgres_engine = get_sql_engine()
 
-    plants = _get_existing_plants(postgres_engine=postgres_engine)
+    plants = get_existing_plants(postgres_engine, context)
     return plants
@@ -5,13 +5,13 @@ from typing import Optional
 import pandas as pd
 import sqlalchemy as sa
 
-from dbcp.data_mart.helpers import get_query
-from dbcp.helpers import get_sql_engine
+from dbcp.data_mart.helpers import DataMartContext, get_query
+from dbcp.helpers import get_sql_engine, read_sql_arrow
 
 
 def _get_proposed_infra_projects(engine: sa.engine.Engine) -> pd.DataFrame:
     query = get_query("get_proposed_infra_projects.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     # fix columns with mixed dtypes that break pyarrow and parquet (via pandas_gbq)
     df.loc[:, "is_ally_target"] = df.loc[:, "is_ally_target"].astype(str)
     return df
@@ -19,11 +19,14 @@ def _get_proposed_infra_projects(engine: sa.engine.Engine) -> pd.DataFrame:
 
 def create_data_mart(
     engine: Optional[sa.engine.Engine] = None,
+    context: Optional[DataMartContext] = None,
 ) -> pd.DataFrame:
     """API function to create the table of proposed fossil infrastructure projects.
 
     Args:
         engine (Optional[sa.engine.Engine], optional): database connection. Defaults to None.
+        context (Optional[DataMartContext], optional): intermediate tables shared
+            with the other data marts. Defaults to None.
 
     Returns:
         pd.DataFrame: Dataframe of proposed fossil infrastructure projects.
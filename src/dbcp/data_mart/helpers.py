@@ -1,19 +1,20 @@
 """Module of helper functions for creating data mart tables from the data warehouse."""
 
+import threading
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import Callable, Hashable, Optional, Sequence
 
 import pandas as pd
 import sqlalchemy as sa
 
-from dbcp.helpers import get_sql_engine
+from dbcp.helpers import get_sql_engine, read_sql_arrow
 
 
 def _subset_db_columns(
     columns: Sequence[str], table: str, engine: sa.engine.Engine
 ) -> pd.DataFrame:
     query = f"SELECT {', '.join(columns)} FROM {table}"
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     return df
 
 
@@ -89,7 +90,7 @@ class CountyOpposition(object):
             "36",  # New York (pro-renewables policy)
         )
         query = f"SELECT {', '.join(cols)} FROM {table} WHERE state_id_fips NOT IN {states_to_exclude}"
-        df = pd.read_sql(query, self._engine)
+        df = read_sql_arrow(query, self._engine)
         return df
 
     def _represent_state_policy_as_local_ordinances(self) -> pd.DataFrame:
@@ -191,12 +192,12 @@ class CountyOpposition(object):
         -- Use WHERE geocoded_locality_type = 'county' to restrict to whole-county bans.
         GROUP BY county_id_fips
         """
-        df = pd.read_sql(query, self._engine)
+        df = read_sql_arrow(query, self._engine)
         return df
 
     def _get_manual_ordinances(self) -> pd.DataFrame:
-        df = pd.read_sql_table(
-            "manual_ordinances", self._engine, schema="data_warehouse"
+        df = read_sql_arrow(
+            "SELECT * FROM data_warehouse.manual_ordinances", self._engine
         )
         return df
 
@@ -229,6 +230,81 @@ class CountyOpposition(object):
         return aggregated
 
 
+class DataMartContext(object):
+    """Intermediate tables shared by the data marts of a single run.
+
+    Many data marts are built from the same expensive intermediate tables, like the
+    ISO projects long format. The context creates each of them once per run and hands
+    out copies, so callers are free to modify what they get. It can be shared by
+    data marts running in different threads: if several threads request the same
+    table, one creates it while the others wait.
+    """
+
+    def __init__(self, engine: Optional[sa.engine.Engine] = None) -> None:
+        """Initialize a DataMartContext object.
+
+        Args:
+            engine: postgres engine of the data warehouse. Defaults to a new engine.
+        """
+        self.engine = engine if engine is not None else get_sql_engine()
+        self._tables: dict[Hashable, pd.DataFrame] = {}
+        self._locks: dict[Hashable, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def get_or_create(
+        self, key: Hashable, create: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Get a copy of a shared table, creating it the first time it is requested.
+
+        Args:
+            key: a unique identifier of the table, including any parameters it
+                depends on.
+            create: function that creates the table.
+
+        Returns:
+            a copy of the table.
+        """
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._tables:
+                self._tables[key] = create()
+            return self._tables[key].copy()
+
+    def county_fips_df(self) -> pd.DataFrame:
+        """Get the data_warehouse.county_fips table."""
+        return self.get_or_create(
+            "county_fips", lambda: _get_county_fips_df(self.engine)
+        )
+
+    def state_fips_df(self) -> pd.DataFrame:
+        """Get the data_warehouse.state_fips table."""
+        return self.get_or_create("state_fips", lambda: _get_state_fips_df(self.engine))
+
+    def county_opposition(
+        self,
+        include_state_policies=True,
+        include_nrel_bans=False,
+        include_manual_ordinances=False,
+    ) -> pd.DataFrame:
+        """Get county-level opposition, see CountyOpposition.agg_to_counties."""
+        kwargs = dict(
+            include_state_policies=include_state_policies,
+            include_nrel_bans=include_nrel_bans,
+            include_manual_ordinances=include_manual_ordinances,
+        )
+
+        def create() -> pd.DataFrame:
+            aggregator = CountyOpposition(
+                engine=self.engine,
+                county_fips_df=self.county_fips_df(),
+                state_fips_df=self.state_fips_df(),
+            )
+            return aggregator.agg_to_counties(**kwargs)
+
+        return self.get_or_create(("county_opposition", *kwargs.values()), create)
+
+
 def _add_emissions_factors(
     fuel_df: pd.DataFrame, fuel_type_col: str = "fuel_type_code_pudl"
 ) -> None:
@@ -10,13 +10,11 @@ import pandas as pd
 import sqlalchemy as sa
 
 from dbcp.data_mart.helpers import (
-    CountyOpposition,
+    DataMartContext,
     _estimate_proposed_power_co2e,
-    _get_county_fips_df,
-    _get_state_fips_df,
     get_query,
 )
-from dbcp.helpers import get_sql_engine
+from dbcp.helpers import get_sql_engine, read_sql_arrow
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +25,7 @@ GS_REGIONS = ("MISO", "NYISO", "ISONE", "PJM", "ERCOT", "SPP")
 def _get_gridstatus_projects(engine: sa.engine.Engine) -> pd.DataFrame:
     # drops transmission projects
     query = get_query("get_gridstatus_projects.sql")
-    gs = pd.read_sql(query, engine)
+    gs = read_sql_arrow(query, engine)
     gs = gs[gs.iso_region.str.upper().isin(GS_REGIONS)]
     return gs
 
@@ -65,7 +63,7 @@ def _merge_lbnl_with_gridstatus(lbnl: pd.DataFrame, gs: pd.DataFrame) -> pd.Data
 
 def _get_lbnl_projects(engine: sa.engine.Engine, non_iso_only=True) -> pd.DataFrame:
     query = get_query("get_lbnl_projects.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     if non_iso_only:
         df = df[~df.iso_region.isin(GS_REGIONS)]
     return df.drop(columns=["raw_county_name"])
@@ -116,7 +114,7 @@ def _get_proprietary_proposed_offshore(engine: sa.engine.Engine) -> pd.DataFrame
     Otherwise they will be double-counted.
     """
     query = get_query("get_proprietary_proposed_offshore.sql")
-    df = pd.read_sql(query, engine)
+    df = read_sql_arrow(query, engine)
     return df
 
 
@@ -330,6 +328,7 @@ def create_long_format(
     engine: sa.engine.Engine,
     active_projects_only: bool = True,
     use_proprietary_offshore: bool = True,
+    context: Optional[DataMartContext] = None,
 ) -> pd.DataFrame:
     """Create table of ISO projects in long format.
 
@@ -344,21 +343,46 @@ def create_long_format(
         engine: postgres database engine
         active_projects_only: If we only want active projects, grab active projects and
             remove withdrawn_date and actual_completion_date.
+        use_proprietary_offshore: whether to include the proprietary offshore wind
+            projects.
+        context: intermediate tables shared by the data marts of this run. The long
+            format of all projects is only created once per context.
 
     Returns:
         long format table of ISO projects
     """
+    if context is None:
+        context = DataMartContext(engine)
+    long_format = context.get_or_create(
+        ("iso_long_format", use_proprietary_offshore),
+        lambda: _create_all_projects_long_format(
+            engine, use_proprietary_offshore, context
+        ),
+    )
+
+    # If we only want active projects, grab active projects and remove withdrawn_date and actual_completion_date
+    if active_projects_only:
+        active_long_format = long_format.query("queue_status == 'active'")
+        # drop actual_completion_date and withdrawn_date columns
+        active_long_format = active_long_format.drop(
+            columns=["actual_completion_date", "withdrawn_date"]
+        )
+        return active_long_format
+    return long_format
+
+
+def _create_all_projects_long_format(
+    engine: sa.engine.Engine,
+    use_proprietary_offshore: bool,
+    context: DataMartContext,
+) -> pd.DataFrame:
+    """Create the long format table of all ISO projects, see create_long_format."""
     iso = _get_and_join_iso_tables(
         engine, use_gridstatus=True, use_proprietary_offshore=use_proprietary_offshore
     )
-    all_counties = _get_county_fips_df(engine)
-    all_states = _get_state_fips_df(engine)
 
     # model local opposition
-    aggregator = CountyOpposition(
-        engine=engine, county_fips_df=all_counties, state_fips_df=all_states
-    )
-    combined_opp = aggregator.agg_to_counties(
+    combined_opp = context.county_opposition(
         include_state_policies=False,
         include_nrel_bans=True,
         include_manual_ordinances=True,
@@ -375,15 +399,6 @@ def create_long_format(
     )
     _add_derived_columns(long_format)
     long_format["surrogate_id"] = range(len(long_format))
-
-    # If we only want active projects, grab active projects and remove withdrawn_date and actual_completion_date
-    if active_projects_only:
-        active_long_format = long_format.query("queue_status == 'active'")
-        # drop actual_completion_date and withdrawn_date columns
-        active_long_format = active_long_format.drop(
-            columns=["actual_completion_date", "withdrawn_date"]
-        )
-        return active_long_format
     return long_format
 
 
@@ -401,84 +416,81 @@ def create_total_active_project_change_logs(
 
     If a project entered and left the queue within the frequency it is not included in the aggregation.
 
+    A project is active at every period end date between its effective_date and
+    end_date. Rather than generating those dates for every project with
+    pd.date_range, each project's first and last active periods are computed at once
+    and its rows are repeated for the periods in between.
+
     Args:
         active_iso_projects_change_log: dataframe where each row is a project that entered the queue.
         geography: the geography to aggregate by
         metric: the metric to aggregate by
-        freq: the frequency to aggregate by
+        freq: the frequency to aggregate by. Must be a period frequency like "Q",
+            "M" or "W". The report dates are the last day of each period.
     Returns:
         totals_chng_log: dataframe where each row contains the total active capacity or number of projects for a given region and time interval.
     """
     assert active_iso_projects_change_log.queue_status.eq(
         "new"
     ).all(), "Found rows with unexpected queue status."
+    if metric not in ("capacity_mw", "n_projects"):
+        raise ValueError(f"{metric} is not a valid aggregation metric.")
 
-    chng_log = active_iso_projects_change_log.copy()
-    min_date = chng_log.effective_date.min() - pd.offsets.QuarterBegin(startingMonth=1)
-    max_date = chng_log.effective_date.max() + pd.offsets.QuarterEnd(0)
-
-    def generate_frequencies(start, end, min_date, max_date, freq="Q"):
-        """
-        Generate a list of dates between start and end at a given frequency.
-
-        If end is missing, it is set to max_date. End is null when the project is still active.
-        If start is missing, it is set to min_date. There are only 5 projects with missing start dates.
-
-        Args:
-            start: the start date
-            end: the end date
-            min_date: the minimum date in the dataset
-            max_date: the maximum date in the dataset
-            freq: the frequency to generate dates at
-        Returns:
-            periods: a list of dates between start and end at a given frequency
-        """
-        if pd.isna(start):
-            start = min_date
-        if pd.isna(end):
-            end = max_date
-
-        periods = pd.date_range(start=start, end=end, freq=freq, normalize=True)
-        return periods
-
-    chng_log["report_date"] = chng_log.apply(
-        lambda row: generate_frequencies(
-            row["effective_date"],
-            row["end_date"],
-            min_date=min_date,
-            max_date=max_date,
-            freq=freq,
-        ),
-        axis=1,
+    # Projects missing a start date are active from the quarter before the earliest
+    # start date, projects that are still active until the latest start date's quarter.
+    min_date = (
+        active_iso_projects_change_log.effective_date.min()
+        - pd.offsets.QuarterBegin(startingMonth=1)
+    )
+    max_date = (
+        active_iso_projects_change_log.effective_date.max() + pd.offsets.QuarterEnd(0)
     )
 
-    exploded_chng_log = chng_log.explode("report_date")
-
+    group_keys = [geography, "resource_class"]
+    chng_log = active_iso_projects_change_log.dropna(subset=group_keys)
     assert (
-        ~exploded_chng_log[["surrogate_id", "queue_status", "report_date"]].duplicated(
-            keep=False
-        )
-    ).all(), "Exploded change log keys are not unique."
+        ~chng_log[["surrogate_id", "queue_status"]].duplicated(keep=False)
+    ).all(), "Change log keys are not unique."
+
+    start = chng_log.effective_date.fillna(min_date).dt.normalize()
+    end = chng_log.end_date.fillna(max_date).dt.normalize()
+    # A period counts if its last day is between the start and end dates
+    first_period = pd.PeriodIndex(start.dt.to_period(freq)).asi8
+    end_period = end.dt.to_period(freq)
+    last_period = pd.PeriodIndex(end_period).asi8 - (
+        end_period.dt.end_time.dt.normalize() != end
+    ).to_numpy(dtype=int)
+    is_counted = last_period >= first_period
+
+    # Sum the active projects of each period directly, in their original order,
+    # rather than with a running sum of additions and subtractions. Floating point
+    # cancellation would make the running sums differ in the last bits.
+    n_periods = np.where(is_counted, last_period - first_period + 1, 0)
+    rows = np.repeat(np.arange(len(chng_log)), n_periods)
+    period_starts = np.repeat(np.cumsum(n_periods) - n_periods, n_periods)
+    active = pd.DataFrame(
+        {
+            geography: chng_log[geography].to_numpy()[rows],
+            "resource_class": chng_log["resource_class"].to_numpy()[rows],
+            "period": first_period[rows] + np.arange(len(rows)) - period_starts,
+            "capacity_mw": chng_log["capacity_mw"].to_numpy()[rows],
+        }
+    )
+    grp = active.groupby(group_keys + ["period"])
+    totals = (
+        grp["capacity_mw"].sum().to_frame().assign(n_projects=grp.size()).reset_index()
+    )
 
-    group_keys = [
-        geography,
-        "report_date",
-        "resource_class",
-    ]
-    totals_chng_log = pd.DataFrame()
-    if metric == "capacity_mw":
-        totals_chng_log = (
-            exploded_chng_log.groupby(group_keys).capacity_mw.sum().reset_index()
-        )
-    elif metric == "n_projects":
-        totals_chng_log = (
-            exploded_chng_log.groupby(group_keys)
-            .surrogate_id.count()
-            .reset_index()
-            .rename(columns={"surrogate_id": "n_projects"})
-        )
+    if len(totals):
+        first = totals["period"].min()
+        report_dates = pd.period_range(
+            start=pd.Period(ordinal=first, freq=freq),
+            periods=totals["period"].max() - first + 1,
+        ).end_time.normalize()
+        totals["report_date"] = report_dates[totals["period"] - first]
     else:
-        raise ValueError(f"{metric} is not a valid aggregation metric.")
+        totals["report_date"] = pd.Series(dtype="datetime64[ns]")
+    totals_chng_log = totals[[geography, "report_date", "resource_class", metric]]
 
     totals_chng_log = totals_chng_log.pivot_table(
         index=[geography, "report_date"],
@@ -816,18 +828,71 @@ def get_eia860m_current(engine: sa.engine.Engine) -> pd.DataFrame:
         engine (sa.engine.Engine): connection to the data warehouse database
     """
     query = get_query("get_eia860m_current.sql")
-    current_projects = pd.read_sql(query, engine)
+    current_projects = read_sql_arrow(query, engine)
     return current_projects
 
 
-def get_eia860m_status_history(engine: sa.engine.Engine) -> pd.DataFrame:
-    """Get the EIA860M status for each project for each of the past 12 quarters.
+def _sample_status_history(
+    status_history: pd.DataFrame, dates: pd.DatetimeIndex
+) -> pd.DataFrame:
+    """Get the status of each generator on each date.
+
+    Each status interval is matched to the dates it contains with a binary search over
+    the sorted dates, so the cost scales with the number of matches rather than
+    intervals times dates.
+
+    Args:
+        status_history: one row per generator status, with plant_id_eia,
+            generator_id, operational_status_code and the inclusive start_date and
+            end_date of the status.
+        dates: the dates to sample the statuses on.
+
+    Returns:
+        a dense table with the operational_status_code of every generator on every
+        date that any generator has a status for. Generators without a status on a
+        date have a null status.
+    """
+    gen_key = ["plant_id_eia", "generator_id"]
+    idx_cols = gen_key + ["quarter_end"]
+    dates = dates.sort_values()
+    first = dates.searchsorted(status_history["start_date"].to_numpy(), side="left")
+    stop = dates.searchsorted(status_history["end_date"].to_numpy(), side="right")
+    n_matches = np.clip(stop - first, 0, None)
+    match_starts = np.repeat(np.cumsum(n_matches) - n_matches, n_matches)
+    offsets = np.arange(n_matches.sum()) - match_starts
+
+    matches = status_history.iloc[np.repeat(np.arange(len(status_history)), n_matches)]
+    matches = matches.reset_index(drop=True)
+    matches["quarter_end"] = dates[np.repeat(first, n_matches) + offsets]
+
+    # some duplicates are caused by NULL values in the valid_until_date coming from
+    # PUDL, which is a bug. The coalesce() function in the SQL query then sets them to
+    # end_date, which is usually, but not always, appropriate.
+    # I resolve these by selecting the value with the latest start_date.
+    dedupe = matches.sort_values(
+        idx_cols + ["start_date"], kind="stable"
+    ).drop_duplicates(subset=idx_cols, keep="last")
+
+    # convert timeseries from sparse to dense; fill with null.
+    generators = dedupe[gen_key].drop_duplicates().sort_values(gen_key)
+    quarters = pd.DataFrame({"quarter_end": np.sort(dedupe["quarter_end"].unique())})
+    out = generators.merge(quarters, how="cross").merge(
+        dedupe.drop(columns=["start_date", "end_date"]), on=idx_cols, how="left"
+    )
+    return out
+
+
+def get_eia860m_status_history(
+    engine: sa.engine.Engine, n_quarters: int = 12
+) -> pd.DataFrame:
+    """Get the EIA860M status for each project for each of the past n_quarters quarters.
 
     Args:
         engine (sa.engine.Engine): connection to the data warehouse database
+        n_quarters (int): number of quarters of history to include. Defaults to 12.
     """
     end_date = (
-        pd.read_sql(
+        read_sql_arrow(
             "SELECT max(valid_until_date) FROM data_warehouse.pudl_eia860m_changelog",
             engine,
         )
@@ -843,57 +908,18 @@ def get_eia860m_status_history(engine: sa.engine.Engine) -> pd.DataFrame:
         max(COALESCE(valid_until_date, timestamp '{end_date}')) as end_date
     FROM data_warehouse.pudl_eia860m_changelog
     GROUP BY 1,2,3
-    ORDER BY 1,2,3,4  -- must be sorted by date for the pandas groupby.first() to work
     """
-    status_history = pd.read_sql(query, engine)
+    status_history = read_sql_arrow(query, engine)
     # The date fields are literally the first day of each month but in reality they
-    # represent the whole month. I want to convert them to intervals, but first I need
-    # to change end_date to the last day of the month.
+    # represent the whole month, so change end_date to the last day of the month.
     status_history["end_date"] += pd.offsets.MonthEnd()
-    date_intervals = pd.IntervalIndex.from_arrays(
-        status_history["start_date"], status_history["end_date"], closed="both"
-    )
-    status_history.set_index(date_intervals, inplace=True)
 
     # create quarterly timeseries
     end_date_adjusted = pd.Timestamp(end_date) + pd.offsets.MonthEnd()
-    quarter_end_dates = pd.date_range(end=end_date_adjusted, periods=12, freq="Q")
-    gen_key = ["plant_id_eia", "generator_id"]
-    quarterly = pd.concat(
-        (
-            status_history.loc[date, :].assign(quarter_end=date)
-            for date in quarter_end_dates
-        ),
-        ignore_index=True,  # intervals no longer needed
-    )
-    idx_cols = gen_key + ["quarter_end"]
-    quarterly.sort_values(idx_cols, inplace=True)
-    quarterly.reset_index(inplace=True, drop=True)
-
-    # some duplicates are caused by NULL values in the valid_until_date coming from
-    # PUDL, which is a bug. The coalesce() function in the SQL query then sets them to
-    # end_date, which is usually, but not always, appropriate.
-    # I resolve these by selecting the value with the latest start_date.
-    dupes = quarterly.duplicated(subset=idx_cols, keep=False)
-    # groupby is slow, so I subset to the duplicates, analyze them, then drop the
-    # offending records
-    is_last_start_date = (
-        quarterly.loc[dupes, :]
-        .groupby(idx_cols, as_index=False)["start_date"]
-        .transform(lambda x: x.eq(x.max()))
-        .squeeze()
+    quarter_end_dates = pd.date_range(
+        end=end_date_adjusted, periods=n_quarters, freq="Q"
     )
-    idxs_to_drop = is_last_start_date.index[~is_last_start_date]
-    dedupe = quarterly.drop(idxs_to_drop, axis=0)
-
-    # convert timeseries from sparse to dense; fill with null.
-    out = (
-        dedupe.drop(columns=["start_date", "end_date"])
-        .set_index(idx_cols)
-        .unstack()
-        .stack(dropna=False)
-    )
-    out.reset_index(inplace=True)
+    out = _sample_status_history(status_history, quarter_end_dates)
 
     # add plant names
     eia860m_plant_names = _get_plant_names(engine)
@@ -919,7 +945,7 @@ def _get_eia860m_transition_dates(engine: sa.engine.Engine) -> pd.DataFrame:
     group by 1,2,3
     order by 1,2,3
     """
-    transition_dates = pd.read_sql(query, engine)
+    transition_dates = read_sql_arrow(query, engine)
     # reshape to wide format
     transition_dates = transition_dates.pivot(
         index=["plant_id_eia", "generator_id"],
@@ -941,7 +967,7 @@ def _get_plant_names(
     """Get the most recent EIA860M data."""
     if not date_as_of:  # get most recent data
         date_as_of = (
-            pd.read_sql(
+            read_sql_arrow(
                 "SELECT max(valid_until_date) FROM data_warehouse.pudl_eia860m_changelog",
                 engine,
             )
@@ -959,7 +985,7 @@ def _get_plant_names(
     FROM data_warehouse.pudl_eia860m_changelog
     ORDER BY 1, valid_until_date DESC NULLS FIRST -- nulls are the most recent
     """
-    plant_names = pd.read_sql(query, engine)
+    plant_names = read_sql_arrow(query, engine)
     return plant_names
 
 
@@ -1025,12 +1051,17 @@ def _create_status_codes() -> pd.DataFrame:
 
 def create_data_mart(
     engine: Optional[sa.engine.Engine] = None,
+    context: Optional[DataMartContext] = None,
 ) -> dict[str, pd.DataFrame]:
     """Create projects datamart dataframe."""
     if engine is None:
         engine = get_sql_engine()
+    if context is None:
+        context = DataMartContext(engine)
 
-    all_projects_long_format = create_long_format(engine, active_projects_only=False)
+    all_projects_long_format = create_long_format(
+        engine, active_projects_only=False, context=context
+    )
     iso_projects_change_log = create_project_change_log(all_projects_long_format)
 
     # create counties and region change log tables
@@ -1061,7 +1092,9 @@ def create_data_mart(
         data_marts["iso_regions_all_projects_change_log"], all_projects_long_format
     )
 
-    active_long_format = create_long_format(engine, active_projects_only=True)
+    active_long_format = create_long_format(
+        engine, active_projects_only=True, context=context
+    )
     active_wide_format = _convert_long_to_wide(active_long_format)
 
     eia860m_current = get_eia860m_current(engine)
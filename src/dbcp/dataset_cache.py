@@ -0,0 +1,256 @@
+"""Persist transformed datasets so unchanged sources can skip extract and transform."""
+
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Optional, Sequence, Union
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path: Union[str, Path], chunk_size: int = 2**20) -> str:
+    """Compute the sha256 hex digest of a file's contents.
+
+    Args:
+        path: path to the file to hash.
+        chunk_size: number of bytes to read at a time.
+
+    Returns:
+        the hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_module_source(module: ModuleType) -> str:
+    """Compute the sha256 hex digest of a python module's source file."""
+    return hash_file(module.__file__)
+
+
+def combine_fingerprints(*parts: str) -> str:
+    """Combine multiple fingerprints into a single one.
+
+    The order of the parts matters.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")  # separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """A directory of transformed datasets saved as parquet files.
+
+    Each dataset is stored in its own subdirectory along with the fingerprint of the
+    inputs and code that produced it. A cached dataset is only returned if its
+    fingerprint matches the requested one, unless no fingerprint is requested.
+    """
+
+    FINGERPRINT_FILE = "fingerprint.json"
+
+    def __init__(self, location: Union[str, Path]):
+        """Initialize a DatasetCache object.
+
+        Args:
+            location: the directory to store cached datasets in.
+        """
+        self.location = Path(location)
+
+    def get(
+        self, dataset: str, fingerprint: Optional[str] = None
+    ) -> Optional[dict[str, pd.DataFrame]]:
+        """Load a cached dataset.
+
+        Args:
+            dataset: the name of the dataset.
+            fingerprint: the fingerprint of the dataset's current inputs and code. If
+                None, return the cached dataset regardless of how it was produced.
+
+        Returns:
+            the cached dataframes, or None if the dataset isn't cached or is stale.
+        """
+        dataset_dir = self.location / dataset
+        try:
+            with open(dataset_dir / self.FINGERPRINT_FILE, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if fingerprint is not None and manifest["fingerprint"] != fingerprint:
+            return None
+        return {
+            table: pd.read_parquet(dataset_dir / f"{table}.parquet", engine="pyarrow")
+            for table in manifest["tables"]
+        }
+
+    def __contains__(self, dataset: str) -> bool:
+        """Whether any version of a dataset is cached, without loading it."""
+        return (self.location / dataset / self.FINGERPRINT_FILE).exists()
+
+    def put(
+        self, dataset: str, fingerprint: Optional[str], dfs: dict[str, pd.DataFrame]
+    ) -> bool:
+        """Save a dataset's dataframes to the cache, replacing any previous version.
+
+        Not every dataframe can be round tripped through parquet, for example ones
+        with mixed type object columns. In that case the dataset isn't cached.
+
+        Args:
+            dataset: the name of the dataset.
+            fingerprint: the fingerprint of the dataset's inputs and code.
+            dfs: the dataset's transformed dataframes.
+
+        Returns:
+            whether the dataset was cached.
+        """
+        dataset_dir = self.location / dataset
+        tmp_dir = self.location / f".{dataset}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        try:
+            for table, df in dfs.items():
+                df.to_parquet(tmp_dir / f"{table}.parquet", engine="pyarrow")
+        except (ValueError, TypeError, NotImplementedError) as e:
+            # pyarrow.ArrowInvalid and ArrowTypeError are subclasses of these
+            logger.warning(f"Unable to cache {dataset}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        with open(tmp_dir / self.FINGERPRINT_FILE, "w") as f:
+            json.dump({"fingerprint": fingerprint, "tables": list(dfs)}, f)
+
+        # swap in the new version in one step so a crash never leaves a partial dataset
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        tmp_dir.rename(dataset_dir)
+        return True
+
+    def clear(self) -> None:
+        """Delete all cached datasets."""
+        shutil.rmtree(self.location, ignore_errors=True)
+
+
+class SpatialCache:
+    """A directory of spatial computation results saved as parquet files.
+
+    Results are addressed by a key made from the function name, the function version
+    and the identities of its source archives (eg. 'gs://bucket/file.zip#generation'),
+    so a lookup never has to hash the input geometries. Bump the function version
+    whenever the computation changes. Only the latest result of each function is kept.
+    """
+
+    def __init__(self, location: Union[str, Path]):
+        """Initialize a SpatialCache object.
+
+        Args:
+            location: the directory to store cached results in.
+        """
+        self.location = Path(location)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(name: str, version: Union[int, str], sources: Sequence[str]) -> str:
+        """Create the key of a function's result.
+
+        Args:
+            name: the name of the function.
+            version: the version of the function.
+            sources: identities of the source archives the inputs were read from.
+
+        Returns:
+            the key of the result.
+        """
+        return combine_fingerprints(name, str(version), *sources)
+
+    def _path(self, name: str, key: str) -> Path:
+        return self.location / f"{name}-{key}.parquet"
+
+    def get(self, name: str, key: str) -> Optional[pd.DataFrame]:
+        """Load a cached result.
+
+        Args:
+            name: the name of the function.
+            key: the key of the result, from SpatialCache.key().
+
+        Returns:
+            the cached result, or None if it isn't cached.
+        """
+        path = self._path(name, key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        if b"geo" in (pq.read_schema(path).metadata or {}):
+            return gpd.read_parquet(path)
+        return pd.read_parquet(path, engine="pyarrow")
+
+    def put(self, name: str, key: str, df: pd.DataFrame) -> bool:
+        """Save a result to the cache, replacing previous results of the function.
+
+        Args:
+            name: the name of the function.
+            key: the key of the result, from SpatialCache.key().
+            df: the result.
+
+        Returns:
+            whether the result was cached.
+        """
+        path = self._path(name, key)
+        partial = path.with_name(path.name + ".part")
+        self.location.mkdir(parents=True, exist_ok=True)
+        try:
+            df.to_parquet(partial)
+        except (ValueError, TypeError, NotImplementedError) as e:
+            logger.warning(f"Unable to cache {name}: {e}")
+            partial.unlink(missing_ok=True)
+            return False
+        for stale in self.location.glob(f"{name}-*.parquet"):
+            stale.unlink()
+        partial.rename(path)
+        return True
+
+    def get_or_compute(
+        self,
+        name: str,
+        version: Union[int, str],
+        sources: Sequence[str],
+        compute: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Load a cached result, or compute and cache it.
+
+        Args:
+            name: the name of the function.
+            version: the version of the function.
+            sources: identities of the source archives the inputs were read from.
+            compute: computes the result if it isn't cached.
+
+        Returns:
+            the result.
+        """
+        key = self.key(name, version, sources)
+        df = self.get(name, key)
+        if df is not None:
+            logger.info(f"Loaded {name} from the spatial cache.")
+            return df
+        df = compute()
+        self.put(name, key, df)
+        return df
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """The number of cache hits and misses in this process."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """Delete all cached results."""
+        shutil.rmtree(self.location, ignore_errors=True)
@@ -1,31 +1,93 @@
 """The ETL module create the data warehouse tables."""
 
+import importlib
+import inspect
 import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Callable, Dict
+from typing import Callable, Dict, Iterable, Iterator, Optional, Union
 
+import addfips
 import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 import sqlalchemy as sa
 
 import dbcp
 from dbcp.archivers.utils import ExtractionSettings
 from dbcp.constants import OUTPUT_DIR
-from dbcp.extract.fips_tables import CENSUS_URI, TRIBAL_LANDS_URI
+from dbcp.dataset_cache import (
+    DatasetCache,
+    combine_fingerprints,
+    hash_file,
+    hash_module_source,
+)
+from dbcp.extract.fips_tables import (
+    CENSUS_URI,
+    GAZETTEER_COUSUBS_URI,
+    GAZETTEER_PLACES_URI,
+    TRIBAL_LANDS_URI,
+)
+from dbcp.extract.gridstatus_isoqueues import ISO_QUEUE_VERSIONS
 from dbcp.extract.ncsl_state_permitting import NCSLScraper
-from dbcp.helpers import enforce_dtypes, psql_insert_copy
-from dbcp.transform.fips_tables import SPATIAL_CACHE
-from dbcp.transform.helpers import GEOCODER_CACHE
+from dbcp.extract.pudl_data import PUDL_RESOURCES
+from dbcp.transform.geocoding import log_geocoding_summary, record_geocoding_stats
 from dbcp.validation.tests import validate_warehouse
 
 logger = logging.getLogger(__name__)
 
+# cache needs to be accessed outside this module to call .clear()
+DATASET_CACHE = DatasetCache(location=Path("/app/data/dataset_cache"))
+# transformed datasets of an unfinished run, one subdirectory per schema
+CHECKPOINT_DIR = Path("/app/data/etl_checkpoints")
+
+EIP_INFRASTRUCTURE_PATH = Path("/app/data/raw/2023.05.24 OGW database.xlsx")
+LBNL_ISO_QUEUE_URI = "gs://dgm-archive/lbnl_iso_queue/queues_2023_clean_data.xlsx"
+COLUMBIA_LOCAL_OPP_PATH = Path(
+    "/app/data/raw/2023.05.30 Opposition to Renewable Energy Facilities - FINAL.docx"
+)
+NCSL_STATE_PERMITTING_PATH = Path("/app/data/raw/ncsl_state_permitting_wind.csv")
+JUSTICE40_PATH = Path("/app/data/raw/1.0-communities.csv")
+NREL_WIND_ORDINANCES_PATH = Path("/app/data/raw/NREL_Wind_Ordinances.xlsx")
+NREL_SOLAR_ORDINANCES_PATH = Path("/app/data/raw/NREL_Solar_Ordinances.xlsx")
+OFFSHORE_WIND_PROJECTS_ARCHIVE = (
+    "airtable/Offshore Wind Locations Synapse Version/Projects.json"
+)
+OFFSHORE_WIND_LOCATIONS_ARCHIVE = (
+    "airtable/Offshore Wind Locations Synapse Version/Locations.json"
+)
+PROTECTED_AREA_BY_COUNTY_PATH = Path("/app/data/raw/padus_intersect_counties.parquet")
+ENERGY_COMMUNITIES_BY_COUNTY_PATH = Path(
+    "/app/data/raw/rmi_energy_communities_counties.parquet"
+)
+BALLOT_READY_URI = "gs://dgm-archive/ballot_ready/Climate Partners_Upcoming Races_2025-2026_20240826.csv"
+# https://github.com/USEPA/AVERT/blob/v4.1.0/utilities/data/county-fips.txt
+AVERT_COUNTY_CROSSWALK_PATH = Path("/app/data/raw/avert_county-fips.txt")
+# https://www.epa.gov/avert/avoided-emission-rates-generated-avert
+AVERT_EMISSION_RATES_PATH = Path("/app/data/raw/avert_emission_rates_04-25-23.xlsx")
+ACP_PROJECTS_URI = "gs://dgm-archive/acp/projects_Q3_2024.csv"
+
+
+def _get_offshore_wind_uris() -> tuple[str, str]:
+    """Get the versioned URIs of the offshore wind projects and locations archives."""
+    # get the latest version of the offshore wind data from the candidate yaml file
+    es = ExtractionSettings.from_yaml("/app/dbcp/settings.yaml")
+    es.update_archive_generation_numbers()
+
+    projects_uri = es.get_full_archive_uri(OFFSHORE_WIND_PROJECTS_ARCHIVE)
+    locations_uri = es.get_full_archive_uri(OFFSHORE_WIND_LOCATIONS_ARCHIVE)
+    return projects_uri, locations_uri
+
+
+def _get_pudl_version() -> str:
+    """Get the version of the PUDL data release to extract from."""
+    return os.environ["PUDL_VERSION"]
+
 
 def etl_eip_infrastructure() -> Dict[str, pd.DataFrame]:
     """EIP Infrastructure ETL."""
     # Extract
-    source_path = Path("/app/data/raw/2023.05.24 OGW database.xlsx")
+    source_path = EIP_INFRASTRUCTURE_PATH
     eip_raw_dfs = dbcp.extract.eip_infrastructure.extract(source_path)
 
     # Transform
@@ -36,7 +98,7 @@ def etl_eip_infrastructure() -> Dict[str, pd.DataFrame]:
 
 def etl_lbnl_iso_queue() -> Dict[str, pd.DataFrame]:
     """LBNL ISO Queues ETL."""
-    lbnl_uri = "gs://dgm-archive/lbnl_iso_queue/queues_2023_clean_data.xlsx"
+    lbnl_uri = LBNL_ISO_QUEUE_URI
     lbnl_raw_dfs = dbcp.extract.lbnl_iso_queue.extract(lbnl_uri)
     lbnl_transformed_dfs = dbcp.transform.lbnl_iso_queue.transform(lbnl_raw_dfs)
 
@@ -46,9 +108,7 @@ def etl_lbnl_iso_queue() -> Dict[str, pd.DataFrame]:
 def etl_columbia_local_opp() -> Dict[str, pd.DataFrame]:
     """Columbia Local Opposition ETL."""
     # Extract
-    source_path = Path(
-        "/app/data/raw/2023.05.30 Opposition to Renewable Energy Facilities - FINAL.docx"
-    )
+    source_path = COLUMBIA_LOCAL_OPP_PATH
     extractor = dbcp.extract.local_opposition.ColumbiaDocxParser()
     extractor.load_docx(source_path)
     docx_dfs = extractor.extract()
@@ -67,7 +127,7 @@ def etl_pudl_tables() -> Dict[str, pd.DataFrame]:
 
 def etl_ncsl_state_permitting() -> Dict[str, pd.DataFrame]:
     """NCSL State Permitting for Wind ETL."""
-    source_path = Path("/app/data/raw/ncsl_state_permitting_wind.csv")
+    source_path = NCSL_STATE_PERMITTING_PATH
     if not source_path.exists():
         NCSLScraper().scrape_and_save_to_disk(source_path)
     raw_df = dbcp.extract.ncsl_state_permitting.extract(source_path)
@@ -85,14 +145,24 @@ def etl_fips_tables() -> Dict[str, pd.DataFrame]:
         TRIBAL_LANDS_URI
     )
 
-    out = dbcp.transform.fips_tables.transform(fips)
+    try:
+        # versioned archive URIs identify the inputs of the cached spatial joins
+        sources = [_fingerprint_input(uri) for uri in (CENSUS_URI, TRIBAL_LANDS_URI)]
+    except Exception as e:
+        logger.warning(f"Unable to use the spatial cache: {e}")
+        sources = None
+    # the ETL pool already keeps the CPUs busy, don't start another pool per worker
+    max_workers = 1 if _IN_ETL_POOL else None
+    out = dbcp.transform.fips_tables.transform(
+        fips, sources=sources, max_workers=max_workers
+    )
 
     return out
 
 
 def etl_justice40() -> dict[str, pd.DataFrame]:
     """ETL white house environmental justice dataset."""
-    source_path = Path("/app/data/raw/1.0-communities.csv")
+    source_path = JUSTICE40_PATH
     raw = dbcp.extract.justice40.extract(source_path)
     out = dbcp.transform.justice40.transform(raw)
     return out
@@ -100,8 +170,8 @@ def etl_justice40() -> dict[str, pd.DataFrame]:
 
 def etl_nrel_ordinances() -> dict[str, pd.DataFrame]:
     """ETL NREL state and local ordinances for wind and solar."""
-    wind_source_path = Path("/app/data/raw/NREL_Wind_Ordinances.xlsx")
-    solar_source_path = Path("/app/data/raw/NREL_Solar_Ordinances.xlsx")
+    wind_source_path = NREL_WIND_ORDINANCES_PATH
+    solar_source_path = NREL_SOLAR_ORDINANCES_PATH
     wind_raw_dfs = dbcp.extract.nrel_wind_solar_ordinances.extract(
         wind_source_path, wind_or_solar="wind"
     )
@@ -119,15 +189,7 @@ def etl_nrel_ordinances() -> dict[str, pd.DataFrame]:
 
 def etl_offshore_wind() -> dict[str, pd.DataFrame]:
     """ETL manually curated offshore wind data."""
-    # get the latest version of the offshore wind data from the candidate yaml file
-    projects_uri = "airtable/Offshore Wind Locations Synapse Version/Projects.json"
-    locations_uri = "airtable/Offshore Wind Locations Synapse Version/Locations.json"
-
-    es = ExtractionSettings.from_yaml("/app/dbcp/settings.yaml")
-    es.update_archive_generation_numbers()
-
-    projects_uri = es.get_full_archive_uri(projects_uri)
-    locations_uri = es.get_full_archive_uri(locations_uri)
+    projects_uri, locations_uri = _get_offshore_wind_uris()
 
     raw_offshore_dfs = dbcp.extract.offshore_wind.extract(
         locations_uri=locations_uri, projects_uri=projects_uri
@@ -139,7 +201,7 @@ def etl_offshore_wind() -> dict[str, pd.DataFrame]:
 
 def etl_protected_area_by_county() -> dict[str, pd.DataFrame]:
     """ETL the PAD-US intersection with TIGER county geometries."""
-    source_path = Path("/app/data/raw/padus_intersect_counties.parquet")
+    source_path = PROTECTED_AREA_BY_COUNTY_PATH
     raw_df = dbcp.extract.protected_area_by_county.extract(source_path)
     transformed = dbcp.transform.protected_area_by_county.transform(raw_df)
     return transformed
@@ -147,7 +209,7 @@ def etl_protected_area_by_county() -> dict[str, pd.DataFrame]:
 
 def etl_energy_communities_by_county() -> dict[str, pd.DataFrame]:
     """ETL RMI's energy communities analysis."""
-    source_path = Path("/app/data/raw/rmi_energy_communities_counties.parquet")
+    source_path = ENERGY_COMMUNITIES_BY_COUNTY_PATH
     raw_df = dbcp.extract.rmi_energy_communities.extract(source_path)
     transformed = dbcp.transform.rmi_energy_communities.transform(raw_df)
     return transformed
@@ -155,7 +217,7 @@ def etl_energy_communities_by_county() -> dict[str, pd.DataFrame]:
 
 def etl_ballot_ready() -> dict[str, pd.DataFrame]:
     """ETL Ballot Ready election data."""
-    source_uri = "gs://dgm-archive/ballot_ready/Climate Partners_Upcoming Races_2025-2026_20240826.csv"
+    source_uri = BALLOT_READY_URI
     raw_df = dbcp.extract.ballot_ready.extract(source_uri)
     transformed = dbcp.transform.ballot_ready.transform(raw_df)
     return transformed
@@ -163,13 +225,9 @@ def etl_ballot_ready() -> dict[str, pd.DataFrame]:
 
 def etl_epa_avert() -> dict[str, pd.DataFrame]:
     """ETL EPA AVERT avoided emissions data."""
-    # https://github.com/USEPA/AVERT/blob/v4.1.0/utilities/data/county-fips.txt
-    path_county_region_xwalk = Path("/app/data/raw/avert_county-fips.txt")
-    # https://www.epa.gov/avert/avoided-emission-rates-generated-avert
-    path_emission_rates = Path("/app/data/raw/avert_emission_rates_04-25-23.xlsx")
     raw_dfs = dbcp.extract.epa_avert.extract(
-        county_crosswalk_path=path_county_region_xwalk,
-        emission_rates_path=path_emission_rates,
+        county_crosswalk_path=AVERT_COUNTY_CROSSWALK_PATH,
+        emission_rates_path=AVERT_EMISSION_RATES_PATH,
     )
     transformed = dbcp.transform.epa_avert.transform(raw_dfs)
     return transformed
@@ -191,61 +249,491 @@ def etl_manual_ordinances() -> dict[str, pd.DataFrame]:
 
 def etl_acp_projects() -> dict[str, pd.DataFrame]:
     """ETL ACP projects."""
-    acp_uri = "gs://dgm-archive/acp/projects_Q3_2024.csv"
+    acp_uri = ACP_PROJECTS_URI
     raw_dfs = dbcp.extract.acp_projects.extract(acp_uri)
     transformed = dbcp.transform.acp_projects.transform(raw_dfs)
     return transformed
 
 
-def run_etl(funcs: dict[str, Callable], schema_name: str):
-    """Execute etl functions and save outputs to parquet and postgres."""
+ETL_DEPENDENCIES: dict[str, set[str]] = {}
+"""Datasets whose ETL functions must finish before another dataset's can start.
+
+Keys and values are dataset names from the etl_funcs dictionaries in etl(). None of the
+current sources read each other's outputs, so every dataset can run concurrently. Add
+an entry here if a transform starts depending on another dataset.
+"""
+
+
+SHARED_MODULES = [
+    "dbcp.constants",
+    "dbcp.helpers",
+    "dbcp.extract.helpers",
+    "dbcp.transform.helpers",
+    "dbcp.transform.county_matcher",
+    "dbcp.transform.gazetteer",
+    "dbcp.transform.geocoding",
+]
+"""Modules used by most datasets. Changes to them invalidate every cached dataset."""
+
+GEOCODING_INPUTS = [CENSUS_URI, GAZETTEER_PLACES_URI, GAZETTEER_COUSUBS_URI]
+"""Raw inputs of the gazetteer used by add_county_fips_with_backup_geocoding()."""
+
+DATASET_SOURCES: dict[str, dict[str, list]] = {
+    "offshore_wind": {
+        "modules": ["dbcp.extract.offshore_wind", "dbcp.transform.offshore_wind"],
+        "inputs": [_get_offshore_wind_uris, *GEOCODING_INPUTS],
+    },
+    "gridstatus": {
+        "modules": [
+            "dbcp.extract.gridstatus_isoqueues",
+            "dbcp.transform.gridstatus",
+        ],
+        "inputs": [str(sorted(ISO_QUEUE_VERSIONS.items())), *GEOCODING_INPUTS],
+    },
+    "epa_avert": {
+        "modules": ["dbcp.extract.epa_avert", "dbcp.transform.epa_avert"],
+        "inputs": [AVERT_COUNTY_CROSSWALK_PATH, AVERT_EMISSION_RATES_PATH],
+    },
+    "eip_infrastructure": {
+        "modules": [
+            "dbcp.extract.eip_infrastructure",
+            "dbcp.transform.eip_infrastructure",
+        ],
+        "inputs": [EIP_INFRASTRUCTURE_PATH, *GEOCODING_INPUTS],
+    },
+    "columbia_local_opp": {
+        "modules": [
+            "dbcp.extract.local_opposition",
+            "dbcp.transform.local_opposition",
+        ],
+        "inputs": [COLUMBIA_LOCAL_OPP_PATH, *GEOCODING_INPUTS],
+    },
+    "energy_communities_by_county": {
+        "modules": [
+            "dbcp.extract.rmi_energy_communities",
+            "dbcp.transform.rmi_energy_communities",
+        ],
+        "inputs": [ENERGY_COMMUNITIES_BY_COUNTY_PATH, *GEOCODING_INPUTS],
+    },
+    "fips_tables": {
+        "modules": ["dbcp.extract.fips_tables", "dbcp.transform.fips_tables"],
+        "inputs": [CENSUS_URI, TRIBAL_LANDS_URI, f"addfips=={addfips.__version__}"],
+    },
+    "protected_area_by_county": {
+        "modules": [
+            "dbcp.extract.protected_area_by_county",
+            "dbcp.transform.protected_area_by_county",
+        ],
+        "inputs": [PROTECTED_AREA_BY_COUNTY_PATH],
+    },
+    "justice40_tracts": {
+        "modules": ["dbcp.extract.justice40", "dbcp.transform.justice40"],
+        "inputs": [JUSTICE40_PATH],
+    },
+    "nrel_wind_solar_ordinances": {
+        "modules": [
+            "dbcp.extract.nrel_wind_solar_ordinances",
+            "dbcp.transform.nrel_wind_solar_ordinances",
+        ],
+        "inputs": [
+            NREL_WIND_ORDINANCES_PATH,
+            NREL_SOLAR_ORDINANCES_PATH,
+            *GEOCODING_INPUTS,
+        ],
+    },
+    "lbnl_iso_queue": {
+        "modules": ["dbcp.extract.lbnl_iso_queue", "dbcp.transform.lbnl_iso_queue"],
+        "inputs": [LBNL_ISO_QUEUE_URI, *GEOCODING_INPUTS],
+    },
+    "pudl": {
+        "modules": [
+            "dbcp.extract.pudl_data",
+            "dbcp.transform.pudl_data",
+            # the columns read from the generators table
+            "dbcp.metadata.data_warehouse",
+            "dbcp.extract.fips_tables",
+            "dbcp.transform.spatial",
+        ],
+        # the county shapes used to locate plants
+        "inputs": [_get_pudl_version, CENSUS_URI],
+        "pudl_resources": PUDL_RESOURCES,
+    },
+    "ncsl_state_permitting": {
+        "modules": [
+            "dbcp.extract.ncsl_state_permitting",
+            "dbcp.transform.ncsl_state_permitting",
+        ],
+        "inputs": [NCSL_STATE_PERMITTING_PATH],
+    },
+    "ballot_ready": {
+        "modules": ["dbcp.extract.ballot_ready", "dbcp.transform.ballot_ready"],
+        "inputs": [BALLOT_READY_URI],
+    },
+    "acp_projects": {
+        "modules": ["dbcp.extract.acp_projects", "dbcp.transform.acp_projects"],
+        "inputs": [ACP_PROJECTS_URI, *GEOCODING_INPUTS],
+    },
+    # manual_ordinances is read from a live BigQuery table so it can't be fingerprinted
+}
+"""The code modules and raw inputs that determine each dataset's transformed output.
+
+Datasets that read PUDL resources also list them, so they can be prefetched.
+
+Inputs can be local paths (fingerprinted by content), GCS URIs (fingerprinted by
+generation number; unpinned URIs are resolved to the latest generation), functions
+that return a string, or any other string, which is used as is.
+"""
+
+
+def _get_archive_uris(datasets: Iterable[str]) -> list[str]:
+    """Get the GCS archive URIs the datasets read, according to DATASET_SOURCES."""
+    inputs: list = []
+    for dataset in datasets:
+        inputs += DATASET_SOURCES.get(dataset, {}).get("inputs", [])
+    return sorted(
+        {
+            source_input
+            for source_input in inputs
+            if isinstance(source_input, str) and source_input.startswith("gs://")
+        }
+    )
+
+
+def _get_pudl_resources(datasets: Iterable[str]) -> list[str]:
+    """Get the PUDL resources the datasets read, according to DATASET_SOURCES."""
+    return sorted(
+        {
+            pudl_resource
+            for dataset in datasets
+            for pudl_resource in DATASET_SOURCES.get(dataset, {}).get(
+                "pudl_resources", []
+            )
+        }
+    )
+
+
+def _fingerprint_input(source_input: Union[Path, str, Callable[[], str]]) -> str:
+    """Create a fingerprint for a single raw input of a dataset."""
+    if isinstance(source_input, Path):
+        return hash_file(source_input)
+    if callable(source_input):
+        return str(source_input())
+    if source_input.startswith("gs://") and "#" not in source_input:
+        generation_num = dbcp.extract.helpers.get_gcs_archive_generation_num(
+            source_input
+        )
+        return f"{source_input}#{generation_num}"
+    return source_input
+
+
+def _fingerprint_dataset(dataset: str, etl_func: Callable) -> Optional[str]:
+    """Create a fingerprint of a dataset's raw inputs and ETL code.
+
+    Args:
+        dataset: the name of the dataset.
+        etl_func: the ETL function that produces the dataset.
+
+    Returns:
+        the fingerprint, or None if the dataset can't be fingerprinted.
+    """
+    if dataset not in DATASET_SOURCES:
+        return None
+    sources = DATASET_SOURCES[dataset]
+    module_names = SHARED_MODULES + sources["modules"]
+    try:
+        parts = [inspect.getsource(etl_func)]
+        parts += [
+            hash_module_source(importlib.import_module(name)) for name in module_names
+        ]
+        parts += [
+            _fingerprint_input(source_input) for source_input in sources["inputs"]
+        ]
+    except Exception as e:
+        # Eg. a local file that will be created by the ETL or no GCS access.
+        logger.warning(f"Unable to fingerprint {dataset}, it will be recomputed: {e}")
+        return None
+    return combine_fingerprints(*parts)
+
+
+_IN_ETL_POOL = False
+"""Whether this process is one of the worker processes started by _run_etl_funcs()."""
+
+
+def _init_etl_pool_worker() -> None:
+    """Mark a process as an ETL pool worker."""
+    global _IN_ETL_POOL
+    _IN_ETL_POOL = True
+
+
+GEOCODING_SUMMARY: dict[str, dict[str, float]] = {}
+"""Geocoding stats of each dataset that was run in this process, logged by etl()."""
+
+
+def _execute_etl_func(
+    dataset: str, etl_func: Callable, use_cache: bool = True
+) -> tuple[dict[str, pd.DataFrame], Optional[dict[str, float]]]:
+    """Run a single dataset's ETL function and log how long it took.
+
+    If use_cache is True and the dataset's inputs and code haven't changed since it was
+    last cached, the cached outputs are returned instead of running the ETL function.
+
+    This is a module level function so it can be pickled and sent to worker processes.
+
+    Returns:
+        the dataset's dataframes, and a summary of the geocoding its ETL function did,
+        or None if it didn't geocode anything.
+    """
+    logger.info(f"Processing: {dataset}")
+    start = time.monotonic()
+    fingerprint = _fingerprint_dataset(dataset, etl_func) if use_cache else None
+    if fingerprint is not None:
+        dfs = DATASET_CACHE.get(dataset, fingerprint)
+        if dfs is not None:
+            logger.info(f"Loaded unchanged {dataset} from the dataset cache.")
+            return dfs, None
+
+    with record_geocoding_stats() as geocoding_stats:
+        dfs = etl_func()
+    logger.info(f"Finished {dataset} in {time.monotonic() - start:.1f} seconds.")
+    if fingerprint is not None:
+        DATASET_CACHE.put(dataset, fingerprint, dfs)
+    geocoding_summary = geocoding_stats.to_dict()
+    return dfs, geocoding_summary if geocoding_summary["rows"] else None
+
+
+def _run_etl_funcs(  # noqa: C901
+    funcs: dict[str, Callable],
+    jobs: int = 1,
+    dependencies: Optional[dict[str, set[str]]] = None,
+    use_cache: bool = True,
+) -> Iterator[tuple[str, dict[str, pd.DataFrame]]]:
+    """Execute etl functions, yielding each dataset's outputs as soon as it finishes.
+
+    With jobs=1 the functions run serially in this process, in the order of funcs.
+    Otherwise they run in a pool of worker processes. A dataset is only submitted to
+    the pool once all of the datasets it depends on have finished.
+
+    Args:
+        funcs: mapping of dataset name to the ETL function that produces it.
+        jobs: maximum number of ETL functions to run at the same time.
+        dependencies: mapping of dataset name to the names of datasets that must
+            finish before it starts. Dependencies outside of funcs are ignored because
+            they are produced by a different run_etl call or restored from a
+            checkpoint.
+        use_cache: whether to reuse cached outputs of datasets whose inputs and code
+            haven't changed.
+
+    Yields:
+        the dataset name and the dictionary of dataframes its ETL function returned.
+        Its geocoding stats are added to GEOCODING_SUMMARY.
+    """
+    if jobs < 1:
+        raise ValueError(f"jobs must be a positive integer. Got {jobs}.")
+    dependencies = dependencies if dependencies is not None else ETL_DEPENDENCIES
+    pending = {
+        dataset: dependencies.get(dataset, set()).intersection(funcs)
+        for dataset in funcs
+    }
+
+    if jobs == 1:
+        # Respect dependencies while keeping the declared order as much as possible
+        finished: set[str] = set()
+        while pending:
+            ready = [dataset for dataset, deps in pending.items() if deps <= finished]
+            if not ready:
+                raise ValueError(
+                    f"Found circular ETL dependencies among {set(pending)}"
+                )
+            dataset = ready[0]
+            del pending[dataset]
+            dfs, geocoding_summary = _execute_etl_func(
+                dataset, funcs[dataset], use_cache
+            )
+            if geocoding_summary is not None:
+                GEOCODING_SUMMARY[dataset] = geocoding_summary
+            yield dataset, dfs
+            finished.add(dataset)
+        return
+
+    finished = set()
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_etl_pool_worker
+    ) as executor:
+        running = {}
+        while pending or running:
+            for dataset in [d for d, deps in pending.items() if deps <= finished]:
+                del pending[dataset]
+                future = executor.submit(
+                    _execute_etl_func, dataset, funcs[dataset], use_cache
+                )
+                running[future] = dataset
+            if not running:
+                raise ValueError(
+                    f"Found circular ETL dependencies among {set(pending)}"
+                )
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                dataset = running.pop(future)
+                try:
+                    dfs, geocoding_summary = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+                if geocoding_summary is not None:
+                    GEOCODING_SUMMARY[dataset] = geocoding_summary
+                finished.add(dataset)
+                yield dataset, dfs
+
+
+def _defer_foreign_keys(metadata: sa.MetaData) -> None:
+    """Make every foreign key in the metadata checked at commit instead of per row.
+
+    This lets tables be loaded in any order, as long as they are all loaded in a
+    single transaction.
+    """
+    for table in metadata.tables.values():
+        for constraint in table.foreign_key_constraints:
+            constraint.deferrable = True
+            constraint.initially = "DEFERRED"
+
+
+def _load_dataset(
+    dfs: dict[str, pd.DataFrame],
+    metadata: sa.MetaData,
+    schema_name: str,
+    con: sa.engine.Connection,
+    parquet_dir: Path,
+) -> list[str]:
+    """Load a dataset's tables into postgres and parquet.
+
+    Dataframes that don't have a table in the metadata are skipped.
+
+    Args:
+        dfs: mapping of table name to transformed dataframe.
+        metadata: the sqlalchemy metadata of the schema.
+        schema_name: the name of the database schema to load the tables to.
+        con: the connection to load the tables with.
+        parquet_dir: the directory to write the parquet files to.
+
+    Returns:
+        the names of the tables that were loaded.
+    """
+    loaded = []
+    for table_name in list(dfs):
+        if f"{schema_name}.{table_name}" not in metadata.tables:
+            continue
+        dbcp.helpers.load_table(
+            dfs.pop(table_name), table_name, schema_name, con, parquet_dir
+        )
+        loaded.append(table_name)
+    return loaded
+
+
+def run_etl(
+    funcs: dict[str, Callable],
+    schema_name: str,
+    jobs: int = 1,
+    dependencies: Optional[dict[str, set[str]]] = None,
+    use_cache: bool = True,
+    resume: bool = False,
+):
+    """Execute etl functions and save outputs to parquet and postgres.
+
+    Every dataset is computed before the existing tables are touched. Each dataset's
+    outputs are checkpointed to disk as soon as they are produced and released from
+    memory, so only the datasets in flight are held in memory. Once every dataset has
+    been produced, the tables are dropped, recreated and loaded from the checkpoints
+    one dataset at a time in a single transaction, so readers are only blocked while
+    loading. Foreign keys are deferred and checked when the load transaction commits.
+    If the ETL or the load fails, the previous tables are left in place.
+
+    The checkpoints are deleted once every table has been loaded. If a run fails, the
+    next run with resume=True restores the finished datasets from their checkpoints
+    instead of recomputing them.
+
+    Args:
+        funcs: mapping of dataset name to the ETL function that produces it.
+        schema_name: the name of the database schema to load the outputs to.
+        jobs: maximum number of ETL functions to run at the same time.
+        dependencies: mapping of dataset name to the datasets it depends on. Defaults
+            to ETL_DEPENDENCIES.
+        use_cache: whether to reuse cached outputs of datasets whose inputs and code
+            haven't changed. The tables are still reloaded to postgres and parquet.
+        resume: whether to restore datasets checkpointed by a previous failed run.
+    """
     engine = dbcp.helpers.get_sql_engine()
     with engine.connect() as con:
         engine.execute(sa.text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
 
-    transformed_dfs = {}
-    for dataset, etl_func in funcs.items():
-        logger.info(f"Processing: {dataset}")
-        transformed_dfs.update(etl_func())
+    checkpoints = DatasetCache(location=CHECKPOINT_DIR / schema_name)
+    if not resume:
+        checkpoints.clear()
 
-    # Delete any existing tables, and create them anew:
     metadata = dbcp.helpers.get_schema_sql_alchemy_metadata(schema_name)
-    metadata.drop_all(engine)
-    metadata.create_all(engine)
+    _defer_foreign_keys(metadata)
 
     parquet_dir = OUTPUT_DIR / schema_name
     parquet_dir.mkdir(exist_ok=True)
 
-    # Load table into postgres and parquet
-    with engine.connect() as con:
-        for table in metadata.sorted_tables:
-            logger.info(f"Load {table.name} to postgres.")
-            df = enforce_dtypes(transformed_dfs[table.name], table.name, schema_name)
-            df = dbcp.helpers.trim_columns_length(df)
-            df.to_sql(
-                name=table.name,
-                con=con,
-                if_exists="append",
-                index=False,
-                schema=schema_name,
-                chunksize=1000,
-                method=psql_insert_copy,
+    funcs_to_run = {}
+    for dataset, etl_func in funcs.items():
+        if resume and dataset in checkpoints:
+            logger.info(f"Restored {dataset} from checkpoint.")
+        else:
+            funcs_to_run[dataset] = etl_func
+
+    # download the raw data up front and concurrently instead of in each dataset
+    dbcp.extract.helpers.prefetch_gcs_archive_files(_get_archive_uris(funcs_to_run))
+    dbcp.helpers.prefetch_pudl_resources(_get_pudl_resources(funcs_to_run))
+
+    # datasets that can't be checkpointed are kept in memory until they are loaded
+    uncheckpointed: dict[str, dict[str, pd.DataFrame]] = {}
+    for dataset, dfs in _run_etl_funcs(
+        funcs_to_run, jobs=jobs, dependencies=dependencies, use_cache=use_cache
+    ):
+        if not checkpoints.put(dataset, None, dfs):
+            uncheckpointed[dataset] = dfs
+        del dfs
+
+    loaded_tables = set()
+    with engine.begin() as con:
+        # Delete any existing tables, and create them anew:
+        metadata.drop_all(con)
+        metadata.create_all(con)
+
+        for dataset in funcs:
+            dfs = uncheckpointed.pop(dataset, None)
+            if dfs is None:
+                dfs = checkpoints.get(dataset)
+            loaded_tables.update(
+                _load_dataset(dfs, metadata, schema_name, con, parquet_dir)
             )
-
-            schema = dbcp.helpers.get_pyarrow_schema_from_metadata(
-                table.name, schema_name
+            del dfs
+
+        missing_tables = {table.name for table in metadata.sorted_tables}
+        missing_tables -= loaded_tables
+        if missing_tables:
+            raise KeyError(
+                f"No ETL function produced these {schema_name} tables: "
+                f"{sorted(missing_tables)}"
             )
-            pa_table = pa.Table.from_pandas(df, schema=schema)
-            pq.write_table(pa_table, parquet_dir / f"{table.name}.parquet")
 
+    checkpoints.clear()
     logger.info("Sucessfully finished ETL.")
 
 
-def etl():
-    """Run dbc ETL."""
-    # Reduce size of caches if necessary
-    GEOCODER_CACHE.reduce_size()
-    SPATIAL_CACHE.reduce_size()
+def etl(jobs: int = 1, use_cache: bool = True, resume: bool = False):
+    """Run dbc ETL.
+
+    Args:
+        jobs: maximum number of dataset ETL functions to run at the same time.
+        use_cache: whether to reuse cached outputs of datasets whose inputs and code
+            haven't changed.
+        resume: whether to restore datasets checkpointed by a previous failed run.
+    """
+    GEOCODING_SUMMARY.clear()
 
     # Run public ETL functions
     etl_funcs = {
@@ -265,15 +753,22 @@ def etl():
         "ncsl_state_permitting": etl_ncsl_state_permitting,
         "ballot_ready": etl_ballot_ready,
     }
-    run_etl(etl_funcs, "data_warehouse")
+    run_etl(etl_funcs, "data_warehouse", jobs=jobs, use_cache=use_cache, resume=resume)
 
     # Run private ETL functions
     etl_funcs = {
         "acp_projects": etl_acp_projects,
     }
-    run_etl(etl_funcs, "private_data_warehouse")
+    run_etl(
+        etl_funcs,
+        "private_data_warehouse",
+        jobs=jobs,
+        use_cache=use_cache,
+        resume=resume,
+    )
 
     logger.info("Sucessfully finished ETL.")
+    log_geocoding_summary(GEOCODING_SUMMARY)
 
     engine = dbcp.helpers.get_sql_engine()
     validate_warehouse(engine=engine)
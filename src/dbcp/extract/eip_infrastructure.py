@@ -11,6 +11,8 @@ from typing import Dict
 import numpy as np
 import pandas as pd
 
+from dbcp.extract.helpers import read_excel_cached
+
 
 def _convert_object_to_string_dtypes(df: pd.DataFrame) -> None:
     strings = df.select_dtypes("object")
@@ -58,7 +60,7 @@ def extract(path: Path) -> Dict[str, pd.DataFrame]:
         # 'TEST',
         # 'Pipeline Digitization',
     ]
-    raw_dfs = pd.read_excel(path, sheet_name=sheets_to_read)
+    raw_dfs = read_excel_cached(path, sheet_name=sheets_to_read)
     rename_dict = {
         "Facility": "eip_facilities",
         "Project": "eip_projects",
@@ -3,6 +3,8 @@ from pathlib import Path
 
 import pandas as pd
 
+from dbcp.extract.helpers import read_excel_cached
+
 
 def extract(
     county_crosswalk_path: Path, emission_rates_path: Path
@@ -41,7 +43,7 @@ def _read_crosswalk(path: Path) -> pd.DataFrame:
 def _read_emissions_and_capacity_factors(path: Path) -> dict[str, pd.DataFrame]:
     """Read EPA AVERT emission rates from excel file."""
     cap_factors = (
-        pd.read_excel(path, sheet_name="Capacity factors", skiprows=1, skipfooter=1)
+        read_excel_cached(path, sheet_name="Capacity factors", skiprows=1, skipfooter=1)
         .rename(columns={"Unnamed: 0": "avert_region"}, copy=False)
         .rename(columns=lambda x: x.lower().replace(" ", "_"), copy=False)
     )
@@ -50,7 +52,7 @@ def _read_emissions_and_capacity_factors(path: Path) -> dict[str, pd.DataFrame]:
     # Cutting leading and trailing rows removes 5 of them.
     # iloc[:, :7] removes the adjacent table.
     emissions = (
-        pd.read_excel(path, sheet_name="2022", skiprows=16, skipfooter=44)
+        read_excel_cached(path, sheet_name="2022", skiprows=16, skipfooter=44)
         .iloc[:, :7]
         .rename(columns=lambda x: x.lower().replace(" ", "_"), copy=True)
         .rename(columns={"\xa0": "avert_region"}, copy=False)
@@ -1,11 +1,12 @@
 """Extract canonical state and county FIPS tables from the addfips library."""
 
+import logging
 import shutil
 import tempfile
 from functools import lru_cache
 from importlib.resources import files
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Sequence, Tuple
 
 import addfips
 import geopandas as gpd
@@ -13,25 +14,72 @@ import pandas as pd
 
 import dbcp
 
+logger = logging.getLogger(__name__)
+
 # originally from https://www2.census.gov/geo/tiger/TIGER2021/
 CENSUS_URI = "gs://dgm-archive/census/tl_2021_us_county.zip"
 TRIBAL_LANDS_URI = "gs://dgm-archive/census/tl_2021_us_aiannh.zip"
+# originally from https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2021_Gazetteer/
+GAZETTEER_PLACES_URI = "gs://dgm-archive/census/2021_Gaz_place_national.zip"
+GAZETTEER_COUSUBS_URI = "gs://dgm-archive/census/2021_Gaz_cousubs_national.zip"
+
+
+def geoparquet_sidecar_path(path: Path) -> Path:
+    """Get the path of the GeoParquet copy of a zipped shapefile.
+
+    The sidecar sits next to the zip file and shares its name, which includes the GCS
+    generation number for cached archive files, so a new archive version gets a new
+    sidecar.
+    """
+    return path.with_name(path.name + ".parquet")
 
 
-def extract_zipped_shapefile(path: Path) -> gpd.GeoDataFrame:
+def extract_zipped_shapefile(
+    path: Path,
+    columns: Optional[Sequence[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> gpd.GeoDataFrame:
     """
-    Create a temporary file from a zipped shapefile and return a GeoDataFrame.
+    Read a zipped shapefile, converting it to GeoParquet on the first read.
+
+    Parsing shapefiles is slow, so the first read writes a GeoParquet sidecar file with
+    bounding box covering columns next to the zip file. Later reads load the sidecar
+    instead, which supports column projection and bounding box filters.
 
     vsizip doesn't like the '#' in the path so my workaround is to copy the file to a temporary file.
 
     Args:
         path: path to zipped shapefile
+        columns: columns to read. The geometry column is always read. Defaults to all.
+        bbox: only read rows whose bounding boxes intersect this
+            (minx, miny, maxx, maxy) box, in the shapefile's CRS. Defaults to all rows.
     Returns:
         GeoDataFrame
     """
-    with tempfile.NamedTemporaryFile(delete=True, suffix=".zip") as temp_file:
-        shutil.copyfile(path, temp_file.name)
-        return gpd.read_file(temp_file.name)
+    path = Path(path)
+    sidecar = geoparquet_sidecar_path(path)
+    if not sidecar.exists():
+        with tempfile.NamedTemporaryFile(delete=True, suffix=".zip") as temp_file:
+            shutil.copyfile(path, temp_file.name)
+            gdf = gpd.read_file(temp_file.name)
+        # write to a temporary file first so a crash never leaves a partial sidecar
+        partial = sidecar.with_name(sidecar.name + ".part")
+        try:
+            gdf.to_parquet(partial, index=False, write_covering_bbox=True)
+            partial.rename(sidecar)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Unable to write GeoParquet copy of {path}: {e}")
+            partial.unlink(missing_ok=True)
+            if columns is not None:
+                gdf = gdf.loc[:, [*columns, gdf.geometry.name]]
+            if bbox is not None:
+                minx, miny, maxx, maxy = bbox
+                gdf = gdf.cx[minx:maxx, miny:maxy]
+            return gdf
+
+    if columns is not None and "geometry" not in columns:
+        columns = [*columns, "geometry"]
+    return gpd.read_parquet(sidecar, columns=columns, bbox=bbox)
 
 
 @lru_cache(maxsize=1)  # county boundaries are also used in some transform modules
@@ -58,6 +106,32 @@ def extract_census_tribal_land(archive_uri: str) -> pd.DataFrame:
     return extract_zipped_shapefile(path)
 
 
+def extract_census_gazetteer(archive_uri: str) -> pd.DataFrame:
+    """Extract a national Census Gazetteer file.
+
+    Gazetteer files are zipped, tab delimited tables of geographic entities with their
+    GEOIDs, names and internal points.
+
+    Args:
+        archive_uri: path of file to extract from the dgm-archive GCS bucket.
+
+    Returns:
+        the gazetteer table with all columns as strings.
+    """
+    path = dbcp.extract.helpers.cache_gcs_archive_file_locally(archive_uri)
+    try:
+        gazetteer = pd.read_csv(
+            path, sep="\t", dtype=str, compression="zip", encoding="utf-8"
+        )
+    except UnicodeDecodeError:  # older vintages are latin-1 encoded
+        gazetteer = pd.read_csv(
+            path, sep="\t", dtype=str, compression="zip", encoding="latin-1"
+        )
+    # the last column name is padded with whitespace
+    gazetteer.columns = gazetteer.columns.str.strip()
+    return gazetteer
+
+
 def _extract_state_fips() -> pd.DataFrame:
     """Extract canonical state FIPS tables from the addfips library.
 
@@ -1,17 +1,118 @@
 """Helper functions for extracting data."""
 
+import base64
+import fcntl
+import hashlib
+import importlib.metadata
+import importlib.util
 import json
 import logging
+import os
 import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Iterable, Optional, Union
 
+import fsspec
 import google.auth
+import numpy as np
 import pandas as pd
-from google.cloud import storage
+from pandas.io.excel._base import inspect_excel_format
+
+from dbcp.dataset_cache import combine_fingerprints, hash_file
 
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 8 * 2**20
+DATA_CACHE_DIR = "/app/data/data_cache"
+EXCEL_CACHE_DIR = "/app/data/excel_cache"
+OFFLINE_ENV_VAR = "DBCP_OFFLINE"
+
+
+def is_offline() -> bool:
+    """Whether archive files and PUDL resources must be read from the local cache."""
+    return os.environ.get(OFFLINE_ENV_VAR, "").lower() in {"1", "true", "yes"}
+
+
+class ArchiveManifest:
+    """A JSON file recording the archive files in a local cache directory.
+
+    Each entry records the URI, generation number, sha256 hash and local path of a
+    cached version of an archive file. In offline mode, unpinned URIs are resolved to
+    the newest cached generation in the manifest instead of asking GCS.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, local_cache_dir: Union[str, Path] = DATA_CACHE_DIR):
+        """Initialize an ArchiveManifest object.
+
+        Args:
+            local_cache_dir: the local directory archive files are cached in.
+        """
+        self.path = Path(local_cache_dir) / self.FILENAME
+
+    def read(self) -> dict[str, dict[str, str]]:
+        """Read the manifest entries, keyed by versioned URI ('gs://...#generation')."""
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, uri: str, generation_num: Optional[str] = None) -> Optional[dict]:
+        """Get the entry of a cached archive file.
+
+        Args:
+            uri: the full file GCS URI, without a generation number.
+            generation_num: the generation number to look up. If None, the entry of
+                the newest cached generation is returned.
+
+        Returns:
+            the entry, or None if the file isn't in the manifest.
+        """
+        entries = [
+            entry
+            for entry in self.read().values()
+            if entry["uri"] == uri
+            and (generation_num is None or entry["generation"] == str(generation_num))
+        ]
+        if not entries:
+            return None
+        # generation numbers are timestamps, so the largest is the newest
+        return max(entries, key=lambda entry: int(entry["generation"]))
+
+    def record(
+        self, uri: str, generation_num: str, filepath: Path, sha256: str
+    ) -> None:
+        """Add or replace the entry of a cached archive file.
+
+        The manifest is locked while it's updated because several ETL processes can
+        download files at the same time.
+
+        Args:
+            uri: the full file GCS URI, without a generation number.
+            generation_num: the generation number of the cached file.
+            filepath: the path of the cached file.
+            sha256: the sha256 hex digest of the cached file.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.FILENAME + ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self.read()
+            entries[f"{uri}#{generation_num}"] = {
+                "uri": uri,
+                "generation": str(generation_num),
+                "sha256": sha256,
+                "path": str(filepath),
+            }
+            partial = self.path.with_name(self.FILENAME + ".part")
+            with open(partial, "w") as f:
+                json.dump(entries, f, indent=2, sort_keys=True)
+            partial.rename(self.path)
+
 
 def extract_airtable_data(path: Path) -> pd.DataFrame:
     """
@@ -28,16 +129,138 @@ def extract_airtable_data(path: Path) -> pd.DataFrame:
     return pd.DataFrame.from_records(records)
 
 
+@lru_cache(maxsize=1)
+def _get_gcs_credentials() -> tuple:
+    """Get the default GCS credentials and project once per process."""
+    return google.auth.default()
+
+
+def _get_gcs_filesystem() -> fsspec.AbstractFileSystem:
+    """Get a version aware GCS filesystem using the default credentials.
+
+    fsspec caches filesystem instances, so every call in a process shares the same
+    client and connection pool.
+    """
+    credentials, project_id = _get_gcs_credentials()
+    return fsspec.filesystem(
+        "gcs",
+        token=credentials,
+        project=project_id,
+        requester_pays=project_id,
+        version_aware=True,
+    )
+
+
+def _split_gcs_uri(uri: str) -> tuple[str, Optional[str]]:
+    """Split a GCS URI into the object path and the generation number, if any."""
+    match = re.match(r"gs://(.*?)(?:#(\d+))?$", str(uri))
+    if match is None:
+        raise ValueError(f"{uri} is not a GCS URI")
+    return match.group(1), match.group(2)
+
+
+@lru_cache(maxsize=None)
+def _get_gcs_object_info(path: str) -> dict:
+    """Get the metadata of a GCS object, once per process for each path."""
+    try:
+        return _get_gcs_filesystem().info(path)
+    except FileNotFoundError:
+        raise ValueError(f"{path} does not exist in the GCS archive")
+
+
+def get_gcs_archive_generation_num(
+    uri: str, local_cache_dir: Union[str, Path] = DATA_CACHE_DIR
+) -> str:
+    """
+    Get the generation number of the latest version of a file in the GCS archive.
+
+    In offline mode, this is the newest generation in the local cache manifest.
+
+    Args:
+        uri: the full file GCS URI.
+        local_cache_dir: the local directory archive files are cached in.
+
+    Returns:
+        The generation number of the latest version of the object.
+    """
+    path, _ = _split_gcs_uri(uri)
+    if is_offline():
+        entry = ArchiveManifest(local_cache_dir).get(f"gs://{path}")
+        if entry is None:
+            raise ValueError(
+                f"gs://{path} is not in the manifest of {local_cache_dir}, run the ETL "
+                f"online once to cache it."
+            )
+        return entry["generation"]
+    return str(_get_gcs_object_info(path)["generation"])
+
+
+def _download_gcs_object(
+    path: str, filepath: Path, chunk_size: int = DOWNLOAD_CHUNK_SIZE
+) -> str:
+    """Stream a GCS object to a local file.
+
+    The object is written to a .part file that is renamed once the download is
+    complete and its MD5 checksum is verified, so an interrupted download never leaves
+    a partial file in the cache. An interrupted download is resumed where it stopped.
+
+    Args:
+        path: the object path, including the generation number.
+        filepath: the local file to download to.
+        chunk_size: number of bytes to request at a time.
+
+    Returns:
+        the sha256 hex digest of the downloaded file.
+    """
+    info = _get_gcs_object_info(path)
+    partial = filepath.with_name(filepath.name + ".part")
+    offset = partial.stat().st_size if partial.exists() else 0
+    if offset > info["size"]:
+        offset = 0
+    if offset:
+        logger.info(f"Resuming download of {path} at byte {offset}.")
+
+    fs = _get_gcs_filesystem()
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with fs.open(path, "rb", block_size=chunk_size) as remote:
+        remote.seek(offset)
+        with open(partial, "r+b" if offset else "wb") as local:
+            local.seek(offset)
+            while chunk := remote.read(chunk_size):
+                local.write(chunk)
+
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    with open(partial, "rb") as f:
+        while chunk := f.read(chunk_size):
+            md5.update(chunk)
+            sha256.update(chunk)
+    # composite objects don't have an MD5 hash
+    expected_md5 = info.get("md5Hash")
+    if expected_md5 is not None:
+        actual_md5 = base64.b64encode(md5.digest()).decode("ascii")
+        if actual_md5 != expected_md5:
+            partial.unlink()
+            raise ValueError(
+                f"Checksum of the download of {path} doesn't match: "
+                f"{actual_md5} != {expected_md5}"
+            )
+    partial.rename(filepath)
+    return sha256.hexdigest()
+
+
 def cache_gcs_archive_file_locally(
     uri: str,
-    local_cache_dir: Union[str, Path] = "/app/data/data_cache",
+    local_cache_dir: Union[str, Path] = DATA_CACHE_DIR,
     generation_num: Optional[str] = None,
 ) -> Path:
     """
     Cache a file stored in the GCS archive locally to a local directory.
 
+    Cached files are recorded in the local cache's ArchiveManifest. In offline mode
+    files are only read from the local cache, without contacting GCS.
+
     Args:
-        uri: the full file GCS URI.
+        uri: the full file GCS URI. It can include the generation number after a '#'.
         local_cache_dir: the local directory to cache the data.
         generation_num: The generation number of the object to access. If None,
             the latest version of the object will be used. This is helpful
@@ -46,29 +269,188 @@ def cache_gcs_archive_file_locally(
     Returns:
         Path to the local cache of the file.
     """
-    bucket_url, object_name = re.match("gs://(.*?)/(.*)", str(uri)).groups()
-    credentials, project_id = google.auth.default()
-    bucket = storage.Client(credentials=credentials, project=project_id).bucket(
-        bucket_url, user_project=project_id
-    )
-
-    local_cache_dir = Path(local_cache_dir)
-    filepath = local_cache_dir / object_name
+    object_path, uri_generation_num = _split_gcs_uri(uri)
+    _, object_name = object_path.split("/", 1)
 
-    if generation_num:
-        filepath = Path(str(filepath) + f"#{generation_num}")
-    else:
+    generation_num = generation_num or uri_generation_num
+    if not generation_num:
         # Get the latest version of the object and add the generation number to the filepath name
-        generation_num = bucket.get_blob(str(object_name)).generation
-        filepath = Path(str(filepath) + f"#{generation_num}")
-    if not filepath.exists():
+        generation_num = get_gcs_archive_generation_num(uri, local_cache_dir)
+    filepath = Path(local_cache_dir) / f"{object_name}#{generation_num}"
+    if filepath.exists():
+        manifest = ArchiveManifest(local_cache_dir)
+        if not is_offline() and not manifest.get(f"gs://{object_path}", generation_num):
+            # cached before the manifest existed
+            manifest.record(
+                f"gs://{object_path}", generation_num, filepath, hash_file(filepath)
+            )
+    elif is_offline():
+        raise FileNotFoundError(
+            f"{filepath} is not cached and GCS can't be accessed in offline mode."
+        )
+    else:
         logger.info(
             f"{object_name} not found in {local_cache_dir}. Downloading from GCS bucket."
         )
+        sha256 = _download_gcs_object(f"{object_path}#{generation_num}", filepath)
+        ArchiveManifest(local_cache_dir).record(
+            f"gs://{object_path}", generation_num, filepath, sha256
+        )
+    return filepath
 
-        blob = bucket.blob(str(object_name), generation=generation_num)
 
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, "wb+") as f:
-            f.write(blob.download_as_bytes())
-    return filepath
+def prefetch_gcs_archive_files(
+    uris: Iterable[str],
+    local_cache_dir: Union[str, Path] = DATA_CACHE_DIR,
+    max_workers: int = 8,
+) -> dict[str, Path]:
+    """
+    Download files from the GCS archive to the local cache concurrently.
+
+    Files that are already cached are not downloaded again. Failed downloads are
+    logged rather than raised, so the ETL can retry them when the file is extracted.
+
+    Args:
+        uris: full file GCS URIs, optionally with generation numbers after a '#'.
+        local_cache_dir: the local directory to cache the data.
+        max_workers: maximum number of files to download at the same time.
+
+    Returns:
+        mapping of each successfully cached URI to the path of its local copy.
+    """
+    paths = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(cache_gcs_archive_file_locally, uri, local_cache_dir): uri
+            for uri in set(uris)
+        }
+        for future in as_completed(futures):
+            uri = futures[future]
+            try:
+                paths[uri] = future.result()
+            except Exception as e:
+                logger.warning(f"Unable to prefetch {uri}: {e}")
+    return paths
+
+
+EXCEL_ENGINE_PACKAGES = {
+    "calamine": "python-calamine",
+    "openpyxl": "openpyxl",
+    "xlrd": "xlrd",
+    "odf": "odfpy",
+    "pyxlsb": "pyxlsb",
+}
+"""The package that implements each pd.read_excel engine."""
+
+
+def _get_excel_engine(path: Union[str, Path]) -> str:
+    """Use the much faster calamine engine if pandas and python-calamine support it.
+
+    Otherwise use the engine pandas picks for the workbook's format.
+    """
+    pandas_version = tuple(int(part) for part in pd.__version__.split(".")[:2])
+    if pandas_version >= (2, 2) and importlib.util.find_spec("python_calamine"):
+        return "calamine"
+    # cached archive files have no usable extension, pandas checks the content too
+    excel_format = inspect_excel_format(str(path))
+    return {"xls": "xlrd", "xlsb": "pyxlsb", "ods": "odf"}.get(excel_format, "openpyxl")
+
+
+def _get_excel_engine_version(engine: str) -> str:
+    """Identify the version of an Excel engine, since engines parse cells differently."""
+    package = EXCEL_ENGINE_PACKAGES.get(engine, engine)
+    try:
+        return f"{package}=={importlib.metadata.version(package)}"
+    except importlib.metadata.PackageNotFoundError:
+        return package
+
+
+def _read_cached_sheet(path: Path) -> pd.DataFrame:
+    """Read a sheet cached by read_excel_cached, with the nulls pd.read_excel uses."""
+    df = pd.read_parquet(path, engine="pyarrow")
+    # pyarrow reads missing strings as None, pd.read_excel uses NaN
+    for col in df.select_dtypes("object").columns:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def read_excel_cached(
+    path: Union[str, Path],
+    sheet_name: Union[str, list[str]],
+    cache_dir: Union[str, Path] = EXCEL_CACHE_DIR,
+    **kwargs: Any,
+) -> Union[pd.DataFrame, dict[str, pd.DataFrame]]:
+    """
+    Read sheets of an Excel file, caching them as parquet files.
+
+    Parsing large workbooks is slow, so each sheet is saved as a parquet file the first
+    time it's read. The cached sheet is keyed by the hash of the workbook, the sheet
+    name, the read options and the Excel engine and its version, so it's reused until
+    any of them change. When a workbook changes, the sheets cached from its previous versions are
+    deleted. Sheets that can't be written to parquet, like ones with mixed type
+    columns, are parsed on every read.
+
+    Args:
+        path: path to the Excel file.
+        sheet_name: name of the sheet to read, or a list of sheet names.
+        cache_dir: the directory to store cached sheets in.
+        kwargs: other keyword arguments of pd.read_excel, eg. skiprows.
+
+    Returns:
+        the sheet, or a dictionary of sheet name to sheet if sheet_name is a list,
+            like pd.read_excel.
+    """
+    sheet_names = [sheet_name] if isinstance(sheet_name, str) else list(sheet_name)
+    engine = kwargs.pop("engine", None) or _get_excel_engine(path)
+    engine_version = _get_excel_engine_version(engine)
+    file_hash = hash_file(path)
+    options = json.dumps(kwargs, sort_keys=True, default=str)
+    cache_dir = Path(cache_dir)
+    # cached sheets are named <workbook path>-<workbook version>-<sheet, options, engine>
+    path_key = combine_fingerprints(str(Path(path).resolve()))[:16]
+    version_prefix = f"{path_key}-{file_hash[:16]}-"
+    cache_paths = {
+        sheet: cache_dir
+        / f"{version_prefix}{combine_fingerprints(sheet, options, engine_version)}.parquet"
+        for sheet in sheet_names
+    }
+
+    dfs = {
+        sheet: _read_cached_sheet(cache_path)
+        for sheet, cache_path in cache_paths.items()
+        if cache_path.exists()
+    }
+    missing = [sheet for sheet in sheet_names if sheet not in dfs]
+    if missing:
+        logger.info(f"Parsing sheets {missing} of {path}.")
+        # parse the workbook once for all the missing sheets
+        parsed = pd.read_excel(path, sheet_name=missing, engine=engine, **kwargs)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{path_key}-*.parquet"):
+            if not stale.name.startswith(version_prefix):
+                stale.unlink(missing_ok=True)
+        for sheet, df in parsed.items():
+            if not all(isinstance(col, str) for col in df.columns):
+                # parquet would turn them into strings
+                logger.warning(
+                    f"Not caching sheet {sheet} of {path}: non-string headers"
+                )
+                continue
+            partial = cache_paths[sheet].with_suffix(".part")
+            try:
+                df.to_parquet(partial, engine="pyarrow")
+                partial.rename(cache_paths[sheet])
+            except (ValueError, TypeError, NotImplementedError) as e:
+                # pyarrow.ArrowInvalid and ArrowTypeError are subclasses of these
+                logger.warning(f"Unable to cache sheet {sheet} of {path}: {e}")
+                partial.unlink(missing_ok=True)
+        dfs.update(parsed)
+
+    if isinstance(sheet_name, str):
+        return dfs[sheet_name]
+    return {sheet: dfs[sheet] for sheet in sheet_names}
+
+
+def clear_excel_cache(cache_dir: Union[str, Path] = EXCEL_CACHE_DIR) -> None:
+    """Delete all sheets cached by read_excel_cached."""
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -16,7 +16,7 @@ def extract(uri: str) -> Dict[str, pd.DataFrame]:
         dfs: dictionary of dataframe name to raw dataframe.
     """
     path = dbcp.extract.helpers.cache_gcs_archive_file_locally(uri)
-    all_projects = pd.read_excel(path, sheet_name="data")
+    all_projects = dbcp.extract.helpers.read_excel_cached(path, sheet_name="data")
     rename_dict = {
         "q_id": "queue_id",
         "q_status": "queue_status",
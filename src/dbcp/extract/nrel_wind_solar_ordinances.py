@@ -5,6 +5,8 @@ from typing import Literal
 
 import pandas as pd
 
+from dbcp.extract.helpers import read_excel_cached
+
 
 def extract(
     path: Path, wind_or_solar: Literal["solar", "wind"]
@@ -28,7 +30,7 @@ def extract(
         # "Value Ranges",
         # "Sheet1",
     ]
-    raw_dfs = pd.read_excel(path, sheet_name=sheets_to_read)
+    raw_dfs = read_excel_cached(path, sheet_name=sheets_to_read)
     rename_dict = {
         "State": f"nrel_state_{wind_or_solar}_ordinances",
         "County, State": f"nrel_local_{wind_or_solar}_ordinances",
@@ -1,9 +1,28 @@
 """Logic for extracing PUDL data."""
+from datetime import date
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 import dbcp
 from dbcp.constants import PUDL_LATEST_YEAR
+from dbcp.metadata.data_warehouse import metadata
+
+PUDL_RESOURCES = [
+    "out_eia__yearly_generators.parquet",
+    "core_eia860m__changelog_generators.parquet",
+    "core_eia__codes_operational_status.parquet",
+]
+"""The PUDL resources extract() reads, so they can be downloaded ahead of time."""
+
+PUDL_GENERATORS_COLUMNS = [
+    column.name
+    for column in metadata.tables["data_warehouse.pudl_generators"].columns
+    if column.name not in {"state_id_fips", "county_id_fips"}  # added by transform
+]
+"""The pudl_generators columns kept in the warehouse, which include the ones the transform reads."""
 
 
 def _extract_pudl_generators() -> pd.DataFrame:
@@ -12,24 +31,19 @@ def _extract_pudl_generators() -> pd.DataFrame:
     Returns:
         The pudl_generators table.
     """
-    pudl_resource_path = dbcp.helpers.get_pudl_resource(
-        pudl_resource="out_eia__yearly_generators.parquet"
+    pudl_resource = "out_eia__yearly_generators.parquet"
+    # only read the columns the warehouse keeps. Older PUDL releases lack some of them,
+    # they are filled with nulls when the table is loaded.
+    available = pq.read_schema(dbcp.helpers.get_pudl_resource(pudl_resource)).names
+    columns = [column for column in PUDL_GENERATORS_COLUMNS if column in available]
+    # only read generators where report_year >= PUDL_LATEST_YEAR and < PUDL_LATEST_YEAR+1
+    report_date = pc.field("report_date")
+    pudl_generators = dbcp.helpers.read_pudl_table(
+        pudl_resource,
+        columns=columns,
+        filters=(report_date >= pa.scalar(date(PUDL_LATEST_YEAR, 1, 1)))
+        & (report_date < pa.scalar(date(PUDL_LATEST_YEAR + 1, 1, 1))),
     )
-    pudl_generators = pd.read_parquet(
-        pudl_resource_path, engine="pyarrow", use_nullable_dtypes=True
-    )
-
-    # convert columns with 'date' in the name to datetime
-    # TODO: Use dtype_backend="pyarrow" when we update to pandas >= 2.0
-    date_columns = [col for col in pudl_generators.columns if "date" in col]
-    for col in date_columns:
-        pudl_generators[col] = pd.to_datetime(pudl_generators[col])
-
-    # filter generators where report_year >= PUDL_LATEST_YEAR and < PUDL_LATEST_YEAR+1
-    pudl_generators = pudl_generators[
-        (pudl_generators.report_date.dt.year >= PUDL_LATEST_YEAR)
-        & (pudl_generators.report_date.dt.year < PUDL_LATEST_YEAR + 1)
-    ]
     return pudl_generators
 
 
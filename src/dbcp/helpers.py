@@ -1,17 +1,27 @@
 """Small helper functions for dbcp etl."""
 
-import csv
+import hashlib
+import json
 import logging
 import os
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from importlib.resources import files
+from io import BytesIO
 from pathlib import Path
+from typing import Iterable, Optional, Union
 
 import addfips
 import fsspec
 import google.auth
+import numpy as np
 import pandas as pd
 import pandas_gbq
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import sqlalchemy as sa
 from google.cloud import bigquery
 from tqdm import tqdm
@@ -45,6 +55,36 @@ SA_TO_PA_TYPES = {
     "DATETIME": pa.timestamp("ms"),
 }
 SA_TO_BQ_MODES = {True: "NULLABLE", False: "REQUIRED"}
+PUDL_DOWNLOAD_CHUNK_SIZE = 16 * 2**20
+# the dtypes pd.read_parquet(..., use_nullable_dtypes=True) converts arrow types to
+PA_TO_PD_NULLABLE_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.string(): pd.StringDtype(),
+}
+# postgres type OIDs that read_sql_arrow can parse from COPY CSV output. Integers and
+# floats are widened to match the dtypes pd.read_sql produces.
+PG_OID_TO_PA_TYPES = {
+    16: pa.bool_(),  # boolean
+    20: pa.int64(),  # bigint
+    21: pa.int64(),  # smallint
+    23: pa.int64(),  # integer
+    25: pa.string(),  # text
+    700: pa.float64(),  # real
+    701: pa.float64(),  # double precision
+    1042: pa.string(),  # char
+    1043: pa.string(),  # varchar
+    1082: pa.date32(),  # date
+    1114: pa.timestamp("ns"),  # timestamp without time zone
+    1700: pa.float64(),  # numeric
+}
 
 
 def get_schema_sql_alchemy_metadata(schema: str) -> sa.MetaData:
@@ -138,48 +178,310 @@ def get_sql_engine() -> sa.engine.Engine:
     return sa.create_engine(f"postgresql://{user}:{password}@{db}:5432")
 
 
+def read_sql_arrow(query: str, engine: sa.engine.Engine) -> pd.DataFrame:
+    """Read the results of a query into a dataframe through arrow.
+
+    The results are streamed with COPY (query) TO STDOUT in CSV format and parsed with
+    pyarrow using the column types postgres reports for the query. This is much faster
+    than pd.read_sql, which builds a python object for every value. Queries with
+    column types pyarrow can't parse from CSV, like arrays or time zones, fall back to
+    pd.read_sql.
+
+    Args:
+        query: a SELECT or WITH query. Parameters are not supported.
+        engine: the engine of the database to query.
+
+    Returns:
+        the query results, with the same dtypes pd.read_sql would produce.
+    """
+    query = query.strip().rstrip(";")
+    with engine.connect() as con:
+        with con.connection.cursor() as cur:
+            cur.execute(f"SELECT * FROM (\n{query}\n) AS query LIMIT 0")
+            names = [column.name for column in cur.description]
+            oids = [column.type_code for column in cur.description]
+            if len(set(names)) < len(names) or not set(oids) <= set(PG_OID_TO_PA_TYPES):
+                return pd.read_sql(query, con)
+            buffer = BytesIO()
+            cur.copy_expert(f"COPY (\n{query}\n) TO STDOUT WITH CSV", buffer)
+
+    try:
+        return parse_pg_copy_csv(buffer.getvalue(), names, oids)
+    except pa.ArrowInvalid as e:
+        logger.warning(f"Falling back to pd.read_sql: {e}")
+        return pd.read_sql(query, engine)
+
+
+def parse_pg_copy_csv(data: bytes, names: list[str], oids: list[int]) -> pd.DataFrame:
+    """Parse the output of a postgres COPY ... TO STDOUT WITH CSV statement.
+
+    Args:
+        data: the CSV output, without a header.
+        names: the column names.
+        oids: the postgres type OID of each column, see PG_OID_TO_PA_TYPES.
+
+    Returns:
+        the parsed data.
+    """
+    schema = pa.schema(
+        [(name, PG_OID_TO_PA_TYPES[oid]) for name, oid in zip(names, oids)]
+    )
+    if not data:
+        return schema.empty_table().to_pandas()
+    table = pa_csv.read_csv(
+        pa.py_buffer(data),
+        read_options=pa_csv.ReadOptions(column_names=names),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=schema,
+            # COPY writes NULL as an empty unquoted value and '' as ""
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t"],
+            false_values=["f"],
+        ),
+    )
+    return table.to_pandas()
+
+
+def _get_pudl_filesystem() -> fsspec.AbstractFileSystem:
+    """Get the filesystem of the public PUDL S3 bucket."""
+    return fsspec.filesystem("s3", anon=True)
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    """Read a JSON file, or return None if it doesn't exist."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path: Path, data: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _get_remote_version(fs: fsspec.AbstractFileSystem, remote_path: str) -> dict:
+    """Get the size and ETag of a remote file, which identify its version."""
+    info = fs.info(remote_path)
+    return {"size": info["size"], "etag": info.get("ETag")}
+
+
+def _matches_remote_version(
+    path: Path, version: dict, chunk_size: int = PUDL_DOWNLOAD_CHUNK_SIZE
+) -> bool:
+    """Check that a local file is a complete copy of a version of a remote file.
+
+    The ETag of an S3 object uploaded in a single part is its MD5 hash, so the contents
+    are verified too. Multipart upload ETags contain a '-' and aren't MD5 hashes.
+    """
+    if path.stat().st_size != version["size"]:
+        return False
+    etag = (version["etag"] or "").strip('"')
+    if not etag or "-" in etag:
+        return True
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest() == etag
+
+
+def _download_pudl_resource(
+    remote_path: str, local_path: Path, chunk_size: int = PUDL_DOWNLOAD_CHUNK_SIZE
+) -> None:
+    """Download a PUDL resource with large range requests.
+
+    The file is written to a .part file that is renamed once the download is complete
+    and verified. The size and ETag of the remote file are saved next to the .part
+    file, so an interrupted download of the same version resumes where it stopped.
+    The version of a complete download is saved in a .json sidecar file.
+
+    Args:
+        remote_path: the S3 path of the resource.
+        local_path: the local file to download to.
+        chunk_size: number of bytes to request at a time.
+    """
+    fs = _get_pudl_filesystem()
+    version = _get_remote_version(fs, remote_path)
+    partial = local_path.with_name(local_path.name + ".part")
+    partial_version_path = partial.with_name(partial.name + ".json")
+
+    offset = 0
+    if partial.exists() and _read_json(partial_version_path) == version:
+        offset = min(partial.stat().st_size, version["size"])
+        logger.info(f"Resuming download of {remote_path} at byte {offset}.")
+    _write_json(partial_version_path, version)
+
+    with fs.open(remote_path, "rb", block_size=chunk_size) as remote, open(
+        partial, "r+b" if offset else "wb"
+    ) as local, tqdm(
+        total=version["size"],
+        initial=offset,
+        unit="B",
+        unit_scale=True,
+        unit_divisor=1024,
+        desc=local_path.name,
+    ) as pbar:
+        remote.seek(offset)
+        local.seek(offset)
+        local.truncate()
+        while chunk := remote.read(chunk_size):
+            local.write(chunk)
+            pbar.update(len(chunk))
+
+    if not _matches_remote_version(partial, version):
+        partial.unlink()
+        partial_version_path.unlink()
+        raise ValueError(
+            f"The download of {remote_path} doesn't match its size or ETag {version}."
+        )
+    partial_version_path.rename(local_path.with_name(local_path.name + ".json"))
+    partial.rename(local_path)
+
+
 def get_pudl_resource(
-    pudl_resource: str, bucket: str = "s3://pudl.catalyst.coop"
+    pudl_resource: str,
+    bucket: str = "s3://pudl.catalyst.coop",
+    local_cache_dir: Union[str, Path] = "/app/data/data_cache/pudl",
 ) -> Path:
     """Given the name of a PUDL resource, return the path to the cached file.
 
-    If the file is not cached, download it from S3 and return the path.
+    If the file is not cached, download it from S3 and return the path. Cached files
+    are only used if they match the size recorded when they were downloaded.
+
+    In offline mode, S3 is never accessed: any cached copy is used, even one cached
+    before sizes were recorded.
 
     Args:
         pudl_resource: The name of the PUDL resource to retrieve.
+        bucket: the S3 bucket of PUDL data releases.
+        local_cache_dir: the local directory to cache PUDL resources in.
     Returns:
         pudl_resource_path: The path to the cached PUDL resource.
+
+    Raises:
+        FileNotFoundError: in offline mode, if the resource isn't cached.
     """
     PUDL_VERSION = os.environ["PUDL_VERSION"]
 
-    pudl_cache = Path("/app/data/data_cache/pudl/")
-    pudl_cache.mkdir(exist_ok=True)
-    pudl_version_cache = pudl_cache / PUDL_VERSION
-    pudl_version_cache.mkdir(exist_ok=True)
+    pudl_version_cache = Path(local_cache_dir) / PUDL_VERSION
+    pudl_version_cache.mkdir(parents=True, exist_ok=True)
 
     remote_pudl_resource_path = f"{bucket}/{PUDL_VERSION}/{pudl_resource}"
     local_pudl_resource_path = pudl_version_cache / pudl_resource
+    version_path = local_pudl_resource_path.with_name(pudl_resource + ".json")
+
+    if dbcp.extract.helpers.is_offline():
+        version = _read_json(version_path)
+        if not local_pudl_resource_path.exists() or (
+            version is not None
+            and local_pudl_resource_path.stat().st_size != version["size"]
+        ):
+            raise FileNotFoundError(
+                f"{pudl_resource} of PUDL {PUDL_VERSION} isn't fully cached in "
+                f"{pudl_version_cache} and can't be downloaded in offline mode."
+            )
+        return local_pudl_resource_path
+
+    if local_pudl_resource_path.exists():
+        version = _read_json(version_path)
+        if version is not None and (
+            local_pudl_resource_path.stat().st_size == version["size"]
+        ):
+            return local_pudl_resource_path
+        # cached before versions were recorded, or truncated
+        version = _get_remote_version(_get_pudl_filesystem(), remote_pudl_resource_path)
+        if _matches_remote_version(local_pudl_resource_path, version):
+            _write_json(version_path, version)
+            return local_pudl_resource_path
+        logger.warning(
+            f"{local_pudl_resource_path} is incomplete or outdated, downloading it again."
+        )
+        local_pudl_resource_path.unlink()
 
-    if not local_pudl_resource_path.exists():
-        fs = fsspec.filesystem("s3", anon=True)
-        file_size = fs.size(remote_pudl_resource_path)
-
-        # open the remote_pudl_resource_path and track progress with tqdm
-        with fs.open(remote_pudl_resource_path) as fo:
-            with open(local_pudl_resource_path, "wb") as local_file:
-                with tqdm(
-                    total=file_size, unit="B", unit_scale=True, unit_divisor=1024
-                ) as pbar:
-                    while True:
-                        buf = fo.read(8192)
-                        if not buf:
-                            break
-                        local_file.write(buf)
-                        pbar.update(len(buf))
-
+    _download_pudl_resource(remote_pudl_resource_path, local_pudl_resource_path)
     return local_pudl_resource_path
 
 
+def prefetch_pudl_resources(
+    pudl_resources: Iterable[str],
+    bucket: str = "s3://pudl.catalyst.coop",
+    local_cache_dir: Union[str, Path] = "/app/data/data_cache/pudl",
+    max_workers: int = 4,
+) -> dict[str, Path]:
+    """Download PUDL resources to the local cache concurrently.
+
+    Failed downloads are logged rather than raised, so the ETL can retry them when
+    the resource is read. In offline mode nothing can be retried, so missing
+    resources are raised.
+
+    Args:
+        pudl_resources: names of the PUDL resources to download.
+        bucket: the S3 bucket of PUDL data releases.
+        local_cache_dir: the local directory to cache PUDL resources in.
+        max_workers: maximum number of resources to download at the same time.
+
+    Returns:
+        mapping of each successfully cached resource to the path of its local copy.
+
+    Raises:
+        FileNotFoundError: in offline mode, if a resource isn't cached.
+    """
+    offline = dbcp.extract.helpers.is_offline()
+    paths = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                get_pudl_resource, pudl_resource, bucket, local_cache_dir
+            ): pudl_resource
+            for pudl_resource in set(pudl_resources)
+        }
+        for future in as_completed(futures):
+            pudl_resource = futures[future]
+            try:
+                paths[pudl_resource] = future.result()
+            except Exception as e:
+                if offline:
+                    raise
+                logger.warning(f"Unable to prefetch {pudl_resource}: {e}")
+    return paths
+
+
+def read_pudl_table(
+    pudl_resource: str,
+    columns: Optional[list[str]] = None,
+    filters: Optional[pc.Expression] = None,
+) -> pd.DataFrame:
+    """Read a PUDL parquet resource, filtering columns and rows during the scan.
+
+    Only the requested columns are read, and row groups whose statistics show they
+    contain no matching rows are skipped, so filtering a few years out of a large
+    table is much faster than reading all of it.
+
+    Args:
+        pudl_resource: The name of the PUDL resource to read.
+        columns: the columns to read. Defaults to all columns.
+        filters: a pyarrow expression rows must match, eg.
+            pc.field("report_date") >= pa.scalar(date(2023, 1, 1)).
+            Defaults to all rows.
+
+    Returns:
+        the table with nullable dtypes. Columns with 'date' in the name are converted
+            to datetimes.
+    """
+    dataset = ds.dataset(get_pudl_resource(pudl_resource), format="parquet")
+    table = dataset.to_table(columns=columns, filter=filters)
+    df = table.to_pandas(types_mapper=PA_TO_PD_NULLABLE_TYPES.get)
+    # TODO: Use dtype_backend="pyarrow" when we update to pandas >= 2.0
+    for col in df.columns:
+        if "date" in col:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
 def track_tar_progress(members):
     """Use tqdm to track progress of tar extraction."""
     for member in tqdm(members):
@@ -254,34 +556,169 @@ def upload_schema_to_bigquery(schema: str, dev: bool = True) -> None:
         logger.info(f"Finished: {full_table_name}")
 
 
-def psql_insert_copy(table, conn, keys, data_iter):
-    """Insert data via COPY statement, which is much faster than INSERT.
+PG_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") * 2
+PG_COPY_BINARY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+# big endian numpy dtypes of the fixed width postgres binary representations
+SA_TO_PG_BINARY_DTYPES = {
+    "INTEGER": ">i4",
+    "BIGINT": ">i8",
+    "FLOAT": ">f8",
+    "BOOLEAN": "u1",
+    "DATETIME": ">i8",
+}
+# postgres timestamps are microseconds since 2000-01-01
+PG_EPOCH_US = 946_684_800_000_000
+
+
+def _pg_binary_segments(
+    column: pa.Array, sa_type: str
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Encode an arrow column as postgres binary COPY fields.
 
-    Parameters
-    ----------
-    table : pandas.io.sql.SQLTable
-    conn : sqlalchemy.engine.Engine or sqlalchemy.engine.Connection
-    keys : list of str
-        Column names
-    data_iter : Iterable that iterates the values to be inserted
+    Each field is a 4 byte length header (-1 for NULL) followed by the value. The
+    headers and the values are returned as two segments of (bytes, length per row) so
+    they can be interleaved with the other columns' fields.
     """
-    # gets a DBAPI connection that can provide a cursor
-    dbapi_conn = conn.connection
-    with dbapi_conn.cursor() as cur:
-        s_buf = StringIO()
-        writer = csv.writer(s_buf)
-        writer.writerows(data_iter)
-        s_buf.seek(0)
-
-        columns = ", ".join([f'"{k}"' for k in keys])
-        if table.schema:
-            table_name = f"{table.schema}.{table.name}"
+    valid = column.is_valid().to_numpy(zero_copy_only=False)
+    if sa_type == "VARCHAR":
+        column = pc.fill_null(column.cast(pa.string()), "")
+        _, offsets_buffer, data_buffer = column.buffers()
+        start, stop = column.offset, column.offset + len(column) + 1
+        offsets = np.frombuffer(offsets_buffer, dtype=np.int32)[start:stop]
+        first, last = offsets[0], offsets[-1]
+        data = np.frombuffer(data_buffer or b"", dtype=np.uint8)[first:last]
+        lengths = np.diff(offsets).astype(np.int64)
+    else:
+        dtype = np.dtype(SA_TO_PG_BINARY_DTYPES[sa_type])
+        if sa_type == "DATETIME":
+            column = column.cast(pa.timestamp("us")).cast(pa.int64())
+            values = column.fill_null(0).to_numpy() - PG_EPOCH_US
         else:
-            table_name = table.name
+            values = column.fill_null(False if sa_type == "BOOLEAN" else 0)
+            values = values.to_numpy(zero_copy_only=False)
+        if dtype.kind == "i" and valid.any():
+            # astype would silently wrap values that don't fit in the postgres type
+            bounds = np.iinfo(dtype)
+            # python ints so unsigned and signed values compare exactly
+            low, high = int(values[valid].min()), int(values[valid].max())
+            if low < bounds.min or high > bounds.max:
+                raise ValueError(
+                    f"Values out of the {sa_type} range [{bounds.min}, {bounds.max}]: "
+                    f"min {low}, max {high}"
+                )
+        values = values.astype(dtype).view(np.uint8).reshape(-1, dtype.itemsize)
+        data = values[valid].ravel()
+        lengths = np.where(valid, dtype.itemsize, 0)
+    headers = np.where(valid, lengths, -1).astype(">i4")
+    return [
+        (headers.view(np.uint8), np.full(len(headers), 4)),
+        (data, lengths),
+    ]
+
+
+def encode_pg_copy_binary(table: pa.Table, sa_types: list[str]) -> bytes:
+    """Encode an arrow table in the postgres binary COPY format.
 
-        sql = f"COPY {table_name} ({columns}) FROM STDIN WITH CSV"
-        cur.copy_expert(sql=sql, file=s_buf)
-        dbapi_conn.commit()
+    Args:
+        table: the table to encode.
+        sa_types: the sqlalchemy type name of each column, e.g. "VARCHAR".
+
+    Returns:
+        the COPY data, including the header and trailer.
+    """
+    n_rows = table.num_rows
+    segments = []
+    for column, sa_type in zip(table.columns, sa_types):
+        segments += _pg_binary_segments(column.combine_chunks(), sa_type)
+
+    row_lengths = np.full(n_rows, 2, dtype=np.int64)
+    for _, lengths in segments:
+        row_lengths += lengths
+    row_starts = np.cumsum(row_lengths) - row_lengths
+    out = np.empty(row_lengths.sum(), dtype=np.uint8)
+
+    field_count = np.frombuffer(table.num_columns.to_bytes(2, "big"), np.uint8)
+    out[row_starts] = field_count[0]
+    out[row_starts + 1] = field_count[1]
+    # scatter each segment into its place in every row
+    position = row_starts + 2
+    for data, lengths in segments:
+        source_starts = np.cumsum(lengths) - lengths
+        index = np.repeat(position - source_starts, lengths) + np.arange(len(data))
+        out[index] = data
+        position = position + lengths
+    return PG_COPY_BINARY_HEADER + out.tobytes() + PG_COPY_BINARY_TRAILER
+
+
+def copy_arrow_to_postgres(
+    table: pa.Table,
+    table_name: str,
+    schema: str,
+    con: sa.engine.Connection,
+    batch_size: int = 100_000,
+    target_schema: Optional[str] = None,
+) -> None:
+    """Load an arrow table into postgres with binary COPY statements.
+
+    The data is not committed, that's left to the caller's transaction.
+
+    Args:
+        table: the data to load. Columns must match the table's sqlalchemy metadata.
+        table_name: the name of the postgres table.
+        schema: the name of the database schema.
+        con: the connection to load the data with.
+        batch_size: the maximum number of rows to send per COPY statement.
+        target_schema: the database schema to load the data into, if it isn't schema.
+            Eg. a staging copy of the schema's tables.
+    """
+    metadata = get_schema_sql_alchemy_metadata(schema)
+    table_sa = metadata.tables[f"{schema}.{table_name}"]
+    sa_types = [str(table_sa.columns[name].type) for name in table.column_names]
+    columns = ", ".join([f'"{name}"' for name in table.column_names])
+    target_schema = target_schema or schema
+    sql = (
+        f"COPY {target_schema}.{table_name} ({columns}) FROM STDIN WITH (FORMAT BINARY)"
+    )
+
+    dbapi_conn = con.connection
+    with dbapi_conn.cursor() as cur:
+        for batch in table.to_batches(max_chunksize=batch_size):
+            data = encode_pg_copy_binary(pa.Table.from_batches([batch]), sa_types)
+            cur.copy_expert(sql=sql, file=BytesIO(data))
+
+
+def load_table(
+    df: pd.DataFrame,
+    table_name: str,
+    schema: str,
+    con: sa.engine.Connection,
+    parquet_dir: Path,
+    target_schema: Optional[str] = None,
+) -> None:
+    """Load a dataframe into postgres and parquet using the table's metadata.
+
+    The dataframe is converted to arrow once and the same table is written to both.
+
+    Args:
+        df: the data to load.
+        table_name: the name of the table.
+        schema: the name of the database schema.
+        con: the connection to load the data with.
+        parquet_dir: the directory to write the parquet file to.
+        target_schema: the database schema to load the data into, if it isn't schema.
+    """
+    logger.info(f"Load {table_name} to postgres.")
+    df = trim_columns_length(df)
+    df = enforce_dtypes(df, table_name, schema)
+    pa_table = pa.Table.from_pandas(
+        df,
+        schema=get_pyarrow_schema_from_metadata(table_name, schema),
+        preserve_index=False,
+    )
+    copy_arrow_to_postgres(
+        pa_table, table_name, schema, con, target_schema=target_schema
+    )
+    pq.write_table(pa_table, parquet_dir / f"{table_name}.parquet")
 
 
 def trim_columns_length(df: pd.DataFrame, length_limit: int = 63) -> pd.DataFrame:
@@ -290,6 +727,60 @@ def trim_columns_length(df: pd.DataFrame, length_limit: int = 63) -> pd.DataFram
     return df
 
 
+@lru_cache(maxsize=None)
+def _get_addfips(vintage: int) -> addfips.AddFIPS:
+    """Load addfips' state and county names once per vintage."""
+    return addfips.AddFIPS(vintage=vintage)
+
+
+@lru_cache(maxsize=None)
+def _get_fips_lookup_tables(vintage: int) -> tuple[dict[str, str], pd.DataFrame]:
+    """Build hash tables of normalized state and county names to FIPS codes.
+
+    The tables contain the same names as an addfips.AddFIPS object, so lookups give
+    the same results as AddFIPS.get_state_fips() and AddFIPS.get_county_fips().
+
+    Args:
+        vintage: the addfips vintage of county names and codes.
+
+    Returns:
+        a dict of lower case state names, postal codes and FIPS codes to state FIPS
+        codes, and a dataframe with columns state_id_fips, county_name_normalized and
+        county_id_fips.
+    """
+    af = _get_addfips(vintage)
+    # FIPS codes are all digits, so lower casing them is a no-op
+    states = dict(af._states)
+    states.update({fips: fips for fips in af._state_fips})
+    counties = pd.DataFrame(
+        [
+            (state_fips, name, state_fips + county_fips)
+            for state_fips, names in af._counties.items()
+            for name, county_fips in names.items()
+        ],
+        columns=["state_id_fips", "county_name_normalized", "county_id_fips"],
+        dtype="string",
+    )
+    return states, counties
+
+
+@lru_cache(maxsize=None)
+def _get_county_names(vintage: int) -> dict[str, str]:
+    """Get the official county names of an addfips vintage, keyed by county_id_fips."""
+    path = files("addfips").joinpath(addfips.addfips.COUNTY_FILES[vintage])
+    with path.open("rt", encoding="utf-8") as f:
+        counties = pd.read_csv(f, dtype=str)
+    return dict(zip(counties["statefp"] + counties["countyfp"], counties["name"]))
+
+
+def _normalize_county_names(counties: pd.Series, vintage: int) -> pd.Series:
+    """Normalize county names the same way addfips does before looking them up."""
+    af = _get_addfips(vintage)
+    return counties.str.lower().str.replace(
+        af.diacretic_pattern, af.delete_diacretics, regex=True
+    )
+
+
 def add_fips_ids(
     df: pd.DataFrame,
     state_col: str = "state",
@@ -305,35 +796,37 @@ def add_fips_ids(
     df = df.astype({state_col: pd.StringDtype()})
     if county_col:
         df = df.astype({county_col: pd.StringDtype()})
-    af = addfips.AddFIPS(vintage=vintage)
-    # Lookup the state and county FIPS IDs and add them to the dataframe:
-    df["state_id_fips"] = df.apply(
-        lambda x: (
-            af.get_state_fips(state=x[state_col]) if pd.notnull(x[state_col]) else pd.NA
-        ),
-        axis=1,
-    )
-
+    states, counties = _get_fips_lookup_tables(vintage)
+    # Lookup the state and county FIPS IDs of each unique location once, then add
+    # them to the dataframe:
+    key_cols = [state_col, county_col] if county_col else [state_col]
+    locations = df.loc[:, key_cols].drop_duplicates()
     # force the code columns to be nullable strings - the leading zeros are
     # important
-    df = df.astype({"state_id_fips": pd.StringDtype()})
+    locations["state_id_fips"] = (
+        locations[state_col].str.lower().map(states).astype(pd.StringDtype())
+    )
+    if county_col:
+        locations["county_name_normalized"] = _normalize_county_names(
+            locations[county_col], vintage
+        )
+        locations = locations.merge(
+            counties,
+            on=["state_id_fips", "county_name_normalized"],
+            how="left",
+            validate="m:1",
+        ).drop(columns="county_name_normalized")
+
+    fips = df.loc[:, key_cols].merge(locations, on=key_cols, how="left", validate="m:1")
+    df["state_id_fips"] = fips["state_id_fips"].array
+    if county_col:
+        df["county_id_fips"] = fips["county_id_fips"].array
 
     logger.info(
         f"Assigned state FIPS codes for "
         f"{len(df[df.state_id_fips.notnull()])/len(df):.2%} of records."
     )
     if county_col:
-        df["county_id_fips"] = df.apply(
-            lambda x: (
-                af.get_county_fips(state=x[state_col], county=x[county_col])
-                if pd.notnull(x[county_col]) and pd.notnull(x[state_col])
-                else pd.NA
-            ),
-            axis=1,
-        )
-        # force the code columns to be nullable strings - the leading zeros are
-        # important
-        df = df.astype({"county_id_fips": pd.StringDtype()})
         logger.info(
             f"Assigned county FIPS codes for "
             f"{len(df[df.county_id_fips.notnull()])/len(df):.2%} of records."
@@ -0,0 +1,269 @@
+"""Fuzzy match misspelled county names to FIPS codes."""
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
+
+import pandas as pd
+
+from dbcp.helpers import _get_county_names, _get_fips_lookup_tables
+
+logger = logging.getLogger(__name__)
+
+COUNTY_SUFFIX_PATTERN = (
+    r"\s+(?:county|cnty|cty|co|city|city and borough|borough|census area|"
+    r"municipio|municipality|district|parish)$"
+)
+
+
+def normalize_county_name(names: pd.Series) -> pd.Series:
+    """Normalize county names for fuzzy matching.
+
+    Removes accents, punctuation, the county type suffix and 'Saint' abbreviations so
+    only real spelling differences remain.
+
+    Args:
+        names: county names
+
+    Returns:
+        pd.Series: lower case normalized names
+    """
+    return (
+        names.astype("string")
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .astype("string")
+        .str.lower()
+        .str.replace(r"[.'`]", "", regex=True)
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.replace(r"\bsaint\b", "st", regex=True)
+        .str.replace(r"\bsainte\b", "ste", regex=True)
+        .str.replace(r"\bfort\b", "ft", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+        .str.replace(COUNTY_SUFFIX_PATTERN, "", regex=True)
+    )
+
+
+def _trigrams(name: str) -> set[str]:
+    """Split a name into overlapping 3 character sequences, ignoring spaces."""
+    padded = f"  {name.replace(' ', '')} "
+    return {"".join(chars) for chars in zip(padded, padded[1:], padded[2:])}
+
+
+def levenshtein_distance(a: str, b: str) -> int:
+    """Count the single character insertions, deletions and substitutions between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class CountyMatcher(object):
+    """Match misspelled county names to the counties of each state.
+
+    Candidates are retrieved from a trigram index of each state's county names, then
+    scored by edit distance. A name is matched if its best candidate is similar enough
+    and clearly better than the best candidate in a different county. Short names need
+    to be more similar, because a single edit turns many short county names into
+    unrelated place names, eg. Marin into Marina.
+    """
+
+    def __init__(
+        self,
+        vintage: int,
+        min_trigram_similarity: float = 0.3,
+        min_score: float = 0.8,
+        max_distance: int = 2,
+        min_margin: float = 0.1,
+        short_name_length: int = 8,
+        short_min_score: float = 0.85,
+        short_max_distance: int = 1,
+    ) -> None:
+        """Initialize a CountyMatcher object.
+
+        Args:
+            vintage: the addfips vintage of county names and codes.
+            min_trigram_similarity: minimum Jaccard similarity of trigrams for a county
+                to be scored.
+            min_score: minimum similarity score, 1 - distance / length of the longer
+                name, of a match.
+            max_distance: maximum edit distance of a match.
+            min_margin: minimum difference between the scores of the best match and
+                the best candidate in another county.
+            short_name_length: names are short if both the name and its match are
+                shorter than this.
+            short_min_score: minimum similarity score of a match of a short name.
+            short_max_distance: maximum edit distance of a match of a short name.
+        """
+        self.min_trigram_similarity = min_trigram_similarity
+        self.min_score = min_score
+        self.max_distance = max_distance
+        self.min_margin = min_margin
+        self.short_name_length = short_name_length
+        self.short_min_score = short_min_score
+        self.short_max_distance = short_max_distance
+
+        self._county_names = _get_county_names(vintage)
+        _, counties = _get_fips_lookup_tables(vintage)
+        counties = counties.assign(
+            name=normalize_county_name(counties["county_name_normalized"])
+        ).drop_duplicates(subset=["state_id_fips", "name", "county_id_fips"])
+        self._names: dict[str, list[tuple[str, str]]] = defaultdict(list)
+        self._index: dict[str, dict[str, set[int]]] = defaultdict(
+            lambda: defaultdict(set)
+        )
+        for state, name, county_id_fips in counties[
+            ["state_id_fips", "name", "county_id_fips"]
+        ].itertuples(index=False):
+            candidate_id = len(self._names[state])
+            self._names[state].append((name, county_id_fips))
+            for trigram in _trigrams(name):
+                self._index[state][trigram].add(candidate_id)
+
+    def _match_one(self, state: str, query: str) -> dict:
+        """Find the best matching county for one normalized name in one state."""
+        decision = {
+            "matched_name": None,
+            "county_id_fips": None,
+            "distance": None,
+            "score": None,
+            "decision": "no_match",
+        }
+        query_trigrams = _trigrams(query)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for candidate_id in self._index[state].get(trigram, ()):
+                shared[candidate_id] += 1
+
+        best: dict[str, tuple[float, int, str]] = {}  # best candidate per county
+        for candidate_id, n_shared in shared.items():
+            name, county_id_fips = self._names[state][candidate_id]
+            n_union = len(query_trigrams) + len(_trigrams(name)) - n_shared
+            if n_shared / n_union < self.min_trigram_similarity:
+                continue
+            distance = levenshtein_distance(query, name)
+            score = 1 - distance / max(len(query), len(name))
+            if county_id_fips not in best or score > best[county_id_fips][0]:
+                best[county_id_fips] = (score, distance, name)
+        if not best:
+            return decision
+
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)
+        county_id_fips, (score, distance, name) = ranked[0]
+        decision.update(
+            matched_name=name,
+            county_id_fips=county_id_fips,
+            distance=distance,
+            score=score,
+        )
+        if max(len(query), len(name)) < self.short_name_length:
+            min_score, max_distance = self.short_min_score, self.short_max_distance
+        else:
+            min_score, max_distance = self.min_score, self.max_distance
+        if score < min_score or distance > max_distance:
+            decision["decision"] = "below_threshold"
+        elif len(ranked) > 1 and score - ranked[1][1][0] < self.min_margin:
+            decision["decision"] = "ambiguous"
+        else:
+            decision["decision"] = "match"
+        return decision
+
+    def match(
+        self,
+        df: pd.DataFrame,
+        county_col: str = "county",
+        state_fips_col: str = "state_id_fips",
+    ) -> pd.DataFrame:
+        """Fuzzy match county names to counties in the same state.
+
+        Args:
+            df: dataframe with a column of state FIPS codes and a column of county names.
+            county_col: name of the column of county names. Defaults to 'county'.
+            state_fips_col: name of the column of state FIPS codes.
+                Defaults to 'state_id_fips'.
+
+        Returns:
+            pd.DataFrame: the match decision for each unique (state, county name) pair,
+                with columns state_id_fips, county, matched_name, county_id_fips,
+                county_name, distance, score and decision. Decision is one of
+                'match', 'ambiguous', 'below_threshold' or 'no_match'.
+                county_id_fips and county_name, the official name of the matched
+                county, are only filled for matches.
+        """
+        queries = (
+            df.loc[:, [state_fips_col, county_col]]
+            .astype("string")
+            .dropna()
+            .drop_duplicates()
+            .set_axis(["state_id_fips", "county"], axis=1)
+        )
+        queries["normalized"] = normalize_county_name(queries["county"])
+        decisions = pd.DataFrame(
+            [
+                self._match_one(state, query)
+                for state, query in queries[["state_id_fips", "normalized"]].itertuples(
+                    index=False
+                )
+            ],
+            index=queries.index,
+            columns=["matched_name", "county_id_fips", "distance", "score", "decision"],
+        )
+        decisions = pd.concat(
+            [queries[["state_id_fips", "county"]], decisions], axis=1
+        ).reset_index(drop=True)
+        decisions["county_id_fips"] = (
+            decisions["county_id_fips"]
+            .where(decisions["decision"] == "match")
+            .astype("string")
+        )
+        decisions.insert(
+            decisions.columns.get_loc("county_id_fips") + 1,
+            "county_name",
+            decisions["county_id_fips"].map(self._county_names).astype("string"),
+        )
+        return decisions
+
+
+@lru_cache(maxsize=None)
+def get_county_matcher(vintage: int) -> CountyMatcher:
+    """Build the county matcher with default thresholds once per vintage."""
+    return CountyMatcher(vintage)
+
+
+def log_match_decisions(decisions: pd.DataFrame, source: Optional[str] = None) -> None:
+    """Log fuzzy county match decisions for auditing.
+
+    Matches are logged at INFO level, near misses at DEBUG level.
+
+    Args:
+        decisions: output of CountyMatcher.match()
+        source: description of where the names came from, for the log messages.
+    """
+    prefix = f"{source}: " if source else ""
+    counts = decisions["decision"].value_counts().to_dict()
+    logger.info(f"{prefix}Fuzzy county match decisions: {counts}")
+    for row in decisions.itertuples(index=False):
+        if row.decision == "no_match":
+            continue
+        message = (
+            f"{prefix}{row.decision}: '{row.county}' ({row.state_id_fips}) -> "
+            f"'{row.matched_name}' ({row.county_id_fips}), "
+            f"distance={row.distance}, score={row.score:.2f}"
+        )
+        if row.decision == "match":
+            logger.info(message)
+        else:
+            logger.debug(message)
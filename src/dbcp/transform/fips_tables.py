@@ -1,22 +1,96 @@
 """Tranform raw FIPS tables to a database-ready form."""
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Sequence
+from typing import Dict, List, Optional, Sequence
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from joblib import Memory
+import shapely
+
+from dbcp.dataset_cache import SpatialCache
 
 logger = logging.getLogger(__name__)
 
 # cache needs to be accessed outside this module to call .clear()
-# limit cache size to 1 MB, keeps most recently accessed first
-SPATIAL_CACHE = Memory(location=Path("/app/data/spatial_cache"), bytes_limit=2**20)
+SPATIAL_CACHE = SpatialCache(location=Path("/app/data/spatial_cache"))
+# bump when the output of _add_tribal_land_frac changes so cached results are ignored
+TRIBAL_LAND_FRAC_VERSION = 2
+
+
+def _tribal_land_area_km2(counties: np.ndarray, tribal_land: np.ndarray) -> np.ndarray:
+    """Calculate the area of each county covered by tribal land.
+
+    Each county is only intersected with the tribal land polygons that touch it, found
+    with a spatial index. Overlapping tribal land polygons are only counted once.
+
+    Args:
+        counties: county polygons in an equal area projection with units of meters.
+        tribal_land: tribal land polygons in the same projection.
+
+    Returns:
+        the area of tribal land in each county in km^2.
+    """
+    areas = np.zeros(len(counties))
+    county_idx, tribal_idx = shapely.STRtree(tribal_land).query(
+        counties, predicate="intersects"
+    )
+    if county_idx.size == 0:
+        return areas
+    order = np.argsort(county_idx, kind="stable")
+    county_idx, tribal_idx = county_idx[order], tribal_idx[order]
+    splits = np.flatnonzero(np.diff(county_idx)) + 1
+    for county_group, tribal_group in zip(
+        np.split(county_idx, splits), np.split(tribal_idx, splits)
+    ):
+        county = counties[county_group[0]]
+        clipped = shapely.intersection(county, tribal_land[tribal_group])
+        areas[county_group[0]] = shapely.union_all(clipped).area
+    return areas / 1e6
+
+
+def _parallel_tribal_land_area_km2(
+    counties: np.ndarray, tribal_land: np.ndarray, max_workers: Optional[int] = None
+) -> np.ndarray:
+    """Calculate the area of each county covered by tribal land in a process pool.
+
+    Counties are split into chunks. Each worker only receives the tribal land polygons
+    near the counties in its chunk.
+
+    Args:
+        counties: county polygons in an equal area projection with units of meters.
+        tribal_land: tribal land polygons in the same projection.
+        max_workers: number of worker processes. Defaults to the number of CPUs.
+            If 1, the areas are calculated in this process.
+
+    Returns:
+        the area of tribal land in each county in km^2.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        return _tribal_land_area_km2(counties, tribal_land)
+
+    tree = shapely.STRtree(tribal_land)
+    # several chunks per worker to even out the load of large and complex counties
+    chunks = np.array_split(np.arange(len(counties)), max_workers * 4)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for chunk in chunks:
+            nearby = np.unique(tree.query(counties[chunk])[1])
+            futures.append(
+                executor.submit(
+                    _tribal_land_area_km2, counties[chunk], tribal_land[nearby]
+                )
+            )
+        return np.concatenate([future.result() for future in futures])
 
 
-@SPATIAL_CACHE.cache()
 def _add_tribal_land_frac(
-    counties: gpd.GeoDataFrame, tribal_land: gpd.GeoDataFrame
+    counties: gpd.GeoDataFrame,
+    tribal_land: gpd.GeoDataFrame,
+    max_workers: Optional[int] = None,
 ) -> gpd.GeoDataFrame:
     """
     Add tribal_land_frac column to the counties table.
@@ -24,6 +98,8 @@ def _add_tribal_land_frac(
     Args:
         counties: clean county fips table.
         tribal_land: raw tribal land geodataframe.
+        max_workers: number of processes to calculate intersections with. Defaults to
+            the number of CPUs.
 
     Return:
         counties: clean county fips table with tribal_land_frac column.
@@ -33,12 +109,11 @@ def _add_tribal_land_frac(
     counties = counties.to_crs("ESRI:102008")
     tribal_land = tribal_land.to_crs("ESRI:102008")
 
-    dissolved_tribal = tribal_land.dissolve()
-    dissolved_tribal_geometry = dissolved_tribal.geometry.iloc[0]
-
     # Calculate intersection, convert m^2 to km^2
-    counties["tribal_land_intersection"] = (
-        counties.intersection(dissolved_tribal_geometry).area / 1e6
+    counties["tribal_land_intersection"] = _parallel_tribal_land_area_km2(
+        counties.geometry.to_numpy(),
+        tribal_land.geometry.to_numpy(),
+        max_workers=max_workers,
     )
     counties["raw_tribal_land_frac"] = (
         counties["tribal_land_intersection"] / counties["land_area_km2"]
@@ -61,12 +136,23 @@ def _add_tribal_land_frac(
     return counties
 
 
-def county_fips(counties: pd.DataFrame, tribal_land: pd.DataFrame) -> pd.DataFrame:
+def county_fips(
+    counties: pd.DataFrame,
+    tribal_land: pd.DataFrame,
+    sources: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
     """
     Apply transformations to county table.
 
     Args:
         counties: raw census table.
+        tribal_land: raw tribal land geodataframe.
+        sources: versioned URIs of the county and tribal land archives, used to look
+            up the tribal land fractions in the spatial cache. If None, they are
+            always calculated.
+        max_workers: number of processes to calculate tribal land fractions with.
+            Defaults to the number of CPUs.
 
     Returns:
         transformed county_fips table.
@@ -115,7 +201,24 @@ def county_fips(counties: pd.DataFrame, tribal_land: pd.DataFrame) -> pd.DataFra
     # N Nonfunctioning legal entity.
     # S Statistical entity.
 
-    counties = _add_tribal_land_frac(counties, tribal_land)
+    def compute_tribal_land_frac() -> pd.DataFrame:
+        return _add_tribal_land_frac(counties, tribal_land, max_workers).loc[
+            :, ["county_id_fips", "raw_tribal_land_frac", "tribal_land_frac"]
+        ]
+
+    if sources is None:
+        tribal_land_frac = compute_tribal_land_frac()
+    else:
+        # only cache the expensive spatial join, the rest is cheap to recompute
+        tribal_land_frac = SPATIAL_CACHE.get_or_compute(
+            "tribal_land_frac",
+            TRIBAL_LAND_FRAC_VERSION,
+            sources,
+            compute_tribal_land_frac,
+        )
+    counties = pd.DataFrame(counties.drop(columns="geometry")).merge(
+        tribal_land_frac, on="county_id_fips", how="left", validate="1:1"
+    )
 
     return counties
 
@@ -152,12 +255,20 @@ def state_fips(states: pd.DataFrame) -> pd.DataFrame:
     return states
 
 
-def transform(fips_tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+def transform(
+    fips_tables: Dict[str, pd.DataFrame],
+    sources: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
     """
     Transform state and county FIPS dataframes.
 
     Args:
         fips_tables: Dictionary of the raw extracted data for each FIPS table.
+        sources: versioned URIs of the county and tribal land archives, used as the
+            spatial cache key. If None, the spatial cache isn't used.
+        max_workers: number of processes to calculate tribal land fractions with.
+            Defaults to the number of CPUs.
 
     Returns:
         transformed_fips_tables: Dictionary of the transformed tables.
@@ -165,9 +276,13 @@ def transform(fips_tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
     transformed_fips_tables = {}
 
     transformed_fips_tables["county_fips"] = county_fips(
-        fips_tables["counties"], fips_tables["tribal_land"]
+        fips_tables["counties"],
+        fips_tables["tribal_land"],
+        sources=sources,
+        max_workers=max_workers,
     )
     transformed_fips_tables["state_fips"] = state_fips(fips_tables["states"])
+    logger.info(f"Spatial cache stats: {SPATIAL_CACHE.stats}")
 
     return transformed_fips_tables
 
@@ -0,0 +1,322 @@
+"""Resolve place names to counties offline with Census Gazetteer data."""
+import difflib
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import geopandas as gpd
+import pandas as pd
+
+from dbcp.extract.fips_tables import (
+    CENSUS_URI,
+    GAZETTEER_COUSUBS_URI,
+    GAZETTEER_PLACES_URI,
+    _extract_census_counties,
+    extract_census_gazetteer,
+)
+
+logger = logging.getLogger(__name__)
+
+# legal/statistical area descriptions that are added to place names
+LSAD_SUFFIXES = (
+    "city and borough",
+    "charter township",
+    "unified government",
+    "consolidated government",
+    "metropolitan government",
+    "urban county",
+    "census area",
+    "municipality",
+    "zona urbana",
+    "plantation",
+    "reservation",
+    "township",
+    "borough",
+    "village",
+    "comunidad",
+    "location",
+    "purchase",
+    "county",
+    "parish",
+    "city",
+    "town",
+    "cdp",
+    "gore",
+    "grant",
+)
+LSAD_PREFIXES = (
+    "charter township",
+    "township",
+    "borough",
+    "village",
+    "county",
+    "city",
+    "town",
+)
+_SUFFIX_PATTERN = r"(?:\s+(?:" + "|".join(LSAD_SUFFIXES) + r"))+$"
+_PREFIX_PATTERN = r"^(?:" + "|".join(LSAD_PREFIXES) + r")\s+of\s+"
+
+# locality types use the same vocabulary as GoogleGeocoder.admin_type
+LOCALITY_TYPE_PRIORITY = {"county": 0, "city": 1, "town": 2}
+
+
+def normalize_place_name(names: pd.Series) -> pd.Series:
+    """Normalize place names so different spellings of the same place compare equal.
+
+    Removes accents, punctuation, parentheticals, 'City of'-style prefixes and
+    'township'-style suffixes, and abbreviates 'Saint' to 'st'.
+
+    Args:
+        names: place names
+
+    Returns:
+        pd.Series: lower case normalized names
+    """
+    return (
+        names.astype("string")
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .astype("string")
+        .str.lower()
+        .str.replace(r"\(.*?\)", " ", regex=True)
+        .str.replace("&", " and ", regex=False)
+        .str.replace(r"\bsaint\b|\bst\.", "st", regex=True)
+        .str.replace(r"\bsainte\b|\bste\.", "ste", regex=True)
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+        .str.replace(_PREFIX_PATTERN, "", regex=True)
+        .str.replace(_SUFFIX_PATTERN, "", regex=True)
+    )
+
+
+def _strip_lsad(names: pd.Series) -> pd.Series:
+    """Remove the legal/statistical area description from gazetteer names.
+
+    The Census appends descriptions in lower case (eg. 'Madison city', 'Bethesda CDP'),
+    which distinguishes them from names like 'Carson City'.
+    """
+    pattern = r"\s+(?:" + "|".join(LSAD_SUFFIXES) + r"|CDP)$"
+    return names.str.replace(pattern, "", regex=True)
+
+
+def build_gazetteer(
+    places: pd.DataFrame, cousubs: pd.DataFrame, counties: gpd.GeoDataFrame
+) -> pd.DataFrame:
+    """Build an index of place names and the counties that contain them.
+
+    Places (cities, villages, CDPs etc.) are assigned to the county containing their
+    internal point, the same way the Google geocoder assigns a city to the county that
+    contains its center. County subdivisions (towns and townships) are nested in
+    counties so their county is part of their GEOID. Counties are included so
+    misspelled county names can be fuzzy matched.
+
+    Args:
+        places: raw Census Gazetteer places table
+        cousubs: raw Census Gazetteer county subdivisions table
+        counties: raw Census TIGER county shapefile
+
+    Returns:
+        pd.DataFrame: one row per place with columns state_id_fips, name_normalized,
+            geocoded_locality_name, geocoded_locality_type, county_id_fips and
+            geocoded_containing_county
+    """
+    county_names = counties.set_index("GEOID")["NAMELSAD"]
+
+    points = gpd.GeoDataFrame(
+        places[["GEOID", "NAME"]],
+        geometry=gpd.points_from_xy(
+            places["INTPTLONG"].astype(float), places["INTPTLAT"].astype(float)
+        ),
+        crs="EPSG:4269",  # NAD83, same as TIGER
+    )
+    containing = gpd.sjoin(
+        points,
+        counties[["GEOID", "geometry"]].to_crs("EPSG:4269"),
+        how="inner",
+        predicate="within",
+        lsuffix="place",
+        rsuffix="county",
+    )
+    place_index = pd.DataFrame(
+        {
+            "state_id_fips": containing["GEOID_place"].str[:2],
+            "geocoded_locality_name": _strip_lsad(containing["NAME"]),
+            "geocoded_locality_type": "city",
+            "county_id_fips": containing["GEOID_county"],
+        }
+    )
+
+    # statistical and fictitious subdivisions (eg. census county divisions) aren't
+    # names people use for places
+    cousubs = cousubs.loc[~cousubs["FUNCSTAT"].isin({"F", "S"})]
+    cousub_index = pd.DataFrame(
+        {
+            "state_id_fips": cousubs["GEOID"].str[:2],
+            "geocoded_locality_name": _strip_lsad(cousubs["NAME"]),
+            "geocoded_locality_type": "town",
+            "county_id_fips": cousubs["GEOID"].str[:5],
+        }
+    )
+
+    county_index = pd.DataFrame(
+        {
+            "state_id_fips": counties["STATEFP"],
+            "geocoded_locality_name": counties["NAMELSAD"],
+            "geocoded_locality_type": "county",
+            "county_id_fips": counties["GEOID"],
+        }
+    )
+
+    gazetteer = pd.concat([place_index, cousub_index, county_index], ignore_index=True)
+    gazetteer["name_normalized"] = normalize_place_name(
+        gazetteer["geocoded_locality_name"]
+    )
+    gazetteer["geocoded_containing_county"] = gazetteer["county_id_fips"].map(
+        county_names
+    )
+    gazetteer = gazetteer.loc[gazetteer["name_normalized"].str.len() > 0]
+    return gazetteer.astype("string").reset_index(drop=True)
+
+
+@lru_cache(maxsize=1)
+def _get_gazetteer() -> pd.DataFrame:
+    """Build the gazetteer from the archived Census data once per process."""
+    logger.info("Building the place name gazetteer.")
+    return build_gazetteer(
+        places=extract_census_gazetteer(GAZETTEER_PLACES_URI),
+        cousubs=extract_census_gazetteer(GAZETTEER_COUSUBS_URI),
+        counties=_extract_census_counties(CENSUS_URI),
+    )
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer() -> Optional[pd.DataFrame]:
+    """Get the gazetteer, or None if the archived Census data can't be loaded.
+
+    The gazetteer only saves geocoding API calls, so the ETL carries on without it.
+    """
+    try:
+        return _get_gazetteer()
+    except Exception as e:
+        logger.warning(
+            f"Unable to load the place name gazetteer, names will be geocoded: {e}"
+        )
+        return None
+
+
+def _unambiguous_matches(candidates: pd.DataFrame, key_cols: list[str]) -> pd.DataFrame:
+    """Keep the best candidate for each key, if all its candidates share a county."""
+    n_counties = candidates.groupby(key_cols)["county_id_fips"].transform("nunique")
+    candidates = candidates.loc[n_counties == 1].copy()
+    # prefer the broadest type, eg. "Dane" is Dane County, not the village of Dane
+    candidates["priority"] = candidates["geocoded_locality_type"].map(
+        LOCALITY_TYPE_PRIORITY
+    )
+    return (
+        candidates.sort_values("priority", kind="stable")
+        .drop_duplicates(subset=key_cols)
+        .drop(columns="priority")
+    )
+
+
+def lookup_counties(
+    df: pd.DataFrame,
+    locality_col: str = "county",
+    gazetteer: Optional[pd.DataFrame] = None,
+    fuzzy_cutoff: float = 0.9,
+    min_fuzzy_length: int = 5,
+    fuzzy: bool = True,
+) -> pd.DataFrame:
+    """Look up the counties containing places in the gazetteer.
+
+    Names are first matched exactly after normalization. Remaining names are fuzzy
+    matched against the names in the same state. A name is only resolved if all its
+    matches are in the same county; ambiguous names are left for the geocoding API.
+
+    Args:
+        df: dataframe with a state_id_fips column and a column of place names.
+        locality_col: name of the column of place names. Defaults to 'county'.
+        gazetteer: output of build_gazetteer(). Defaults to the gazetteer built from
+            archived Census data.
+        fuzzy_cutoff: minimum difflib similarity ratio for a fuzzy match.
+        min_fuzzy_length: names shorter than this are only matched exactly.
+        fuzzy: whether to fuzzy match names that don't match exactly.
+
+    Returns:
+        pd.DataFrame: new columns 'county_id_fips', 'geocoded_locality_name',
+            'geocoded_locality_type', 'geocoded_containing_county' with the same
+            index as df. Unresolved rows are null.
+    """
+    if gazetteer is None:
+        gazetteer = _get_gazetteer()
+    out_cols = [
+        "county_id_fips",
+        "geocoded_locality_name",
+        "geocoded_locality_type",
+        "geocoded_containing_county",
+    ]
+    key_cols = ["state_id_fips", "name_normalized"]
+
+    queries = pd.DataFrame(
+        {
+            "state_id_fips": df["state_id_fips"].astype("string"),
+            "name_normalized": normalize_place_name(df[locality_col]),
+        },
+        index=df.index,
+    )
+    unique_queries = queries.dropna().drop_duplicates()
+
+    exact = _unambiguous_matches(
+        unique_queries.merge(gazetteer, on=key_cols, how="inner"), key_cols
+    )
+
+    # fuzzy match the rest within each state
+    unmatched = unique_queries.merge(
+        exact[key_cols], on=key_cols, how="left", indicator=True
+    )
+    unmatched = unmatched.loc[
+        (unmatched["_merge"] == "left_only")
+        & (unmatched["name_normalized"].str.len() >= min_fuzzy_length),
+        key_cols,
+    ]
+    if not fuzzy:
+        unmatched = unmatched.iloc[:0]
+    names_by_state = gazetteer.groupby("state_id_fips")["name_normalized"].unique()
+    fuzzy_pairs = []
+    for state, name in unmatched.itertuples(index=False):
+        if state not in names_by_state.index:
+            continue
+        for match in difflib.get_close_matches(
+            name, names_by_state[state], n=3, cutoff=fuzzy_cutoff
+        ):
+            fuzzy_pairs.append((state, name, match))
+    fuzzy_pairs = pd.DataFrame(
+        fuzzy_pairs, columns=key_cols + ["matched_name"], dtype="string"
+    )
+    fuzzy = _unambiguous_matches(
+        fuzzy_pairs.merge(
+            gazetteer,
+            left_on=["state_id_fips", "matched_name"],
+            right_on=key_cols,
+            how="inner",
+            suffixes=("", "_gazetteer"),
+        ).drop(columns=["matched_name", "name_normalized_gazetteer"]),
+        key_cols,
+    )
+
+    matches = pd.concat([exact, fuzzy], ignore_index=True)[key_cols + out_cols]
+    logger.info(
+        f"Resolved {len(exact)} place names exactly and {len(fuzzy)} fuzzily out of "
+        f"{len(unique_queries)} with the gazetteer."
+    )
+    index_name = df.index.name if df.index.name is not None else "index"
+    resolved = (
+        queries.rename_axis(index_name)
+        .reset_index()
+        .merge(matches, on=key_cols, how="left", validate="m:1")
+        .set_index(index_name)[out_cols]
+    )
+    resolved.index.name = df.index.name
+    return resolved.astype("string")
@@ -1,15 +1,269 @@
 """Classes and functions for geocoding address data using Google API."""
+import json
 import os
-from functools import lru_cache
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from logging import getLogger
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from warnings import warn
 
 import googlemaps
+import numpy as np
+import pandas as pd
 
 logger = getLogger("__name__")
 
 
+class GeocodeCache(object):
+    """A persistent key-value store of raw geocoding API responses.
+
+    Responses are stored in a SQLite database keyed on the normalized
+    (name, state, country) of the request, so each place only has to be geocoded once
+    no matter which dataset or dataframe it came from. Empty responses (place not
+    found) are cached too.
+
+    A new connection is opened for every operation so the cache can be shared by the
+    threads and processes of a parallel ETL run.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Initialize a GeocodeCache object.
+
+        Args:
+            path: path to the SQLite database file. It is created if it doesn't exist.
+        """
+        self.path = Path(path)
+        self._initialized = False
+
+    @staticmethod
+    def normalize_key(name: str, state: str, country: str) -> tuple[str, str, str]:
+        """Normalize whitespace and capitalization so equivalent requests share a key."""
+        name, state, country = (
+            " ".join(str(part).split()).lower() for part in (name, state, country)
+        )
+        return name, state, country
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=60)
+        if not self._initialized:
+            with con:
+                con.execute("PRAGMA journal_mode=WAL")
+                con.execute(
+                    """CREATE TABLE IF NOT EXISTS responses (
+                        name TEXT NOT NULL,
+                        state TEXT NOT NULL,
+                        country TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        PRIMARY KEY (name, state, country)
+                    )"""
+                )
+            self._initialized = True
+        return con
+
+    def get(self, name: str, state: str, country: str) -> Optional[List[Dict]]:
+        """Look up a cached response.
+
+        Args:
+            name: place name
+            state: state name or abbreviation
+            country: country name or abbreviation
+
+        Returns:
+            the raw API response (a list of results), or None if the request isn't cached.
+        """
+        key = self.normalize_key(name, state, country)
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT response FROM responses WHERE name = ? AND state = ? AND country = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, name: str, state: str, country: str, response: List[Dict]) -> None:
+        """Save a response, replacing any previously cached one.
+
+        Args:
+            name: place name
+            state: state name or abbreviation
+            country: country name or abbreviation
+            response: the raw API response (a list of results)
+        """
+        key = self.normalize_key(name, state, country)
+        with closing(self._connect()) as con, con:
+            con.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (*key, json.dumps(response)),
+            )
+
+    def __len__(self) -> int:
+        """Count the cached responses."""
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        """Delete all cached responses."""
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+        self._initialized = False
+
+
+class GeocodingStats(object):
+    """Thread-safe counters and API latencies of geocoding done for one source."""
+
+    COUNTERS = (
+        "rows",
+        "add_fips_ids_hits",
+        "fuzzy_county_hits",
+        "gazetteer_hits",
+        "geocoded_rows",
+        "unique_places",
+        "cache_hits",
+        "api_calls",
+        "api_errors",
+        "not_found",
+        "unresolved_rows",
+    )
+    LATENCY_PERCENTILES = (50, 90, 99)
+
+    def __init__(self) -> None:
+        """Initialize a GeocodingStats object with all counters at zero."""
+        self.counts: Counter = Counter()
+        self.api_latencies: List[float] = []
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str, n: int = 1) -> None:
+        """Add n to one of the COUNTERS."""
+        if counter not in GeocodingStats.COUNTERS:
+            raise ValueError(f"Unknown geocoding counter: {counter}")
+        with self._lock:
+            self.counts[counter] += int(n)
+
+    def record_api_call(self, seconds: float, found: bool) -> None:
+        """Record the latency and outcome of one API request."""
+        with self._lock:
+            self.counts["api_calls"] += 1
+            self.counts["not_found"] += not found
+            self.api_latencies.append(seconds)
+
+    def add_time(self, seconds: float) -> None:
+        """Add to the total time spent filling county FIPS codes."""
+        with self._lock:
+            self.seconds += seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        """Summarize the counters, total time and API latency percentiles in seconds."""
+        with self._lock:
+            summary = {counter: self.counts[counter] for counter in self.COUNTERS}
+            summary["seconds"] = round(self.seconds, 3)
+            latencies = np.array(self.api_latencies)
+        for percentile in self.LATENCY_PERCENTILES:
+            summary[f"api_latency_p{percentile}"] = (
+                round(float(np.percentile(latencies, percentile)), 3)
+                if latencies.size
+                else None
+            )
+        return summary
+
+
+_current_stats = GeocodingStats()
+
+
+def get_geocoding_stats() -> GeocodingStats:
+    """Get the stats that geocoding in this process is currently recorded to."""
+    return _current_stats
+
+
+@contextmanager
+def record_geocoding_stats() -> Iterator[GeocodingStats]:
+    """Record geocoding stats to a new GeocodingStats object within the context.
+
+    The stats are process-wide, so they include work done in threads, but only one
+    source should be processed at a time in each process.
+    """
+    global _current_stats
+    previous = _current_stats
+    _current_stats = GeocodingStats()
+    try:
+        yield _current_stats
+    finally:
+        _current_stats = previous
+
+
+def log_geocoding_summary(summary: Dict[str, Dict[str, float]]) -> None:
+    """Log geocoding stats per source as a table and as one JSON line per source.
+
+    Args:
+        summary: mapping of source name to GeocodingStats.to_dict() output.
+    """
+    if not summary:
+        logger.info("No geocoding was done in this run.")
+        return
+    table = pd.DataFrame.from_dict(summary, orient="index").rename_axis("source")
+    logger.info(f"Geocoding summary:\n{table.to_string()}")
+    for source, stats in summary.items():
+        logger.info(f"geocoding_stats {json.dumps({'source': source, **stats})}")
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket rate limiter.
+
+    Tokens are added at a constant rate up to a maximum burst size. Each request
+    consumes one token and waits until one is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        """Initialize a TokenBucket object.
+
+        Args:
+            rate: tokens added per second, i.e. the sustained requests per second.
+            capacity: maximum number of tokens that can accumulate. Defaults to rate
+                (at least one), allowing up to one second of requests in a burst.
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = max(rate, 1) if capacity is None else capacity
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+try:  # docker path
+    geocoder_local_cache = Path("/app/data/geocoder_cache")
+    assert geocoder_local_cache.exists()
+except AssertionError:  # local path
+    # 4 directories above current module
+    geocoder_local_cache = Path(__file__).resolve().parents[3] / "data/geocoder_cache"
+    assert geocoder_local_cache.exists()
+# cache needs to be accessed outside this module to call .clear()
+GEOCODER_CACHE = GeocodeCache(geocoder_local_cache / "geocode_responses.sqlite")
+
+
 class GoogleGeocoder(object):
     """Class to interact with Google's Geocoding API."""
 
@@ -22,8 +276,32 @@ class GoogleGeocoder(object):
     TOWN_LABEL = "administrative_area_level_3"
     STREET_LABELS = {"street_number", "route"}
 
-    def __init__(self, key=None) -> None:
-        """Initialize a GoogleGeocoder object."""
+    RETRIABLE_ERRORS = (
+        googlemaps.exceptions.Timeout,
+        googlemaps.exceptions.TransportError,
+    )
+
+    def __init__(
+        self,
+        key=None,
+        cache: Optional[GeocodeCache] = None,
+        queries_per_second: float = 50,
+        max_retries: int = 3,
+        base_url: Optional[str] = None,
+    ) -> None:
+        """Initialize a GoogleGeocoder object.
+
+        Args:
+            key: Google Maps Platform API key. Defaults to the API_KEY_GOOGLE_MAPS
+                environment variable.
+            cache: persistent cache of API responses. Defaults to GEOCODER_CACHE.
+            queries_per_second: maximum rate of API requests, shared by all threads
+                of geocode_many().
+            max_retries: number of times to retry a request that failed with a
+                connection error or timeout. The googlemaps client already retries
+                server errors and OVER_QUERY_LIMIT responses.
+            base_url: base URL of the API. Defaults to Google's. Used for testing.
+        """
         if key is None:
             try:
                 key = os.environ["API_KEY_GOOGLE_MAPS"]
@@ -37,7 +315,14 @@ class GoogleGeocoder(object):
                 else:
                     raise e
 
-        self.client = googlemaps.Client(key=key)
+        client_kwargs = {} if base_url is None else {"base_url": base_url}
+        # rate limiting is done by the shared token bucket instead of the client
+        self.client = googlemaps.Client(
+            key=key, queries_per_second=10**6, **client_kwargs
+        )
+        self.cache = GEOCODER_CACHE if cache is None else cache
+        self.rate_limiter = TokenBucket(queries_per_second)
+        self.max_retries = max_retries
         self._clear_cache()
         return
 
@@ -45,20 +330,115 @@ class GoogleGeocoder(object):
         self, name: str, state: str, country: Optional[str] = None
     ) -> None:
         """Make a geocode equest."""
-        self._clear_cache()
         if country is None:
             country = "US"
+        self._set_response(
+            name, state, country, self._load_response(name, state, country)
+        )
+        return
+
+    def geocode_many(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        country: Optional[str] = None,
+        max_workers: int = 8,
+    ) -> List[List[str]]:
+        """Geocode many (name, state) pairs concurrently.
+
+        Cached responses are looked up first. Requests for the remaining unique places
+        are sent from a thread pool, limited to queries_per_second overall.
+
+        Args:
+            pairs: (name, state) pairs to geocode.
+            country: country name or abbreviation. Defaults to 'US'.
+            max_workers: maximum number of concurrent API requests.
+
+        Returns:
+            List[List[str]]: the output of describe() for each pair, in input order.
+        """
+        if country is None:
+            country = "US"
+        pairs = list(pairs)
+        responses: Dict[Tuple[str, str, str], List[Dict]] = {}
+        misses: Dict[Tuple[str, str, str], Tuple[str, str]] = {}
+        for name, state in pairs:
+            key = GeocodeCache.normalize_key(name, state, country)
+            if key in responses or key in misses:
+                continue
+            response = self.cache.get(name, state, country)
+            if response is None:
+                misses[key] = (name, state)
+            else:
+                responses[key] = response
+        stats = get_geocoding_stats()
+        stats.increment("unique_places", len(responses) + len(misses))
+        stats.increment("cache_hits", len(responses))
+        # cached "not found" responses, the API calls count their own
+        stats.increment(
+            "not_found", sum(not response for response in responses.values())
+        )
+
+        if misses:
+            logger.info(f"Geocoding {len(misses)} places not found in the cache.")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetched = executor.map(
+                    lambda pair: self._fetch_response(*pair, country), misses.values()
+                )
+                responses.update(zip(misses.keys(), fetched))
+
+        out = []
+        for name, state in pairs:
+            key = GeocodeCache.normalize_key(name, state, country)
+            self._set_response(name, state, country, responses[key])
+            out.append(self.describe())
+        return out
+
+    def _load_response(self, name: str, state: str, country: str) -> List[Dict]:
+        """Get the raw response for a place from the cache or the API."""
+        response = self.cache.get(name, state, country)
+        if response is None:
+            response = self._fetch_response(name, state, country)
+        else:
+            stats = get_geocoding_stats()
+            stats.increment("cache_hits")
+            stats.increment("not_found", not response)
+        return response
+
+    def _fetch_response(self, name: str, state: str, country: str) -> List[Dict]:
+        """Request a place from the API, retrying connection errors, and cache it."""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = _get_geocode_response(
+                    client=self.client, name=name, state=state, country=country
+                )
+                break
+            except GoogleGeocoder.RETRIABLE_ERRORS as e:
+                get_geocoding_stats().increment("api_errors")
+                if attempt == self.max_retries:
+                    raise
+                delay = 2**attempt
+                logger.warning(
+                    f"Geocoding {name}, {state}, {country} failed: {e!r}. Retrying in {delay} s."
+                )
+                time.sleep(delay)
+        self.cache.put(name, state, country, response)
+        return response
+
+    def _set_response(
+        self, name: str, state: str, country: str, response: List[Dict]
+    ) -> None:
+        """Replace the current request and response."""
+        self._clear_cache()
         self._name = name
         self._state = state
         self._country = country
-        self._response = _get_geocode_response(
-            client=self.client, name=name, state=state, country=country
-        )
+        # first result is the best match. Empty list = not found
+        self._response = response[0] if response else {}
         if not self._response:  # empty dict
             logger.info(
                 f"Address not found: {self._name}, {self._state}, {self._country}"
             )
-
         return
 
     def _clear_cache(self) -> None:
@@ -175,14 +555,13 @@ class GoogleGeocoder(object):
         return [self.locality_name, self.admin_type, self.containing_county]
 
 
-@lru_cache(maxsize=512)
 def _get_geocode_response(
     *, client: googlemaps.Client, name: str, state: str, country: str
-) -> Dict:
+) -> List[Dict]:
     """Get Google Maps Platform's interpretation of which place a name belongs to.
 
-    This pure function with hashable inputs is factored out of the GoogleGeocoder class
-    to enable memoization of API calls.
+    This function is factored out of the GoogleGeocoder class so the raw response can
+    be stored in the GeocodeCache.
 
     Args:
         client (googlemaps.Client): the Google Maps Platform client
@@ -191,14 +570,15 @@ def _get_geocode_response(
         country (str): country name or abbreviation
 
     Returns:
-        Dict: JSON response as a nested python dictionary
+        List[Dict]: JSON response as a list of results, most likely match first.
+            Empty if the place was not found.
     """
     address = f"{name}, {state}"
     components = {"administrative_area": state, "country": country}
-    # Google's API library has built-in rate-limiting (50 per second)
-    # and retries with exponential backoff
+    # Google's API library retries server errors with exponential backoff
+    start = time.monotonic()
     response = client.geocode(address, components=components)
-    try:
-        return response[0]
-    except IndexError:  # empty list = not found
-        return {}
+    get_geocoding_stats().record_api_call(
+        time.monotonic() - start, found=bool(response)
+    )
+    return response
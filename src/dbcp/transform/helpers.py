@@ -1,14 +1,15 @@
 """Common transform operations."""
 
-from pathlib import Path
+import time
 from typing import Any, Dict, List, Optional, Sequence
 
 import pandas as pd
-from joblib import Memory
 
 from dbcp.constants import FIPS_CODE_VINTAGE
 from dbcp.helpers import add_fips_ids
-from dbcp.transform.geocoding import GoogleGeocoder
+from dbcp.transform.county_matcher import get_county_matcher, log_match_decisions
+from dbcp.transform.gazetteer import load_gazetteer, lookup_counties
+from dbcp.transform.geocoding import GoogleGeocoder, get_geocoding_stats
 
 UNIX_EPOCH_ORIGIN = pd.Timestamp("01/01/1970")
 # Excel parser is simplified and will be one day off for dates < 1900/03/01
@@ -17,18 +18,6 @@ UNIX_EPOCH_ORIGIN = pd.Timestamp("01/01/1970")
 # See xlrd.xldate.py:xldate_as_datetime for complete implementation.
 EXCEL_EPOCH_ORIGIN = pd.Timestamp("12/30/1899")
 
-try:  # docker path
-    # 3 directories above current module
-    geocoder_local_cache = Path("/app/data/geocoder_cache")
-    assert geocoder_local_cache.exists()
-except AssertionError:  # local path
-    # 4 directories above current module
-    geocoder_local_cache = Path(__file__).resolve().parents[3] / "data/geocoder_cache"
-    assert geocoder_local_cache.exists()
-# cache needs to be accessed outside this module to call .clear()
-# limit cache size to 100 KB, keeps most recently accessed first
-GEOCODER_CACHE = Memory(location=geocoder_local_cache, bytes_limit=2**19)
-
 
 def normalize_multicolumns_to_rows(
     df: pd.DataFrame,
@@ -241,62 +230,116 @@ def parse_dates(series: pd.Series, expected_mean_year=2020) -> pd.Series:
         return multiformat_string_date_parser(series)
 
 
-def _geocode_row(
-    ser: pd.Series, client: GoogleGeocoder, state_col="state", locality_col="county"
-) -> List[str]:
-    """Function to pass into pandas df.apply() to geocode state/locality pairs.
+def _geocode_locality(
+    state_locality_df: pd.DataFrame, state_col="state", locality_col="county"
+) -> pd.DataFrame:
+    """Use Google Maps Platform API to look up information about state/locality pairs in a dataframe.
 
     Args:
-        ser (pd.Series): a row of a larger dataframe to geocode
-        client (GoogleGeocoder): client for Google Maps Platform API
+        state_locality_df (pd.DataFrame): dataframe with state and locality columns
         state_col (str, optional): name of the column of state names. Defaults to 'state'.
         locality_col (str, optional): name of the column of locality names. Defaults to 'county'.
 
     Returns:
-        List[str]: geocoded_locality_name, geocoded_locality_type, and geocoded_containing_county
+        pd.DataFrame: new columns 'geocoded_locality_name', 'geocoded_locality_type', 'geocoded_containing_county'
     """
-    client.geocode_request(name=ser[locality_col], state=ser[state_col])
-    return client.describe()
+    # API responses are cached per place in GEOCODER_CACHE, so only places that
+    # have never been geocoded before result in API calls.
+    geocoder = GoogleGeocoder()
+    pairs = zip(state_locality_df[locality_col], state_locality_df[state_col])
+    new_cols = pd.DataFrame(
+        geocoder.geocode_many(pairs),
+        index=state_locality_df.index,
+        columns=[
+            "geocoded_locality_name",
+            "geocoded_locality_type",
+            "geocoded_containing_county",
+        ],
+        dtype=object,
+    )
+    return new_cols
 
 
-@GEOCODER_CACHE.cache()
-def _geocode_locality(
-    state_locality_df: pd.DataFrame, state_col="state", locality_col="county"
+def _add_county_fips_with_geocoding(
+    nan_fips: pd.DataFrame, state_col: str, locality_col: str
 ) -> pd.DataFrame:
-    """Use Google Maps Platform API to look up information about state/locality pairs in a dataframe.
+    """Add county FIPS codes to localities with the Google Maps Platform API.
 
     Args:
-        state_locality_df (pd.DataFrame): dataframe with state and locality columns
-        state_col (str, optional): name of the column of state names. Defaults to 'state'.
-        locality_col (str, optional): name of the column of locality names. Defaults to 'county'.
+        nan_fips (pd.DataFrame): output of add_fips_ids() for localities without a county FIPS code
+        state_col (str): name of the column of state names.
+        locality_col (str): name of the column of locality names.
 
     Returns:
-        pd.DataFrame: new columns 'geocoded_locality_name', 'geocoded_locality_type', 'geocoded_containing_county'
+        pd.DataFrame: copy of nan_fips with new FIPS codes and new columns 'geocoded_locality_name', 'geocoded_locality_type', 'geocoded_containing_county'
     """
-    # NOTE: the purpose of the cache decorator is primarily to
-    # reduce API calls during development. A secondary benefit is to reduce
-    # execution time due to slow synchronous requests.
-    # That's why this is persisted to disk with joblib, not in memory with LRU_cache or something.
-    # Because it is on disk, caching the higher level dataframe function causes less IO overhead
-    # than caching individual API calls would.
-    # Because the entire input dataframe must be identical to the cached version, I
-    # recommend subsetting the dataframe to only state_col and locality_col when calling
-    # this function. That allows other, unrelated columns to change but still use the geocode cache.
-    geocoder = GoogleGeocoder()
-    new_cols = state_locality_df.apply(
-        _geocode_row,
-        axis=1,
-        result_type="expand",
-        client=geocoder,
+    # Deduplicate on the state and locality columns to minimize API calls
+    key_cols = [state_col, locality_col]
+    deduped_nan_fips = nan_fips.loc[:, key_cols].drop_duplicates()
+    deduped_geocoded = _geocode_locality(
+        deduped_nan_fips,
         state_col=state_col,
         locality_col=locality_col,
     )
-    new_cols.columns = [
-        "geocoded_locality_name",
-        "geocoded_locality_type",
-        "geocoded_containing_county",
-    ]
-    return new_cols
+    # recombine deduped geocoded data with original nan_fips
+    geocoded_deduped_nan_fips = pd.concat(
+        [deduped_nan_fips[key_cols], deduped_geocoded], axis=1
+    )
+    index_name = nan_fips.index.name
+    index_name = index_name if index_name is not None else "index"
+    geocoded = (
+        nan_fips.reset_index()
+        .merge(geocoded_deduped_nan_fips, on=key_cols, how="left", validate="m:1")
+        .set_index(index_name)[deduped_geocoded.columns]
+    )
+
+    nan_fips = pd.concat([nan_fips, geocoded], axis=1)
+    # add fips using geocoded names
+    return add_fips_ids(
+        nan_fips,
+        state_col=state_col,
+        county_col="geocoded_containing_county",
+        vintage=FIPS_CODE_VINTAGE,
+    )
+
+
+def _add_county_fips_with_gazetteer(
+    nan_fips: pd.DataFrame,
+    locality_col: str,
+    gazetteer: Optional[pd.DataFrame],
+    resolved: List[pd.DataFrame],
+    fuzzy: bool,
+) -> pd.DataFrame:
+    """Resolve localities with the gazetteer.
+
+    Args:
+        nan_fips: rows without county FIPS codes.
+        locality_col: name of the column of locality names.
+        gazetteer: output of load_gazetteer(). If None, nothing is resolved.
+        resolved: list the resolved rows are appended to, with the standard
+            geocoded_* columns.
+        fuzzy: whether to fuzzy match place names.
+
+    Returns:
+        pd.DataFrame: the rows of nan_fips that are still unresolved.
+    """
+    if gazetteer is None or nan_fips.empty:
+        return nan_fips
+    matches = lookup_counties(
+        nan_fips, locality_col=locality_col, gazetteer=gazetteer, fuzzy=fuzzy
+    )
+    in_gazetteer = matches["county_id_fips"].notna().to_numpy()
+    resolved.append(
+        pd.concat(
+            [
+                nan_fips.loc[in_gazetteer, :].drop(columns="county_id_fips"),
+                matches.loc[in_gazetteer, :],
+            ],
+            axis=1,
+        )
+    )
+    get_geocoding_stats().increment("gazetteer_hits", in_gazetteer.sum())
+    return nan_fips.loc[~in_gazetteer, :]
 
 
 def add_county_fips_with_backup_geocoding(
@@ -305,7 +348,9 @@ def add_county_fips_with_backup_geocoding(
     """Add state and county FIPS codes to a DataFrame with state and locality columns.
 
     This function is tolerant of mis-spellings and heterogeneous town/city/county types
-    because it uses the Google Maps Platform API to re-process initial matching failures.
+    because it re-processes initial matching failures with exact names from a gazetteer
+    of Census places and county subdivisions, a fuzzy county name matcher, fuzzy
+    gazetteer matches, then with the Google Maps Platform API.
 
     Args:
         state_locality_df (pd.DataFrame): dataframe with state and locality columns
@@ -315,6 +360,9 @@ def add_county_fips_with_backup_geocoding(
     Returns:
         pd.DataFrame: copy of state_locality_df with new columns 'geocoded_locality_name', 'geocoded_locality_type', 'geocoded_containing_county'
     """
+    start = time.monotonic()
+    stats = get_geocoding_stats()
+    stats.increment("rows", len(state_locality_df))
     filled_state_locality = state_locality_df.loc[:, [state_col, locality_col]].fillna(
         ""
     )  # copy
@@ -327,11 +375,13 @@ def add_county_fips_with_backup_geocoding(
         vintage=FIPS_CODE_VINTAGE,
     )
     fips_is_nan = with_fips.loc[:, "county_id_fips"].isna()
+    stats.increment("add_fips_ids_hits", (~fips_is_nan).sum())
     if not fips_is_nan.any():
         # standardize output columns
         with_fips["geocoded_locality_name"] = with_fips[locality_col]
         with_fips["geocoded_locality_type"] = "county"
         with_fips["geocoded_containing_county"] = with_fips[locality_col]
+        stats.add_time(time.monotonic() - start)
         return with_fips
 
     good_fips = with_fips.loc[~fips_is_nan, :].copy()
@@ -340,39 +390,55 @@ def add_county_fips_with_backup_geocoding(
     good_fips["geocoded_locality_type"] = "county"
     good_fips["geocoded_containing_county"] = good_fips[locality_col]
 
-    # geocode the lookup failures - they are often city/town names (instead of counties) or simply mis-spelled
+    # the lookup failures are often city/town names (instead of counties) or simply
+    # mis-spelled. Try the offline gazetteer and fuzzy matching county names first to
+    # save API calls. Exact place names are looked up before fuzzy matching county
+    # names, so a city isn't mistaken for a similarly named county.
     nan_fips = with_fips.loc[fips_is_nan, :].copy()
+    recombined = [good_fips]
+    gazetteer = load_gazetteer()
+    nan_fips = _add_county_fips_with_gazetteer(
+        nan_fips, locality_col, gazetteer, recombined, fuzzy=False
+    )
 
-    # Deduplicate on the state and locality columns to minimize API calls
-    key_cols = [state_col, locality_col]
-    deduped_nan_fips = nan_fips.loc[:, key_cols].drop_duplicates()
-    deduped_geocoded = _geocode_locality(
-        deduped_nan_fips,
-        # pass subset to _geocode_locality to maximize chance of a cache hit
-        # (this way other columns can change but caching still works)
-        state_col=state_col,
-        locality_col=locality_col,
+    decisions = get_county_matcher(FIPS_CODE_VINTAGE).match(
+        nan_fips, county_col=locality_col
     )
-    # recombine deduped geocoded data with original nan_fips
-    geocoded_deduped_nan_fips = pd.concat(
-        [deduped_nan_fips[key_cols], deduped_geocoded], axis=1
+    log_match_decisions(decisions)
+    fuzzy_decisions = (
+        nan_fips[["state_id_fips", locality_col]]
+        .astype("string")
+        .merge(
+            decisions.rename(columns={"county": locality_col}),
+            on=["state_id_fips", locality_col],
+            how="left",
+            validate="m:1",
+        )
     )
-    index_name = nan_fips.index.name
-    index_name = index_name if index_name is not None else "index"
-    geocoded = (
-        nan_fips.reset_index()
-        .merge(geocoded_deduped_nan_fips, on=key_cols, how="left", validate="m:1")
-        .set_index(index_name)[deduped_geocoded.columns]
+    fuzzy_fips = fuzzy_decisions["county_id_fips"].to_numpy()
+    fuzzy_names = fuzzy_decisions["county_name"].to_numpy()
+    is_fuzzy_match = pd.notna(fuzzy_fips)
+    fuzzy_matched = nan_fips.loc[is_fuzzy_match, :].copy()
+    fuzzy_matched["county_id_fips"] = fuzzy_fips[is_fuzzy_match]
+    fuzzy_matched = fuzzy_matched.astype({"county_id_fips": pd.StringDtype()})
+    # use the official name of the matched county, not the misspelled one
+    fuzzy_matched["geocoded_locality_name"] = fuzzy_names[is_fuzzy_match]
+    fuzzy_matched["geocoded_locality_type"] = "county"
+    fuzzy_matched["geocoded_containing_county"] = fuzzy_names[is_fuzzy_match]
+    recombined.append(fuzzy_matched)
+    nan_fips = nan_fips.loc[~is_fuzzy_match, :]
+    stats.increment("fuzzy_county_hits", is_fuzzy_match.sum())
+
+    nan_fips = _add_county_fips_with_gazetteer(
+        nan_fips, locality_col, gazetteer, recombined, fuzzy=True
     )
+    stats.increment("geocoded_rows", len(nan_fips))
 
-    nan_fips = pd.concat([nan_fips, geocoded], axis=1)
-    # add fips using geocoded names
-    filled_fips = add_fips_ids(
-        nan_fips,
-        state_col=state_col,
-        county_col="geocoded_containing_county",
-        vintage=FIPS_CODE_VINTAGE,
-    )
+    # geocode the remaining failures
+    if not nan_fips.empty:
+        recombined.append(
+            _add_county_fips_with_geocoding(nan_fips, state_col, locality_col)
+        )
 
     # recombine and restore row order
     cols_to_keep = [
@@ -382,12 +448,15 @@ def add_county_fips_with_backup_geocoding(
         "geocoded_locality_type",
         "geocoded_containing_county",
     ]
-    recombined = pd.concat([good_fips, filled_fips], axis=0).loc[
+    recombined = pd.concat(recombined, axis=0).loc[
         state_locality_df.index, cols_to_keep
     ]
 
+    stats.increment("unresolved_rows", recombined["county_id_fips"].isna().sum())
+
     # attach to original df
     out = pd.concat([state_locality_df, recombined], axis=1)
+    stats.add_time(time.monotonic() - start)
 
     return out
 
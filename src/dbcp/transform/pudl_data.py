@@ -1,10 +1,15 @@
 """Transform PUDL tables."""
 
+import logging
+
 import pandas as pd
 
 from dbcp.constants import FIPS_CODE_VINTAGE
 from dbcp.helpers import add_fips_ids
 from dbcp.transform.helpers import bedford_addfips_fix
+from dbcp.transform.spatial import get_county_locator
+
+logger = logging.getLogger(__name__)
 
 # Map operational_status_code values to numeric scale
 OPERATIONAL_STATUS_CODES_SCALE = {
@@ -30,7 +35,9 @@ OPERATIONAL_STATUS_CODES_SCALE = {
 def _transform_pudl_generators(pudl_generators) -> pd.DataFrame:
     """Transform pudl_generators table.
 
-    Add FIPS codes to the table and correct Bedford, VA FIPS code.
+    Add FIPS codes to the table and correct Bedford, VA FIPS code. County FIPS codes
+    come from the generators' coordinates where possible, and from their state and
+    county names otherwise.
 
     Args:
         pudl_generators: The raw pudl_generators table.
@@ -44,6 +51,18 @@ def _transform_pudl_generators(pudl_generators) -> pd.DataFrame:
         ""
     )  # copy; don't want to fill actual table
     fips = add_fips_ids(filled_location, vintage=FIPS_CODE_VINTAGE)
+    # Prefer the county containing the plant's coordinates, unless they are missing or
+    # in a different state than the reported one.
+    located_fips = get_county_locator().locate(
+        pudl_generators["longitude"], pudl_generators["latitude"]
+    )
+    use_located = (located_fips.str[:2] == fips["state_id_fips"]).fillna(False)
+    logger.info(
+        f"Assigned {use_located.mean():.2%} of generators to counties by coordinates. "
+        f"{(use_located & located_fips.ne(fips['county_id_fips'])).sum()} disagree "
+        "with the reported county name."
+    )
+    fips["county_id_fips"] = located_fips.where(use_located, fips["county_id_fips"])
     pudl_generators = pd.concat(
         [pudl_generators, fips[["state_id_fips", "county_id_fips"]]], axis=1, copy=False
     )
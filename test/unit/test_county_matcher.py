@@ -0,0 +1,50 @@
+"""Test the fuzzy county name matcher."""
+import pandas as pd
+
+from dbcp.transform.county_matcher import CountyMatcher, levenshtein_distance
+
+
+def test_levenshtein_distance():
+    """Edit distances count insertions, deletions and substitutions."""
+    assert levenshtein_distance("kitten", "sitting") == 3
+    assert levenshtein_distance("", "abc") == 3
+    assert levenshtein_distance("dane", "dane") == 0
+
+
+def test_county_matcher():
+    """Typos and suffix variants are matched, ambiguous and distant names are not."""
+    matcher = CountyMatcher(vintage=2020)
+    df = pd.DataFrame(
+        {
+            "state_id_fips": ["22", "22", "55", "29", "55", "55", None],
+            "county": [
+                "LaSalle Parish",
+                "LaSalle Parish",  # duplicates are matched once
+                "Milwaukie Cnty",
+                "St Louis",  # county and independent city
+                "Madison",
+                "",
+                "Dane",
+            ],
+        }
+    )
+    decisions = matcher.match(df).set_index("county")
+    assert len(decisions) == 5
+    assert decisions.loc["LaSalle Parish", "county_id_fips"] == "22059"
+    assert decisions.loc["LaSalle Parish", "county_name"] == "La Salle Parish"
+    assert decisions.loc["LaSalle Parish", "distance"] == 1
+    assert decisions.loc["Milwaukie Cnty", "county_id_fips"] == "55079"
+    assert decisions.loc["St Louis", "decision"] == "ambiguous"
+    assert pd.isna(decisions.loc["St Louis", "county_id_fips"])
+    assert pd.isna(decisions.loc["St Louis", "county_name"])
+    assert decisions.loc["Madison", "decision"] in {"below_threshold", "no_match"}
+
+
+def test_county_matcher_short_names():
+    """A city one edit away from a short county name isn't matched to the county."""
+    matcher = CountyMatcher(vintage=2020)
+    df = pd.DataFrame({"state_id_fips": ["06", "06"], "county": ["Marina", "Marin"]})
+    decisions = matcher.match(df).set_index("county")
+    assert decisions.loc["Marina", "decision"] == "below_threshold"
+    assert pd.isna(decisions.loc["Marina", "county_id_fips"])
+    assert decisions.loc["Marin", "county_id_fips"] == "06041"
@@ -0,0 +1,46 @@
+"""Test data mart helper functions."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import sqlalchemy as sa
+
+from dbcp.data_mart.helpers import DataMartContext
+
+
+def test_data_mart_context_creates_tables_once():
+    """Shared tables are only created once and callers get independent copies."""
+    context = DataMartContext(engine=sa.create_engine("sqlite://"))
+    calls = []
+
+    def create():
+        calls.append(1)
+        return pd.DataFrame({"value": [1, 2]})
+
+    first = context.get_or_create(("table", True), create)
+    first.loc[0, "value"] = 100
+    second = context.get_or_create(("table", True), create)
+
+    assert len(calls) == 1
+    assert second["value"].tolist() == [1, 2]
+    context.get_or_create(("table", False), create)
+    assert len(calls) == 2
+
+
+def test_data_mart_context_is_thread_safe():
+    """Concurrent requests for the same table only create it once."""
+    context = DataMartContext(engine=sa.create_engine("sqlite://"))
+    calls = []
+
+    def create():
+        calls.append(1)
+        time.sleep(0.05)
+        return pd.DataFrame({"value": [1, 2]})
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        tables = list(
+            executor.map(lambda _: context.get_or_create("table", create), range(4))
+        )
+
+    assert len(calls) == 1
+    assert all(table["value"].tolist() == [1, 2] for table in tables)
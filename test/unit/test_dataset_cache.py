@@ -0,0 +1,77 @@
+"""Test the cache of transformed datasets."""
+import pandas as pd
+
+from dbcp.dataset_cache import DatasetCache, SpatialCache, combine_fingerprints
+
+
+def test_dataset_cache_round_trip(tmp_path):
+    """Cached datasets are only returned for a matching fingerprint."""
+    cache = DatasetCache(tmp_path)
+    dfs = {
+        "table": pd.DataFrame(
+            {
+                "county_id_fips": pd.Series(["01001", pd.NA], dtype="string"),
+                "capacity_mw": [1.5, None],
+                "n_projects": pd.Series([1, pd.NA], dtype="Int64"),
+            }
+        )
+    }
+    assert cache.get("dataset", "abc") is None
+    assert cache.put("dataset", "abc", dfs)
+
+    cached = cache.get("dataset", "abc")
+    pd.testing.assert_frame_equal(cached["table"], dfs["table"])
+    assert cache.get("dataset", "def") is None
+
+
+def test_dataset_cache_unsupported_dataframe(tmp_path):
+    """Dataframes that can't be written to parquet are not cached."""
+    cache = DatasetCache(tmp_path)
+    dfs = {"table": pd.DataFrame({"mixed": [1, "a"]})}
+    assert not cache.put("dataset", "abc", dfs)
+    assert cache.get("dataset", "abc") is None
+
+
+def test_combine_fingerprints():
+    """The boundaries between fingerprint parts matter."""
+    assert combine_fingerprints("ab", "c") != combine_fingerprints("a", "bc")
+
+
+def test_dataset_cache_any_fingerprint(tmp_path):
+    """Checkpoints are restored without knowing how they were produced."""
+    cache = DatasetCache(tmp_path)
+    dfs = {"table": pd.DataFrame({"value": [1, 2]})}
+    cache.put("dataset", None, dfs)
+    pd.testing.assert_frame_equal(cache.get("dataset")["table"], dfs["table"])
+    cache.clear()
+    assert cache.get("dataset") is None
+
+
+def test_spatial_cache(tmp_path):
+    """Results are keyed on source versions and only the latest is kept."""
+    cache = SpatialCache(tmp_path)
+    df = pd.DataFrame({"tribal_land_frac": [0.0, 0.5]}, index=[3, 7])
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return df
+
+    sources = ["gs://bucket/counties.zip#1"]
+    pd.testing.assert_frame_equal(cache.get_or_compute("frac", 1, sources, compute), df)
+    pd.testing.assert_frame_equal(cache.get_or_compute("frac", 1, sources, compute), df)
+    assert len(calls) == 1
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+    cache.get_or_compute("frac", 2, sources, compute)
+    cache.get_or_compute("frac", 2, ["gs://bucket/counties.zip#2"], compute)
+    assert len(calls) == 3
+    assert len(list(tmp_path.glob("frac-*.parquet"))) == 1
+
+
+def test_dataset_cache_contains(tmp_path):
+    """Membership checks don't depend on the fingerprint."""
+    cache = DatasetCache(tmp_path)
+    assert "dataset" not in cache
+    cache.put("dataset", "abc", {"table": pd.DataFrame({"a": [1]})})
+    assert "dataset" in cache
@@ -0,0 +1,45 @@
+"""Test the ETL orchestration code."""
+import pandas as pd
+import pytest
+
+import dbcp
+from dbcp.etl import _fingerprint_dataset, _run_etl_funcs, etl_pudl_tables
+from dbcp.extract.fips_tables import CENSUS_URI
+
+
+def _etl_func_factory(name: str):
+    """Create a fake ETL function that returns a single table."""
+    return lambda: {name: pd.DataFrame({"value": [1]})}
+
+
+def test_run_etl_funcs_respects_dependencies():
+    """Datasets only run after the datasets they depend on."""
+    funcs = {name: _etl_func_factory(name) for name in ["a", "b", "c"]}
+    finished = [
+        dataset
+        for dataset, _ in _run_etl_funcs(funcs, jobs=1, dependencies={"a": {"c"}})
+    ]
+    assert finished == ["b", "c", "a"]
+
+
+def test_run_etl_funcs_circular_dependencies():
+    """Circular dependencies raise an error instead of hanging."""
+    funcs = {name: _etl_func_factory(name) for name in ["a", "b"]}
+    with pytest.raises(ValueError):
+        list(_run_etl_funcs(funcs, jobs=1, dependencies={"a": {"b"}, "b": {"a"}}))
+
+
+def test_pudl_fingerprint_includes_census_counties(monkeypatch):
+    """A new county archive invalidates the pudl dataset, whose plants it locates."""
+    generations = {CENSUS_URI: "1"}
+    monkeypatch.setattr(
+        dbcp.extract.helpers,
+        "get_gcs_archive_generation_num",
+        lambda uri: generations.get(uri, "1"),
+    )
+    monkeypatch.setenv("PUDL_VERSION", "v1")
+    before = _fingerprint_dataset("pudl", etl_pudl_tables)
+    assert before is not None
+
+    generations[CENSUS_URI] = "2"
+    assert _fingerprint_dataset("pudl", etl_pudl_tables) != before
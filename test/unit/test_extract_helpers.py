@@ -0,0 +1,195 @@
+"""Test the helper functions for extracting data."""
+import base64
+import hashlib
+
+import pandas as pd
+import pytest
+from fsspec.implementations.memory import MemoryFileSystem
+
+import dbcp
+from dbcp.dataset_cache import hash_file
+from dbcp.extract.helpers import (
+    OFFLINE_ENV_VAR,
+    ArchiveManifest,
+    cache_gcs_archive_file_locally,
+    clear_excel_cache,
+    prefetch_gcs_archive_files,
+    read_excel_cached,
+)
+
+
+class FakeGCSFileSystem(MemoryFileSystem):
+    """An in-memory stand-in for a version aware GCS filesystem.
+
+    Objects are stored as 'bucket/name#generation' and report their generation and
+    MD5 hash like GCS does.
+    """
+
+    protocol = "fakegcs"
+    store: dict = {}
+    pseudo_dirs = [""]
+
+    def put_object(self, path: str, generation: int, data: bytes) -> None:
+        """Add a version of an object."""
+        self.pipe_file(f"{path}#{generation}", data)
+
+    def info(self, path, **kwargs):
+        """Get the metadata of a version of an object, or of its latest version."""
+        path = self._strip_protocol(path)
+        if "#" not in path:
+            versions = self.glob(f"{path}#*")
+            if not versions:
+                raise FileNotFoundError(path)
+            path = max(versions, key=lambda version: int(version.split("#")[1]))
+        info = super().info(path, **kwargs)
+        data = self.cat_file(path)
+        info["generation"] = path.split("#")[1]
+        info["md5Hash"] = base64.b64encode(hashlib.md5(data).digest()).decode()
+        return info
+
+
+@pytest.fixture
+def fake_gcs(monkeypatch):
+    """Replace the GCS archive with an in-memory filesystem."""
+    fs = FakeGCSFileSystem()
+    fs.store.clear()
+    monkeypatch.setattr(dbcp.extract.helpers, "_get_gcs_filesystem", lambda: fs)
+    dbcp.extract.helpers._get_gcs_object_info.cache_clear()
+    yield fs
+    dbcp.extract.helpers._get_gcs_object_info.cache_clear()
+
+
+def test_cache_gcs_archive_file_locally(fake_gcs, tmp_path):
+    """Files are cached under their generation number, resuming partial downloads."""
+    fake_gcs.put_object("archive/data/a.csv", 1, b"old")
+    fake_gcs.put_object("archive/data/a.csv", 2, b"x" * 1000)
+
+    # a previous download of the latest version was interrupted
+    cached = tmp_path / "data" / "a.csv#2"
+    cached.parent.mkdir()
+    (tmp_path / "data" / "a.csv#2.part").write_bytes(b"x" * 400)
+
+    path = cache_gcs_archive_file_locally("gs://archive/data/a.csv", tmp_path)
+    assert path == cached
+    assert path.read_bytes() == b"x" * 1000
+    assert not (tmp_path / "data" / "a.csv#2.part").exists()
+
+    pinned = cache_gcs_archive_file_locally(
+        "gs://archive/data/a.csv", tmp_path, generation_num="1"
+    )
+    assert pinned.read_bytes() == b"old"
+
+
+def test_cache_gcs_archive_file_locally_checksum(fake_gcs, tmp_path):
+    """Corrupt downloads are discarded instead of cached."""
+    fake_gcs.put_object("archive/b.csv", 5, b"y" * 100)
+    (tmp_path / "b.csv#5.part").write_bytes(b"z" * 50)
+
+    with pytest.raises(ValueError, match="Checksum"):
+        cache_gcs_archive_file_locally("gs://archive/b.csv#5", tmp_path)
+    assert not (tmp_path / "b.csv#5.part").exists()
+    assert not (tmp_path / "b.csv#5").exists()
+
+    # the next attempt starts over
+    path = cache_gcs_archive_file_locally("gs://archive/b.csv#5", tmp_path)
+    assert path.read_bytes() == b"y" * 100
+
+
+def test_prefetch_gcs_archive_files(fake_gcs, tmp_path):
+    """Available files are downloaded and missing ones are skipped."""
+    fake_gcs.put_object("archive/a.csv", 1, b"a")
+    fake_gcs.put_object("archive/b.csv", 2, b"b")
+
+    paths = prefetch_gcs_archive_files(
+        ["gs://archive/a.csv", "gs://archive/b.csv", "gs://archive/missing.csv"],
+        tmp_path,
+    )
+    assert paths == {
+        "gs://archive/a.csv": tmp_path / "a.csv#1",
+        "gs://archive/b.csv": tmp_path / "b.csv#2",
+    }
+
+
+def test_offline_mode(fake_gcs, tmp_path, monkeypatch):
+    """Offline runs resolve archives from the manifest without touching GCS."""
+    fake_gcs.put_object("archive/a.csv", 1, b"a")
+    fake_gcs.put_object("archive/a.csv", 2, b"aa")
+    cache_gcs_archive_file_locally("gs://archive/a.csv#1", tmp_path)
+    cached = cache_gcs_archive_file_locally("gs://archive/a.csv", tmp_path)
+
+    entry = ArchiveManifest(tmp_path).get("gs://archive/a.csv")
+    assert entry == {
+        "uri": "gs://archive/a.csv",
+        "generation": "2",
+        "sha256": hash_file(cached),
+        "path": str(cached),
+    }
+
+    def no_gcs():
+        raise AssertionError("GCS was accessed in offline mode")
+
+    monkeypatch.setattr(dbcp.extract.helpers, "_get_gcs_filesystem", no_gcs)
+    dbcp.extract.helpers._get_gcs_object_info.cache_clear()
+    monkeypatch.setenv(OFFLINE_ENV_VAR, "1")
+    assert cache_gcs_archive_file_locally("gs://archive/a.csv", tmp_path) == cached
+    with pytest.raises(FileNotFoundError):
+        cache_gcs_archive_file_locally("gs://archive/a.csv#3", tmp_path)
+    with pytest.raises(ValueError):
+        cache_gcs_archive_file_locally("gs://archive/b.csv", tmp_path)
+
+
+def test_read_excel_cached(tmp_path, monkeypatch):
+    """Sheets are parsed once per workbook version and read options."""
+    path = tmp_path / "workbook.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"a": [1, 2], "b": ["x", None]}).to_excel(
+            writer, sheet_name="first", index=False
+        )
+        pd.DataFrame({"c": [1.5]}).to_excel(writer, sheet_name="second", index=False)
+    cache_dir = tmp_path / "cache"
+    expected = read_excel_cached(
+        path, sheet_name=["first", "second"], cache_dir=cache_dir
+    )
+    assert len(list(cache_dir.glob("*.parquet"))) == 2
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("The workbook was parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, "read_excel", no_parsing)
+        cached = read_excel_cached(
+            path, sheet_name=["first", "second"], cache_dir=cache_dir
+        )
+        for sheet in ["first", "second"]:
+            pd.testing.assert_frame_equal(cached[sheet], expected[sheet])
+        pd.testing.assert_frame_equal(
+            read_excel_cached(path, sheet_name="second", cache_dir=cache_dir),
+            expected["second"],
+        )
+
+    # different read options are cached separately
+    first_row = read_excel_cached(
+        path, sheet_name="first", cache_dir=cache_dir, nrows=1
+    )
+    assert len(first_row) == 1
+    assert len(list(cache_dir.glob("*.parquet"))) == 3
+
+    # sheets parsed by another Excel engine, or another version of it, aren't reused
+    with monkeypatch.context() as m:
+        m.setattr(
+            dbcp.extract.helpers,
+            "_get_excel_engine_version",
+            lambda engine: "openpyxl==0.0",
+        )
+        read_excel_cached(path, sheet_name="second", cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.parquet"))) == 4
+
+    # a new version of the workbook replaces the sheets cached from the old one
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"a": [3]}).to_excel(writer, sheet_name="first", index=False)
+    updated = read_excel_cached(path, sheet_name="first", cache_dir=cache_dir)
+    assert updated["a"].tolist() == [3]
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+    clear_excel_cache(cache_dir)
+    assert not cache_dir.exists()
@@ -0,0 +1,117 @@
+"""Test the extraction and transformation of FIPS tables."""
+import shutil
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point, box
+
+import dbcp
+from dbcp.dataset_cache import SpatialCache
+from dbcp.extract.fips_tables import extract_zipped_shapefile, geoparquet_sidecar_path
+from dbcp.transform.fips_tables import _add_tribal_land_frac, county_fips
+
+
+def test_extract_zipped_shapefile(tmp_path):
+    """The first read writes a GeoParquet sidecar that later reads can filter."""
+    gdf = gpd.GeoDataFrame(
+        {"GEOID": ["01", "02", "03"], "NAME": ["a", "b", "c"]},
+        geometry=[box(0, 0, 1, 1), box(5, 5, 6, 6), box(10, 10, 11, 11)],
+        crs="EPSG:4269",
+    )
+    shapefile_dir = tmp_path / "shp"
+    shapefile_dir.mkdir()
+    gdf.to_file(shapefile_dir / "counties.shp")
+    # cached archive files have the GCS generation number in their name
+    zip_path = tmp_path / "counties.zip#123"
+    shutil.make_archive(str(tmp_path / "counties"), "zip", shapefile_dir)
+    (tmp_path / "counties.zip").rename(zip_path)
+
+    first = extract_zipped_shapefile(zip_path)
+    assert geoparquet_sidecar_path(zip_path).exists()
+    second = extract_zipped_shapefile(zip_path)
+    pd.testing.assert_frame_equal(first, second)
+    assert second.crs == gdf.crs
+
+    filtered = extract_zipped_shapefile(
+        zip_path, columns=["GEOID"], bbox=(4, 4, 12, 12)
+    )
+    assert list(filtered.columns) == ["GEOID", "geometry"]
+    assert filtered["GEOID"].tolist() == ["02", "03"]
+
+
+def _add_tribal_land_frac_dissolved(counties, tribal_land):
+    """Reference implementation: intersect every county with all tribal land."""
+    counties = counties.to_crs("ESRI:102008")
+    tribal_land = tribal_land.to_crs("ESRI:102008")
+    dissolved = tribal_land.dissolve().geometry.iloc[0]
+    intersection = counties.intersection(dissolved).area / 1e6
+    return (intersection / counties["land_area_km2"]).clip(upper=1.0).round(2)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_add_tribal_land_frac(max_workers):
+    """Tribal land fractions match intersecting counties with all tribal land."""
+    rng = np.random.default_rng(0)
+    # a 6x6 grid of 0.5 degree counties in Kansas
+    counties = gpd.GeoDataFrame(
+        geometry=[
+            box(-100 + 0.5 * i, 38 + 0.5 * j, -99.5 + 0.5 * i, 38.5 + 0.5 * j)
+            for i in range(6)
+            for j in range(6)
+        ],
+        crs="EPSG:4269",
+    )
+    counties["county_id_fips"] = [f"20{i:03}" for i in range(len(counties))]
+    counties["land_area_km2"] = counties.to_crs("ESRI:102008").area / 1e6 * 0.95
+    # overlapping circles in the south west corner, some spanning several counties
+    centers = rng.uniform([-100, 38], [-98.5, 39.5], size=(20, 2))
+    radii = rng.uniform(0.05, 0.4, size=20)
+    tribal_land = gpd.GeoDataFrame(
+        geometry=[Point(x, y).buffer(r) for (x, y), r in zip(centers, radii)],
+        crs="EPSG:4269",
+    )
+
+    expected = _add_tribal_land_frac_dissolved(counties, tribal_land)
+    out = _add_tribal_land_frac(counties, tribal_land, max_workers=max_workers)
+    assert "geometry" not in out.columns
+    assert (out["tribal_land_frac"] > 0).any() and (out["tribal_land_frac"] == 0).any()
+    pd.testing.assert_series_equal(out["tribal_land_frac"], expected, check_names=False)
+
+
+def test_county_fips_spatial_cache(tmp_path, monkeypatch):
+    """Only tribal land fractions are cached, other columns come from the input."""
+    cache = SpatialCache(tmp_path)
+    monkeypatch.setattr(dbcp.transform.fips_tables, "SPATIAL_CACHE", cache)
+    counties = gpd.GeoDataFrame(
+        {
+            "STATEFP": ["20", "20"],
+            "GEOID": ["20001", "20003"],
+            "NAME": ["Allen", "Anderson"],
+            "NAMELSAD": ["Allen County", "Anderson County"],
+            "FUNCSTAT": ["A", "A"],
+            "ALAND": [1e9, 1e9],
+            "AWATER": [1e6, 1e6],
+            "INTPTLAT": ["+38.25", "+38.25"],
+            "INTPTLON": ["-99.75", "-99.25"],
+        },
+        geometry=[box(-100, 38, -99.5, 38.5), box(-99.5, 38, -99, 38.5)],
+        crs="EPSG:4269",
+    )
+    tribal_land = gpd.GeoDataFrame(
+        geometry=[box(-100, 38, -99.75, 38.5)], crs="EPSG:4269"
+    )
+    sources = ["gs://archive/counties.zip#1", "gs://archive/tribal_land.zip#1"]
+
+    first = county_fips(counties, tribal_land, sources=sources, max_workers=1)
+    assert cache.stats == {"hits": 0, "misses": 1}
+    assert first["tribal_land_frac"].tolist() == [1.0, 0.0]
+
+    counties["NAME"] = ["Allen2", "Anderson2"]
+    second = county_fips(counties, tribal_land, sources=sources, max_workers=1)
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert second["county_name"].tolist() == ["Allen2", "Anderson2"]
+    pd.testing.assert_frame_equal(
+        second.drop(columns="county_name"), first.drop(columns="county_name")
+    )
@@ -0,0 +1,150 @@
+"""Test the offline place name gazetteer."""
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import box
+
+import dbcp
+from dbcp.transform.gazetteer import (
+    build_gazetteer,
+    load_gazetteer,
+    lookup_counties,
+    normalize_place_name,
+)
+from dbcp.transform.helpers import add_county_fips_with_backup_geocoding
+
+
+def test_normalize_place_name():
+    """Prefixes, suffixes, accents, punctuation and parentheticals are removed."""
+    names = pd.Series(
+        [
+            "Town of Seneca (Ontario County)",
+            "Española city",
+            "St. Paul",
+            "Saint Paul",
+            "Carson City",
+            "Dane County",
+        ]
+    )
+    expected = pd.Series(
+        ["seneca", "espanola", "st paul", "st paul", "carson", "dane"], dtype="string"
+    )
+    pd.testing.assert_series_equal(normalize_place_name(names), expected)
+
+
+def make_gazetteer():
+    """Two adjacent counties in Wisconsin."""
+    counties = gpd.GeoDataFrame(
+        {
+            "GEOID": ["55025", "55021"],
+            "STATEFP": ["55", "55"],
+            "NAMELSAD": ["Dane County", "Columbia County"],
+        },
+        geometry=[box(-90, 43, -89, 44), box(-90, 44, -89, 45)],
+        crs="EPSG:4269",
+    )
+    places = pd.DataFrame(
+        {
+            "GEOID": ["5548000", "5586000", "5512345", "5554321"],
+            "NAME": ["Madison city", "Westport village", "Lodi city", "Lodi CDP"],
+            "INTPTLAT": ["43.07", "43.15", "43.31", "44.5"],
+            "INTPTLONG": ["-89.4", "-89.4", "-89.5", "-89.5"],
+        }
+    )
+    cousubs = pd.DataFrame(
+        {
+            "GEOID": ["5502586025", "5502100000", "5502599999"],
+            "NAME": [
+                "Westport town",
+                "County subdivisions not defined",
+                "Blooming Grove town",
+            ],
+            "FUNCSTAT": ["A", "F", "A"],
+        }
+    )
+    return build_gazetteer(places=places, cousubs=cousubs, counties=counties)
+
+
+def test_lookup_counties():
+    """Exact, fuzzy and ambiguous names are handled."""
+    gazetteer = make_gazetteer()
+    assert "County subdivisions not defined" not in set(
+        gazetteer["geocoded_locality_name"]
+    )
+    df = pd.DataFrame(
+        {
+            "state_id_fips": ["55", "55", "55", "55", "55", "17", None],
+            "county": [
+                "City of Madison",
+                "Town of Westport",
+                "Bloomng Grove",  # typo
+                "Lodi",  # in two counties
+                "Nowhere",
+                "Madison",  # wrong state
+                "Madison",
+            ],
+        },
+        index=pd.Index([10, 11, 12, 13, 14, 15, 16], name="project_id"),
+    )
+    out = lookup_counties(df, gazetteer=gazetteer)
+    expected = pd.DataFrame(
+        {
+            "county_id_fips": ["55025", "55025", "55025", None, None, None, None],
+            "geocoded_locality_name": [
+                "Madison",
+                "Westport",
+                "Blooming Grove",
+                None,
+                None,
+                None,
+                None,
+            ],
+            "geocoded_locality_type": ["city", "city", "town", None, None, None, None],
+            "geocoded_containing_county": ["Dane County"] * 3 + [None] * 4,
+        },
+        index=df.index,
+        dtype="string",
+    )
+    pd.testing.assert_frame_equal(out, expected)
+
+
+def test_load_gazetteer_failure(monkeypatch):
+    """The gazetteer is skipped when the archived Census data can't be loaded."""
+
+    def missing_archive():
+        raise FileNotFoundError("gs://archive/gazetteer.zip")
+
+    monkeypatch.setattr(dbcp.transform.gazetteer, "_get_gazetteer", missing_archive)
+    load_gazetteer.cache_clear()
+    try:
+        assert load_gazetteer() is None
+    finally:
+        load_gazetteer.cache_clear()
+
+
+def test_gazetteer_places_before_fuzzy_counties(monkeypatch):
+    """Exact place names aren't fuzzy matched to a similarly named county."""
+    counties = gpd.GeoDataFrame(
+        {
+            "GEOID": ["06041", "06053"],
+            "STATEFP": ["06", "06"],
+            "NAMELSAD": ["Marin County", "Monterey County"],
+        },
+        geometry=[box(-123, 37.8, -122.4, 38.3), box(-122, 35.7, -120.2, 36.9)],
+        crs="EPSG:4269",
+    )
+    places = pd.DataFrame(
+        {
+            "GEOID": ["0645778"],
+            "NAME": ["Marina city"],
+            "INTPTLAT": ["36.68"],
+            "INTPTLONG": ["-121.78"],
+        }
+    )
+    cousubs = pd.DataFrame(columns=["GEOID", "NAME", "FUNCSTAT"])
+    gazetteer = build_gazetteer(places=places, cousubs=cousubs, counties=counties)
+    monkeypatch.setattr(dbcp.transform.helpers, "load_gazetteer", lambda: gazetteer)
+
+    df = pd.DataFrame({"state": ["CA", "CA"], "county": ["Marina", "Marin Cnty"]})
+    out = add_county_fips_with_backup_geocoding(df)
+    assert out["county_id_fips"].tolist() == ["06053", "06041"]
+    assert out["geocoded_locality_type"].tolist() == ["city", "county"]
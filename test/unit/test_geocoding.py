@@ -1,7 +1,16 @@
 """Test suite for dbcp.transform.geocoding module."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import pytest
 
-from dbcp.transform.geocoding import GoogleGeocoder
+from dbcp.transform.geocoding import (
+    GeocodeCache,
+    GoogleGeocoder,
+    record_geocoding_stats,
+)
 
 
 class mock_geocoder(GoogleGeocoder):
@@ -294,3 +303,122 @@ def test_GoogleGeocoder_init_and_properties():
     full = GoogleGeocoder()
     full._response = mock_geocoder_town_and_county()._response
     assert full.locality_name == "Westport"
+
+
+class counting_client(object):
+    """Mock googlemaps.Client that counts geocode calls."""
+
+    def __init__(self, response):
+        """Initialize mock client."""
+        self.response = response
+        self.n_calls = 0
+
+    def geocode(self, address, components):
+        """Return the canned response."""
+        self.n_calls += 1
+        return self.response
+
+
+def test_geocode_cache(tmp_path):
+    """Responses are cached per normalized place and shared across geocoders."""
+    cache = GeocodeCache(tmp_path / "cache.sqlite")
+    response = [mock_geocoder_town_and_county()._response]
+    client = counting_client(response)
+    geocoders = []
+    for name in ["Westport", " westport  ", "WESTPORT"]:
+        geocoder = GoogleGeocoder(key="AIza-fake", cache=cache)
+        geocoder.client = client
+        geocoder.geocode_request(name=name, state="WI")
+        geocoders.append(geocoder)
+    assert client.n_calls == 1
+    assert len(cache) == 1
+    assert all(gc.locality_name == "Westport" for gc in geocoders)
+
+    # "not found" responses are cached too, and counted when served from the cache
+    client.response = []
+    with record_geocoding_stats() as stats:
+        geocoders[0].geocode_request(name="Nowhere", state="WI")
+        geocoders[0].geocode_request(name="Nowhere", state="WI")
+    assert client.n_calls == 2
+    assert stats.to_dict()["cache_hits"] == 1
+    assert stats.to_dict()["not_found"] == 2
+    assert geocoders[0].describe() == ["", "", ""]
+
+    cache.clear()
+    assert cache.get("Westport", "WI", "US") is None
+
+
+@pytest.fixture
+def fake_geocoding_server():
+    """Local HTTP server that mimics the Geocoding API.
+
+    Every place resolves to Dane County, WI except "Nowhere". The first request for
+    each place fails with a server error to exercise retries.
+    """
+    requests = []
+    lock = threading.Lock()
+    result = mock_geocoder_town_and_county()._response
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            address = parse_qs(urlparse(self.path).query)["address"][0]
+            with lock:
+                is_retry = address in requests
+                requests.append(address)
+            if not is_retry:
+                self.send_response(500)
+                self.end_headers()
+                return
+            if address.startswith("Nowhere"):
+                body = {"status": "ZERO_RESULTS", "results": []}
+            else:
+                body = {"status": "OK", "results": [result]}
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_geocode_many(tmp_path, fake_geocoding_server):
+    """Batch geocoding dedupes, retries, preserves order and fills the cache."""
+    base_url, requests = fake_geocoding_server
+    cache = GeocodeCache(tmp_path / "cache.sqlite")
+    geocoder = GoogleGeocoder(
+        key="AIza-fake", cache=cache, queries_per_second=100, base_url=base_url
+    )
+    pairs = [(f"Town {i}", "WI") for i in range(10)]
+    pairs += [("Nowhere", "WI"), ("town 0", "wi")]
+
+    with record_geocoding_stats() as stats:
+        out = geocoder.geocode_many(pairs, max_workers=4)
+    assert len(out) == len(pairs)
+    assert out[0] == ["Westport", "city", "Dane County"]
+    assert out[-2] == ["", "", ""]
+    assert out[-1] == out[0]
+    # 11 unique places, each failing once before succeeding
+    assert len(requests) == 22
+    assert len(cache) == 11
+    summary = stats.to_dict()
+    assert summary["unique_places"] == 11
+    assert summary["cache_hits"] == 0
+    assert summary["api_calls"] == 11
+    assert summary["not_found"] == 1
+    assert summary["api_latency_p50"] is not None
+
+    # everything is cached now
+    with record_geocoding_stats() as stats:
+        assert geocoder.geocode_many(pairs) == out
+    assert len(requests) == 22
+    assert stats.to_dict()["cache_hits"] == 11
+    assert stats.to_dict()["not_found"] == 1
+    assert stats.to_dict()["api_latency_p50"] is None
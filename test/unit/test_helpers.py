@@ -1,6 +1,18 @@
 """Test DBCP helper functions."""
+
+import hashlib
+import json
+import struct
+from datetime import date, datetime
+
+import addfips
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import pytest
 import sqlalchemy as sa
+from fsspec.implementations.memory import MemoryFileSystem
 
 import dbcp
 
@@ -46,3 +58,295 @@ class TestBQSchemaHelpers:
             "county_fips", "data_warehouse"
         )
         assert bq_schema == expected_bq_schema
+
+
+def _decode_pg_copy_binary(data: bytes, n_columns: int) -> list[tuple]:
+    """Decode postgres binary COPY data into rows of raw field bytes."""
+    assert data.startswith(dbcp.helpers.PG_COPY_BINARY_HEADER)
+    assert data.endswith(dbcp.helpers.PG_COPY_BINARY_TRAILER)
+    header_length = len(dbcp.helpers.PG_COPY_BINARY_HEADER)
+    body = memoryview(data)[header_length:-2]
+    rows, pos = [], 0
+    while pos < len(body):
+        assert struct.unpack_from(">h", body, pos)[0] == n_columns
+        pos += 2
+        row = []
+        for _ in range(n_columns):
+            (length,) = struct.unpack_from(">i", body, pos)
+            pos += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(bytes(body[pos:][:length]))
+                pos += length
+        rows.append(tuple(row))
+    return rows
+
+
+def test_encode_pg_copy_binary():
+    """The binary COPY encoding matches postgres' wire format, including NULLs."""
+    table = pa.table(
+        {
+            "name": pa.array(["a", None, "éé"]),
+            "count": pa.array([1, None, -2], type=pa.int64()),
+            "big": pa.array([None, 2**40, 3], type=pa.int64()),
+            "value": pa.array([1.5, None, 0.0]),
+            "flag": pa.array([True, False, None]),
+            "date": pa.array(
+                [datetime(2000, 1, 1), None, datetime(1999, 12, 31, 23, 59, 59)],
+                type=pa.timestamp("ms"),
+            ),
+        }
+    ).slice(0, 3)
+    sa_types = ["VARCHAR", "INTEGER", "BIGINT", "FLOAT", "BOOLEAN", "DATETIME"]
+    rows = _decode_pg_copy_binary(
+        dbcp.helpers.encode_pg_copy_binary(table, sa_types), len(sa_types)
+    )
+
+    assert rows == [
+        (
+            b"a",
+            struct.pack(">i", 1),
+            None,
+            struct.pack(">d", 1.5),
+            b"\x01",
+            struct.pack(">q", 0),
+        ),
+        (None, None, struct.pack(">q", 2**40), None, b"\x00", None),
+        (
+            "éé".encode(),
+            struct.pack(">i", -2),
+            struct.pack(">q", 3),
+            struct.pack(">d", 0.0),
+            None,
+            struct.pack(">q", -1_000_000),
+        ),
+    ]
+    empty = dbcp.helpers.encode_pg_copy_binary(table.slice(0, 0), sa_types)
+    assert _decode_pg_copy_binary(empty, len(sa_types)) == []
+
+
+@pytest.mark.parametrize(
+    "values,sa_type",
+    [
+        ([1, 2**31], "INTEGER"),
+        ([-(2**31) - 1, None], "INTEGER"),
+        (pa.array([2**63], type=pa.uint64()), "BIGINT"),
+    ],
+)
+def test_encode_pg_copy_binary_out_of_range(values, sa_type):
+    """Integers that don't fit in the postgres type raise instead of wrapping."""
+    table = pa.table({"value": pa.array(values)})
+    with pytest.raises(ValueError, match="out of the"):
+        dbcp.helpers.encode_pg_copy_binary(table, [sa_type])
+    # nulls don't count
+    dbcp.helpers.encode_pg_copy_binary(
+        pa.table({"value": pa.array([None, 1])}), [sa_type]
+    )
+
+
+def test_parse_pg_copy_csv():
+    """COPY CSV output is parsed with the same NULL handling as pd.read_sql."""
+    data = (
+        b"a,1,1.5,t,2020-01-02 03:04:05.5,2020-01-02\n"
+        b",,,,,\n"
+        b'"",3,2,f,2021-01-01 00:00:00,1999-12-31\n'
+    )
+    df = dbcp.helpers.parse_pg_copy_csv(
+        data,
+        ["text", "int", "float", "bool", "timestamp", "date"],
+        [25, 23, 701, 16, 1114, 1082],
+    )
+
+    assert df["text"].tolist() == ["a", None, ""]
+    assert df["int"].isna().tolist() == [False, True, False]
+    assert df["float"].dtype == "float64"
+    assert df["bool"].tolist() == [True, None, False]
+    assert df["timestamp"].dtype == "datetime64[ns]"
+    assert df["timestamp"].iloc[0] == pd.Timestamp("2020-01-02 03:04:05.5")
+    assert df["date"].iloc[2] == date(1999, 12, 31)
+
+    empty = dbcp.helpers.parse_pg_copy_csv(b"", ["int"], [20])
+    assert empty.columns.tolist() == ["int"]
+    assert empty.empty
+
+
+def test_add_fips_ids():
+    """FIPS IDs match addfips' row by row lookups."""
+    df = pd.DataFrame(
+        {
+            "state": ["WI", "wisconsin", "55", "NY", "NY", None, "XX", "NM", "LA"],
+            "county": [
+                "Dane",
+                "Dane County",
+                "dane",
+                "St. Lawrence",
+                "Saint Lawrence County",
+                "Dane",
+                "Dane",
+                "Doña Ana",
+                None,
+            ],
+            "other": range(9),
+        },
+        index=[5, 3, 3, 8, 1, 0, 2, 7, 9],
+    )
+    out = dbcp.helpers.add_fips_ids(df, vintage=2020)
+
+    af = addfips.AddFIPS(vintage=2020)
+    expected = df.astype({"state": "string", "county": "string"})
+    expected["state_id_fips"] = pd.Series(
+        [af.get_state_fips(s) if pd.notna(s) else None for s in df.state],
+        index=df.index,
+        dtype="string",
+    )
+    expected["county_id_fips"] = pd.Series(
+        [
+            af.get_county_fips(county=c, state=s)
+            if pd.notna(s) and pd.notna(c)
+            else None
+            for s, c in zip(df.state, df.county)
+        ],
+        index=df.index,
+        dtype="string",
+    )
+    assert expected["county_id_fips"].notna().sum() == 6
+    pd.testing.assert_frame_equal(out, expected)
+
+    states_only = dbcp.helpers.add_fips_ids(df, county_col=None, vintage=2020)
+    expected_states_only = df.astype({"state": "string"})
+    expected_states_only["state_id_fips"] = expected["state_id_fips"]
+    pd.testing.assert_frame_equal(states_only, expected_states_only)
+
+
+def test_read_pudl_table(tmp_path, monkeypatch):
+    """Columns and rows are filtered in the scan and dtypes are nullable."""
+    path = tmp_path / "table.parquet"
+    pq.write_table(
+        pa.table(
+            {
+                "report_date": pa.array(
+                    [date(2021, 1, 1), date(2022, 1, 1), date(2022, 6, 1)]
+                ),
+                "plant_id_eia": pa.array([1, 2, None], type=pa.int64()),
+                "state": ["CO", "WI", None],
+            }
+        ),
+        path,
+        row_group_size=1,
+    )
+    monkeypatch.setattr(dbcp.helpers, "get_pudl_resource", lambda resource: path)
+
+    df = dbcp.helpers.read_pudl_table(
+        "table.parquet",
+        columns=["report_date", "plant_id_eia"],
+        filters=pc.field("report_date") >= pa.scalar(date(2022, 1, 1)),
+    )
+    expected = pd.DataFrame(
+        {
+            "report_date": pd.to_datetime(["2022-01-01", "2022-06-01"]),
+            "plant_id_eia": pd.Series([2, pd.NA], dtype="Int64"),
+        }
+    )
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert df["plant_id_eia"].dtype == "Int64"
+
+
+class FakeS3FileSystem(MemoryFileSystem):
+    """An in-memory stand-in for S3 that reports ETags like single part uploads."""
+
+    store: dict = {}
+    pseudo_dirs = [""]
+
+    def info(self, path, **kwargs):
+        """Get the metadata of a file, including its ETag."""
+        info = super().info(path, **kwargs)
+        info["ETag"] = f'"{hashlib.md5(self.cat_file(path)).hexdigest()}"'
+        return info
+
+
+@pytest.fixture
+def fake_s3(monkeypatch, tmp_path):
+    """Replace the PUDL bucket with an in-memory filesystem and cache to tmp_path."""
+    fs = FakeS3FileSystem()
+    fs.store.clear()
+    monkeypatch.setenv("PUDL_VERSION", "v1")
+    monkeypatch.setattr(dbcp.helpers, "_get_pudl_filesystem", lambda: fs)
+    return fs
+
+
+def test_get_pudl_resource(fake_s3, tmp_path, monkeypatch):
+    """Downloads resume, truncated files are replaced and verified files reused."""
+    data = bytes(range(256)) * 100
+    fake_s3.pipe_file("/bucket/v1/a.parquet", data)
+    fake_s3.pipe_file("/bucket/v1/b.parquet", data)
+    cache = tmp_path / "v1"
+    cache.mkdir()
+
+    # an interrupted download of the same version of a.parquet
+    (cache / "a.parquet.part").write_bytes(data[:1000])
+    with open(cache / "a.parquet.part.json", "w") as f:
+        json.dump(dbcp.helpers._get_remote_version(fake_s3, "/bucket/v1/a.parquet"), f)
+    # a truncated file left by an old version of the code
+    (cache / "b.parquet").write_bytes(data[:1000])
+
+    paths = dbcp.helpers.prefetch_pudl_resources(
+        ["a.parquet", "b.parquet", "missing.parquet"],
+        bucket="/bucket",
+        local_cache_dir=tmp_path,
+    )
+    assert paths == {"a.parquet": cache / "a.parquet", "b.parquet": cache / "b.parquet"}
+    for resource in ["a.parquet", "b.parquet"]:
+        assert paths[resource].read_bytes() == data
+        assert not (cache / f"{resource}.part").exists()
+
+    def no_s3():
+        raise AssertionError("S3 was accessed for a verified cached file")
+
+    monkeypatch.setattr(dbcp.helpers, "_get_pudl_filesystem", no_s3)
+    path = dbcp.helpers.get_pudl_resource(
+        "a.parquet", bucket="/bucket", local_cache_dir=tmp_path
+    )
+    assert path.read_bytes() == data
+
+
+def test_get_pudl_resource_corrupt_download(fake_s3, tmp_path):
+    """Downloads that don't match the ETag are discarded."""
+    fake_s3.pipe_file("/bucket/v1/a.parquet", b"abc")
+    cache = tmp_path / "v1"
+    cache.mkdir()
+    (cache / "a.parquet.part").write_bytes(b"x")
+    version = dbcp.helpers._get_remote_version(fake_s3, "/bucket/v1/a.parquet")
+    with open(cache / "a.parquet.part.json", "w") as f:
+        json.dump(version, f)
+
+    with pytest.raises(ValueError, match="ETag"):
+        dbcp.helpers.get_pudl_resource(
+            "a.parquet", bucket="/bucket", local_cache_dir=tmp_path
+        )
+    assert not (cache / "a.parquet").exists()
+    assert not (cache / "a.parquet.part").exists()
+
+
+def test_get_pudl_resource_offline(fake_s3, tmp_path, monkeypatch):
+    """Offline runs use any cached copy without S3 and raise for missing ones."""
+    cache = tmp_path / "v1"
+    cache.mkdir()
+    # cached before sizes were recorded
+    (cache / "a.parquet").write_bytes(b"abc")
+
+    def no_s3():
+        raise AssertionError("S3 was accessed in offline mode")
+
+    monkeypatch.setattr(dbcp.helpers, "_get_pudl_filesystem", no_s3)
+    monkeypatch.setenv(dbcp.extract.helpers.OFFLINE_ENV_VAR, "1")
+    path = dbcp.helpers.get_pudl_resource(
+        "a.parquet", bucket="/bucket", local_cache_dir=tmp_path
+    )
+    assert path.read_bytes() == b"abc"
+    with pytest.raises(FileNotFoundError):
+        dbcp.helpers.prefetch_pudl_resources(
+            ["a.parquet", "missing.parquet"],
+            bucket="/bucket",
+            local_cache_dir=tmp_path,
+        )
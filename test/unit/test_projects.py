@@ -0,0 +1,135 @@
+"""Test the ISO projects data mart."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dbcp.data_mart.projects import (
+    _sample_status_history,
+    create_total_active_project_change_logs,
+)
+
+
+def _explode_active_project_change_logs(chng_log, geography, metric, freq="Q"):
+    """Reference implementation that enumerates the active periods of every project."""
+    chng_log = chng_log.copy()
+    min_date = chng_log.effective_date.min() - pd.offsets.QuarterBegin(startingMonth=1)
+    max_date = chng_log.effective_date.max() + pd.offsets.QuarterEnd(0)
+    chng_log["report_date"] = [
+        pd.date_range(
+            start=min_date if pd.isna(start) else start,
+            end=max_date if pd.isna(end) else end,
+            freq=freq,
+            normalize=True,
+        )
+        for start, end in zip(chng_log.effective_date, chng_log.end_date)
+    ]
+    exploded = chng_log.explode("report_date")
+    exploded["report_date"] = pd.to_datetime(exploded["report_date"])
+    grp = exploded.groupby([geography, "report_date", "resource_class"])
+    if metric == "capacity_mw":
+        totals = grp.capacity_mw.sum().reset_index()
+    else:
+        totals = grp.surrogate_id.count().rename("n_projects").reset_index()
+    totals = totals.pivot_table(
+        index=[geography, "report_date"],
+        columns=["resource_class"],
+        values=metric,
+        fill_value=0,
+    )
+    totals.columns = [f"{col}_{metric}" for col in totals.columns.values]
+    return totals.reset_index()
+
+
+@pytest.fixture
+def active_change_log():
+    """Random projects with some missing dates, capacities and geographies."""
+    rng = np.random.default_rng(42)
+    n = 500
+    start = pd.Timestamp("2010-01-01") + pd.to_timedelta(
+        rng.integers(0, 4000, n), unit="D"
+    )
+    end = start + pd.to_timedelta(rng.integers(-100, 2000, n), unit="D")
+    df = pd.DataFrame(
+        {
+            "surrogate_id": range(n),
+            "queue_status": "new",
+            "county_id_fips": rng.choice(["01001", "01003", "02013", None], n),
+            "resource_class": rng.choice(["renewable", "fossil", "storage"], n),
+            "capacity_mw": rng.uniform(0, 500, n).round(1),
+            "effective_date": start,
+            "end_date": end,
+        }
+    )
+    df.loc[rng.choice(n, 20), "effective_date"] = pd.NaT
+    df.loc[rng.choice(n, 100), "end_date"] = pd.NaT
+    df.loc[rng.choice(n, 10), "capacity_mw"] = np.nan
+    # quarter boundaries
+    df.loc[0, ["effective_date", "end_date"]] = [
+        pd.Timestamp("2015-03-31 12:00"),
+        pd.Timestamp("2015-06-30 08:00"),
+    ]
+    return df
+
+
+@pytest.mark.parametrize("metric", ["capacity_mw", "n_projects"])
+@pytest.mark.parametrize("freq", ["Q", "M"])
+def test_active_project_change_logs_match_exploded(active_change_log, metric, freq):
+    """The sweep produces the same totals as enumerating every project's periods."""
+    expected = _explode_active_project_change_logs(
+        active_change_log, "county_id_fips", metric, freq=freq
+    )
+    actual = create_total_active_project_change_logs(
+        active_change_log, geography="county_id_fips", metric=metric, freq=freq
+    )
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def test_sample_status_history_matches_interval_index():
+    """The binary search join matches looking up each date in an IntervalIndex."""
+    rng = np.random.default_rng(0)
+    n = 300
+    start = pd.Timestamp("2018-01-01") + pd.to_timedelta(
+        rng.integers(0, 60, n) * 30, unit="D"
+    )
+    status_history = pd.DataFrame(
+        {
+            "plant_id_eia": rng.integers(1, 40, n),
+            "generator_id": rng.choice(["1", "2", "GT1"], n),
+            "operational_status_code": rng.integers(1, 8, n),
+            "start_date": start,
+            "end_date": start + pd.to_timedelta(rng.integers(0, 900, n), unit="D"),
+        }
+    ).drop_duplicates(subset=["plant_id_eia", "generator_id", "start_date"])
+    quarter_end_dates = pd.date_range(end="2022-12-31", periods=12, freq="Q")
+
+    # previous implementation
+    gen_key = ["plant_id_eia", "generator_id"]
+    idx_cols = gen_key + ["quarter_end"]
+    intervals = status_history.set_index(
+        pd.IntervalIndex.from_arrays(
+            status_history["start_date"], status_history["end_date"], closed="both"
+        )
+    )
+    quarterly = pd.concat(
+        (intervals.loc[date, :].assign(quarter_end=date) for date in quarter_end_dates),
+        ignore_index=True,
+    )
+    quarterly = quarterly.sort_values(idx_cols).reset_index(drop=True)
+    dupes = quarterly.duplicated(subset=idx_cols, keep=False)
+    is_last_start_date = (
+        quarterly.loc[dupes, :]
+        .groupby(idx_cols, as_index=False)["start_date"]
+        .transform(lambda x: x.eq(x.max()))
+        .squeeze()
+    )
+    dedupe = quarterly.drop(is_last_start_date.index[~is_last_start_date], axis=0)
+    expected = (
+        dedupe.drop(columns=["start_date", "end_date"])
+        .set_index(idx_cols)
+        .unstack()
+        .stack(dropna=False)
+        .reset_index()
+    )
+
+    actual = _sample_status_history(status_history, quarter_end_dates)
+    pd.testing.assert_frame_equal(actual, expected)
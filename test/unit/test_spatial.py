@@ -0,0 +1,36 @@
+"""Test assigning coordinates to counties."""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from dbcp.transform.spatial import CountyLocator
+
+
+def test_county_locator():
+    """Points are assigned to the county containing them, or the nearest one."""
+    counties = gpd.GeoDataFrame(
+        {"GEOID": ["55025", "55021"]},
+        geometry=[box(-90, 43, -89, 44), box(-90, 44, -89, 45)],
+        crs="EPSG:4269",
+    )
+    locator = CountyLocator(counties)
+    longitude = pd.Series(
+        [-89.5, -89.5, -89.5, -89.05, np.nan, -80.0], index=list("abcdef")
+    )
+    latitude = pd.Series(
+        [43.5, 44.5, 44.0, 44.5, 43.5, 44.5], dtype="Float64", index=list("abcdef")
+    )
+
+    located = locator.locate(longitude, latitude)
+    expected = pd.Series(
+        ["55025", "55021", "55025", "55021", None, None],
+        index=list("abcdef"),
+        dtype="string",
+    )
+    pd.testing.assert_series_equal(located, expected)
+
+    # a point just east of the counties is assigned to the nearest one
+    longitude["d"] = -88.95
+    located = locator.locate(longitude, latitude, max_distance=0.2)
+    pd.testing.assert_series_equal(located, expected)